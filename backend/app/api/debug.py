@@ -0,0 +1,33 @@
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import FileResponse
+from typing import Dict, List, Optional
+
+from ..core.config import settings
+from ..core.profiling import list_profiles, profile_file_path
+
+router = APIRouter(prefix="/debug")
+
+
+def _check_access(token: Optional[str]):
+    # Hidden entirely unless profiling is switched on
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.profiling_token and token != settings.profiling_token:
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+@router.get("/profiles", response_model=List[Dict])
+async def get_profiles(x_bvmt_profile: Optional[str] = Header(None)):
+    """List saved request profiles, newest first."""
+    _check_access(x_bvmt_profile)
+    return list_profiles()
+
+
+@router.get("/profiles/{filename}")
+async def download_profile(filename: str, x_bvmt_profile: Optional[str] = Header(None)):
+    """Download a saved .prof (pstats) or .collapsed (flamegraph) file."""
+    _check_access(x_bvmt_profile)
+    path = profile_file_path(filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=filename, media_type="application/octet-stream")
@@ -1,62 +1,158 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Depends, Header, Query, WebSocket
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Optional
 from ..services.data_loader import DataLoader
-from ..services.models import PricePredictor, AnomalyDetector
-from ..services.portfolio import PortfolioService
+from ..services.models import PricePredictor, AnomalyDetector, forecast_trend
+from ..services.portfolio import DEFAULT_USER, PortfolioService, PortfolioStore
 from ..services.agent import DecisionAgent
 from ..services.sentiment import SentimentService
+from ..services.market_feed import MarketFeed, latest_quotes
+from ..services.bars import BarStore, downsample_rows
+from ..services.similarity import ReturnMatrix
+from ..services.market_index import MarketIndex, BASE_LEVEL
+from ..services.alerts import AlertEngine
+from ..services.panel import MarketPanel
+from ..core.config import settings
+from ..core.readiness import readiness
+from ..core.warmup import register_warmup_step
+from ..core.jobs import JobContext, register_job, scheduler
+from ..core.coalesce import coalescer
+from ..core.responses import FastJSONResponse, dumps, frame_records, json_response
+import hmac
+import threading
+import time
 import pandas as pd
 import numpy as np
 
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 
 # Initialize services (Global state for MVP)
-data_loader = DataLoader() 
+# History files are read by the startup warm-up, not at import time.
+data_loader = DataLoader(autoload=False)
 predictor = PricePredictor()
 anomaly_detector = AnomalyDetector()
-portfolio_service = PortfolioService()
+portfolio_store = PortfolioStore(settings.portfolio_dir, settings.portfolio_cache_size)
 decision_agent = DecisionAgent()
 sentiment_service = SentimentService()
+bar_store = BarStore(data_loader)
+return_matrix = ReturnMatrix(data_loader)
+market_index = MarketIndex(data_loader, settings.index_file)
+
+def _holdings_of(user: str) -> List[str]:
+    return list(portfolio_store.snapshot(user)["holdings"])
+
+alert_engine = AlertEngine(data_loader, decision_agent.compute_indicators_batch, settings.alerts_file, _holdings_of)
+
+def _load_market_data(progress):
+    data_loader.load(progress)
+    if data_loader.get_data().empty:
+        raise RuntimeError(f"No history data loaded from {data_loader.data_dir}")
+
+register_warmup_step("data", _load_market_data)
+register_warmup_step("index", lambda progress: data_loader.build_index())
+register_warmup_step("returns", lambda progress: return_matrix.refresh())
+register_warmup_step("market_index", lambda progress: market_index.refresh())
+
+_watcher: Optional[threading.Thread] = None
+
+def _watch_data_dir():
+    while True:
+        time.sleep(settings.data_watch_s)
+        if not readiness.is_ready("data"):
+            continue
+        try:
+            data_loader.refresh()
+        except Exception as e:
+            print(f"Data refresh failed: {e}")
+
+def start_data_watcher():
+    """Polls the history files every BVMT_DATA_WATCH_S seconds and appends new sessions."""
+    global _watcher
+    if settings.data_watch_s <= 0 or (_watcher is not None and _watcher.is_alive()):
+        return
+    _watcher = threading.Thread(target=_watch_data_dir, name="bvmt-data-watch", daemon=True)
+    _watcher.start()
+
+async def _coalesced(group: str, key: tuple, fn, *args):
+    """Shares one computation between concurrent identical requests on the same data version."""
+    return await coalescer.run(group, (data_loader.version, *key), fn, *args)
 
 @router.get("/stocks", response_model=List[str])
 async def get_stocks():
     """List all available stock symbols."""
+    readiness.require("data")
     stocks = data_loader.get_all_stocks()
-    return stocks
+    return json_response(stocks)
 
 @router.get("/stocks/{symbol}/history", response_model=List[Dict])
-async def get_stock_history(symbol: str):
-    """Get historical data for a specific stock."""
+async def get_stock_history(symbol: str, max_points: Optional[int] = Query(None, ge=3), downsample: str = "lttb"):
+    """
+    Get historical data for a specific stock.
+    With max_points, rows are reduced with LTTB (default) or min/max bucketing ("minmax").
+    """
+    readiness.require("data")
     df = data_loader.get_stock_data(symbol)
     if df.empty:
         raise HTTPException(status_code=404, detail="Stock not found")
-    
-    # Replace NaN with None for JSON serialization
-    df = df.where(pd.notnull(df), None)
-    
-    # Convert dates to string for JSON
-    if 'Date' in df.columns:
-        df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
-        
-    records = df.to_dict(orient="records")
-    return records
+    if downsample not in ("lttb", "minmax"):
+        raise HTTPException(status_code=400, detail="downsample must be 'lttb' or 'minmax'")
+    if max_points:
+        df = downsample_rows(df, max_points, method=downsample)
+    return json_response(frame_records(df))
+
+@router.get("/stocks/{symbol}/bars", response_model=List[Dict])
+async def get_stock_bars(symbol: str, timeframe: str = "W", max_points: Optional[int] = Query(None, ge=3)):
+    """OHLCV bars (D, W, M or Y); with max_points, consecutive bars are merged to fit."""
+    readiness.require("data")
+    try:
+        bars = bar_store.get_bars(symbol, timeframe)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if bars.empty:
+        raise HTTPException(status_code=404, detail="Stock not found")
+    if max_points:
+        bars = bar_store.downsample_bars(bars, max_points)
+    return json_response(frame_records(bars))
+
+@router.get("/stocks/{symbol}/similar")
+async def get_similar_stocks(symbol: str, k: int = Query(10, ge=1, le=100),
+                             window: int = Query(250, ge=20, le=5000)):
+    """Stocks whose daily returns correlate most with this one over the last `window` sessions."""
+    readiness.require("data")
+    try:
+        similar = await _coalesced("similar", (symbol, k, window), return_matrix.similar, symbol, k, window)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Stock not found or not enough quotes in the window")
+    return json_response({"symbol": symbol, "window": window, "similar": similar})
 
 @router.get("/stocks/{symbol}/predict")
 async def predict_price(symbol: str, days: int = 7):
     """Predict future price for a stock."""
+    readiness.require("data")
+    return json_response(await _coalesced("predict", (symbol, days), _predict, symbol, days))
+
+def _predict(symbol: str, days: int) -> Dict:
     df = data_loader.get_stock_data(symbol)
     if df.empty:
         raise HTTPException(status_code=404, detail="Stock not found")
     
+    if days == 7:
+        forecasts = scheduler.result("forecasts", data_loader.version, {})
+        if symbol in forecasts:
+            return forecasts[symbol]
     try:
-        predictor.train(df)
-        return predictor.predict(days=days)
+        # Own model instance: concurrent requests train on the thread pool
+        model = PricePredictor()
+        model.train(df)
+        return model.predict(days=days)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/stocks/{symbol}/sentiment")
 async def get_stock_sentiment(symbol: str):
     """Get sentiment analysis and news for a stock."""
+    readiness.require("data")
     df = data_loader.get_stock_data(symbol)
     if df.empty:
          raise HTTPException(status_code=404, detail="Stock not found")
@@ -68,41 +164,117 @@ async def get_stock_sentiment(symbol: str):
         change = df.iloc[-1]['Close'] - df.iloc[-20]['Close']
         trend = "BULLISH" if change > 0 else "BEARISH"
     
-    return sentiment_service.analyze(symbol, trend)
+    return json_response(sentiment_service.analyze(symbol, trend))
 
 @router.get("/agent/analyze/{symbol}")
 async def analyze_stock(symbol: str, profile: str = "Moderate"):
     """Get AI Agent analysis and recommendation."""
+    readiness.require("data")
+    return json_response(await _coalesced("analyze", (symbol, profile), _analyze_stock, symbol, profile))
+
+def _analyze_stock(symbol: str, profile: str) -> Dict:
     df = data_loader.get_stock_data(symbol)
     if df.empty:
         raise HTTPException(status_code=404, detail="Stock not found")
 
-    predictor.train(df)
-    pred_res = predictor.predict(days=7)
+    version = data_loader.version
+    pred_res = scheduler.result("forecasts", version, {}).get(symbol)
+    if pred_res is None:
+        model = PricePredictor()
+        model.train(df)
+        pred_res = model.predict(days=7)
     prediction = pred_res["forecast"]
     metrics = pred_res["metrics"]
-    
-    current_avg = df.iloc[-5:]['Close'].mean() if len(df) >= 5 else df['Close'].mean()
-    future_avg = np.mean([p['price'] for p in prediction]) if prediction else current_avg
-    
-    if not prediction or abs(future_avg - current_avg) < 1e-6:
-        trend = "NEUTRAL"
-    else:
-        trend = "BULLISH" if future_avg > current_avg else "BEARISH"
-        if abs(future_avg - current_avg) / (current_avg + 1e-9) < 0.01:
-            trend = "NEUTRAL"
+    trend = forecast_trend(df, prediction)
 
     sent_data = sentiment_service.analyze(symbol, trend)
     sentiment_score = sent_data.get("score", 0.0)
 
-    analysis = decision_agent.analyze(symbol, df, trend, sentiment_score, profile)
+    indicators = scheduler.result("indicators", version)
+    if indicators is not None:
+        analysis = decision_agent.analyze_with_indicators(
+            symbol, indicators.get(symbol, {}), trend, sentiment_score, profile)
+    else:
+        analysis = decision_agent.analyze(symbol, df, trend, sentiment_score, profile)
     analysis["sentiment"] = sent_data
     analysis["forecast_metrics"] = metrics
     return analysis
 
+MAX_BATCH_SYMBOLS = 200
+# Symbols per vectorized chunk when streaming, so the first results go out early
+STREAM_CHUNK_SIZE = 16
+
+def _analyze_batch(symbols: List[str], profiles: List[str]) -> List[Dict]:
+    """Shared-computation version of /agent/analyze for a list of symbols and profiles."""
+    version = data_loader.version
+    frames = data_loader.get_many_stock_data(symbols)
+    forecasts = scheduler.result("forecasts", version)
+    if forecasts is None:
+        forecasts = predictor.batch_forecast(frames, days=7)
+    indicators = scheduler.result("indicators", version)
+    if indicators is None:
+        indicators = decision_agent.compute_indicators_batch(frames)
+
+    results = []
+    for symbol in symbols:
+        df = frames.get(symbol)
+        if df is None:
+            results.append({"symbol": symbol, "error": "Stock not found"})
+            continue
+        trend = forecast_trend(df, forecasts[symbol]["forecast"])
+        sent_data = sentiment_service.analyze(symbol, trend)
+        sentiment_score = sent_data.get("score", 0.0)
+        for profile in profiles:
+            analysis = decision_agent.analyze_with_indicators(
+                symbol, indicators.get(symbol, {}), trend, sentiment_score, profile)
+            analysis["symbol"] = symbol
+            analysis["profile"] = profile
+            analysis["sentiment"] = sent_data
+            analysis["forecast_metrics"] = forecasts[symbol]["metrics"]
+            results.append(analysis)
+    return results
+
+def _string_list(value, field: str) -> List[str]:
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise HTTPException(status_code=400, detail=f"'{field}' must be a list of strings")
+    return value
+
+@router.post("/agent/analyze/batch")
+async def analyze_batch(request: Dict = Body(...), stream: bool = False):
+    """
+    Analyze a watchlist in one call: {"symbols": [...], "profiles": ["Moderate", ...]}.
+    With ?stream=true, results are sent as NDJSON lines as each chunk of symbols completes.
+    """
+    readiness.require("data")
+    symbols = _string_list(request.get("symbols", []), "symbols")
+    profiles = _string_list(request.get("profiles") or [request.get("profile", "Moderate")], "profiles")
+    symbols = [s.strip().upper() for s in symbols if s.strip()]
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No symbols given")
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SYMBOLS} symbols per batch")
+    # Keep order, drop duplicates
+    symbols = list(dict.fromkeys(symbols))
+
+    if not stream:
+        results = await _coalesced("analyze_batch", (tuple(symbols), tuple(profiles)),
+                                   _analyze_batch, symbols, profiles)
+        return json_response({"results": results})
+
+    async def generate():
+        for start in range(0, len(symbols), STREAM_CHUNK_SIZE):
+            chunk = symbols[start:start + STREAM_CHUNK_SIZE]
+            for result in await run_in_threadpool(_analyze_batch, chunk, profiles):
+                yield dumps(result) + b"\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 @router.get("/market-mood")
 async def get_market_mood():
     """Get global market mood summary."""
+    return json_response(compute_market_mood())
+
+def compute_market_mood() -> Dict:
     stocks = ["SFBT", "BIAT", "POULINA", "TILNET", "SAH"]
     scores = []
     headlines = []
@@ -127,8 +299,19 @@ async def get_market_mood():
 @router.get("/market-summary")
 async def get_market_summary():
     """Get summary metrics for the dashboard."""
-    df = data_loader.get_data()
-    
+    readiness.require("data")
+    summary = scheduler.result("market_summary", data_loader.version)
+    if summary is None:
+        summary = await _coalesced("market_summary", (), compute_market_summary, data_loader.get_data())
+    return json_response(summary)
+
+def compute_market_summary(df: pd.DataFrame, anomalies: Optional[List[Dict]] = None,
+                           daily: Optional[pd.DataFrame] = None, panel: Optional[MarketPanel] = None) -> Dict:
+    """
+    Dashboard summary for a market frame; pass `anomalies` and `daily`
+    (see `compute_daily_aggregates`) when they are already computed, and the frame's
+    `panel` when it isn't the loader's current data.
+    """
     if df.empty:
          return {
             "index_value": 0,
@@ -140,49 +323,40 @@ async def get_market_summary():
             "market_trends": [],
             "recent_anomalies": []
         }
+    if panel is None:
+        panel = data_loader.panel()
 
-    latest_date = df['Date'].max()
-    available_dates = sorted(df['Date'].unique())
-    
-    if len(available_dates) < 2:
-        prev_date = latest_date
-    else:
-        prev_date = available_dates[-2]
-        
-    latest_data = df[df['Date'] == latest_date]
-    prev_data = df[df['Date'] == prev_date]
+    # Latest and previous sessions are the last two rows of the panel
+    latest = panel.cross_section(-1)
+    prev = panel.cross_section(-2) if panel.shape[0] > 1 else latest
 
-    total_volume = latest_data['Volume'].sum() if 'Volume' in latest_data.columns else 0
-    prev_total_volume = prev_data['Volume'].sum() if 'Volume' in prev_data.columns else 0
+    total_volume = latest['Volume'].sum()
+    prev_total_volume = prev['Volume'].sum()
     
     volume_change = 0
     if prev_total_volume > 0:
         volume_change = ((total_volume - prev_total_volume) / prev_total_volume) * 100
 
-    index_value = latest_data['Close'].sum() if 'Close' in latest_data.columns else 0
-    prev_index_value = prev_data['Close'].sum() if 'Close' in prev_data.columns else 0
-    
-    index_change = 0
-    if prev_index_value > 0:
-        index_change = ((index_value - prev_index_value) / prev_index_value) * 100
+    # Chained index, so names that didn't trade in the session don't move it
+    index = market_index.latest()
+    index_value, index_change = index["value"], index["change"]
 
-    merged = pd.merge(latest_data[['Symbol', 'Close']], prev_data[['Symbol', 'Close']], on='Symbol', suffixes=('_curr', '_prev'))
-    merged['diff'] = merged['Close_curr'] - merged['Close_prev']
+    both = latest.index.intersection(prev.index, sort=False)
+    merged = pd.DataFrame({'Symbol': both, 'diff': latest.loc[both, 'Close'].to_numpy() - prev.loc[both, 'Close'].to_numpy()})
     
-    gainers = len(merged[merged['diff'] > 0])
-    losers = len(merged[merged['diff'] < 0])
+    gainers = int((merged['diff'] > 0).sum())
+    losers = int((merged['diff'] < 0).sum())
     
-    trend_df = df.groupby('Date')['Volume'].sum().reset_index()
-    trend_df = trend_df.sort_values('Date').tail(30)
+    if daily is None:
+        daily = compute_daily_aggregates(panel)
+    trend_df = daily.tail(30)
     
-    trends = []
-    for _, row in trend_df.iterrows():
-        trends.append({
-            "name": row['Date'].strftime('%Y-%m-%d'),
-            "value": int(row['Volume'])
-        })
+    trends = [{"name": name, "value": value} for name, value in zip(
+        np.datetime_as_string(trend_df['Date'].to_numpy(), unit='D').tolist(),
+        trend_df['Volume'].to_numpy(dtype='int64').tolist())]
 
-    anomalies = anomaly_detector.detect(df)
+    if anomalies is None:
+        anomalies = anomaly_detector.detect_panel(panel)
     formatted_anomalies = []
     for a in anomalies:
         formatted_anomalies.append({
@@ -193,7 +367,7 @@ async def get_market_summary():
             "time": a.get("date", "N/A")
         })
 
-    merged.sort_values('diff', ascending=False, inplace=True)
+    merged.sort_values('diff', ascending=False, kind='stable', inplace=True)
     top_gainers = merged.head(5)[['Symbol', 'diff']].to_dict(orient='records')
     top_losers = merged.tail(5)[['Symbol', 'diff']].to_dict(orient='records')
 
@@ -210,31 +384,134 @@ async def get_market_summary():
         "recent_anomalies": formatted_anomalies
     }
 
+def compute_daily_aggregates(panel: MarketPanel) -> pd.DataFrame:
+    """Per-session market totals (Date, Volume, Value, Symbols quoted), in date order."""
+    valid = panel.valid
+    return pd.DataFrame({
+        'Date': pd.to_datetime(panel.dates),
+        'Volume': np.where(valid, panel.volume, 0).sum(axis=1).astype('int64'),
+        'Value': np.where(valid, panel.value, 0).sum(axis=1),
+        'Symbols': valid.sum(axis=1),
+    })
+
+def _build_market_snapshot() -> Dict:
+    df = data_loader.get_data()
+    version = data_loader.version
+    anomalies = scheduler.result("anomalies", version)
+    if anomalies is None:
+        anomalies = anomaly_detector.detect_panel(data_loader.panel())
+    summary = scheduler.result("market_summary", version)
+    return {
+        "summary": summary if summary is not None else compute_market_summary(df, anomalies),
+        "mood": compute_market_mood(),
+        "quotes": latest_quotes(df),
+        "anomalies": anomalies,
+    }
+
+market_feed = MarketFeed(
+    _build_market_snapshot,
+    get_version=lambda: data_loader.version,
+    is_ready=lambda: readiness.is_ready("data"),
+    poll_interval=settings.feed_poll_s,
+)
+
+@router.websocket("/ws/market")
+async def market_websocket(websocket: WebSocket):
+    """Push channel: one market snapshot per data version, then deltas."""
+    await market_feed.serve(websocket)
+
+@router.get("/market/correlation")
+async def get_market_correlation(window: int = Query(250, ge=20, le=5000), symbols: Optional[str] = None,
+                                 limit: int = Query(30, ge=2, le=300)):
+    """
+    Return-correlation heatmap. `symbols` is a comma separated list; without it the
+    `limit` most frequently quoted symbols of the window are used.
+    """
+    readiness.require("data")
+    wanted = [s.strip().upper() for s in symbols.split(",") if s.strip()] if symbols else None
+    key = (window, tuple(wanted) if wanted else None, limit)
+    return json_response(await _coalesced("correlation", key, return_matrix.correlation_matrix, window, wanted, limit))
+
+@router.get("/market/index")
+async def get_market_index(start: Optional[str] = Query(None, alias="from"),
+                           end: Optional[str] = Query(None, alias="to"), method: str = "value"):
+    """Market index series (base 1000); method "value" (traded-value weighted) or "price"."""
+    readiness.require("data")
+    try:
+        points = await _coalesced("market_index", (method, start, end),
+                                  lambda: frame_records(market_index.series(method, start, end)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response({"method": method, "base": BASE_LEVEL, "points": points})
+
 @router.get("/anomalies", response_model=List[Dict])
 async def get_anomalies():
     """Return all detected anomalies."""
+    readiness.require("data")
     df = data_loader.get_data()
     if df.empty:
-        return []
-    return anomaly_detector.detect(df)
+        return json_response([])
+    anomalies = scheduler.result("anomalies", data_loader.version)
+    if anomalies is None:
+        anomalies = await _coalesced("anomalies", (), lambda: anomaly_detector.detect_panel(data_loader.panel()))
+    return json_response(anomalies)
+
+# Post-load precomputation: run for every new data version, read by the routes above
+JOB_CHUNK_SIZE = 64
+
+def _chunked(ctx: JobContext, fn) -> Dict:
+    """Runs a per-symbol batch function over every symbol in chunks, checking for cancellation."""
+    symbols = data_loader.get_all_stocks()
+    results = {}
+    for start in range(0, len(symbols), JOB_CHUNK_SIZE):
+        ctx.check()
+        chunk = symbols[start:start + JOB_CHUNK_SIZE]
+        results.update(fn(data_loader.get_many_stock_data(chunk)))
+        ctx.progress(min(start + JOB_CHUNK_SIZE, len(symbols)), len(symbols))
+    return results
+
+def _job_market_summary(ctx: JobContext) -> Dict:
+    return compute_market_summary(data_loader.get_data(), ctx.result("anomalies"), ctx.result("daily_aggregates"))
+
+register_job("anomalies", lambda ctx: anomaly_detector.detect_panel(data_loader.panel()), priority=9)
+register_job("daily_aggregates", lambda ctx: compute_daily_aggregates(data_loader.panel()), priority=9)
+register_job("market_summary", _job_market_summary, depends_on=("anomalies", "daily_aggregates"), priority=8)
+register_job("forecasts", lambda ctx: _chunked(ctx, lambda f: predictor.batch_forecast(f, days=7)), priority=5)
+register_job("indicators", lambda ctx: _chunked(ctx, decision_agent.compute_indicators_batch), priority=4)
+
+# Alerts only look at the symbols of the new sessions, so they run first
+register_job("alerts", lambda ctx: alert_engine.evaluate(), priority=10)
+
+if settings.jobs_enabled:
+    data_loader.add_listener(scheduler.schedule)
+else:
+    data_loader.add_listener(lambda version: alert_engine.evaluate())
+
+@router.get("/jobs")
+async def get_jobs():
+    """State of the precomputation jobs for the latest data version."""
+    return json_response(scheduler.status())
+
+def _request_user(x_user_id: Optional[str] = Header(None), user_id: Optional[str] = Query(None)) -> str:
+    """The account a /portfolio* or /alerts* request is for: `X-User-Id` header, else `?user_id=`, else the default user."""
+    user = x_user_id or user_id or DEFAULT_USER
+    try:
+        return PortfolioStore.validate_user(user)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/portfolio")
-async def get_portfolio():
+async def get_portfolio(user: str = Depends(_request_user)):
     """Get current portfolio holdings and value."""
-    data = portfolio_service.get_portfolio()
+    readiness.require("data")
+    data = await run_in_threadpool(portfolio_store.snapshot, user)
     holdings = data.get("holdings", {})
     
     enriched_holdings = []
     total_value = 0
     total_cost = 0
     
-    all_prices = {}
-    full_df = data_loader.get_data()
-    if not full_df.empty:
-         latest_date = full_df['Date'].max()
-         latest_slice = full_df[full_df['Date'] == latest_date]
-         for _, row in latest_slice.iterrows():
-             all_prices[row['Symbol']] = row['Close']
+    all_prices = data_loader.panel().latest_prices()
 
     for symbol, h in holdings.items():
         qty = h["quantity"]
@@ -258,9 +535,9 @@ async def get_portfolio():
         total_value += market_value
         total_cost += (qty * avg)
     
-    metrics = portfolio_service.calculate_performance_metrics(total_value, total_cost)
+    metrics = PortfolioService.calculate_performance_metrics(total_value, total_cost)
 
-    return {
+    return json_response({
         "holdings": enriched_holdings,
         "total_value": round(total_value, 3),
         "total_cost": round(total_cost, 3),
@@ -269,23 +546,21 @@ async def get_portfolio():
         "sharpe_ratio": metrics["sharpe_ratio"],
         "max_drawdown": metrics["max_drawdown"],
         "transactions": data.get("transactions", [])
-    }
+    })
 
 @router.get("/portfolio/optimization")
-async def get_portfolio_optimization(profile: str = "Moderate", amount: float = None):
+async def get_portfolio_optimization(profile: str = "Moderate", amount: float = None,
+                                     user: str = Depends(_request_user)):
     """Get AI suggestions for portfolio optimization."""
-    data = portfolio_service.get_portfolio()
+    readiness.require("data")
+    data = await run_in_threadpool(portfolio_store.snapshot, user)
     enriched_holdings = {}
-    full_df = data_loader.get_data()
-    if not full_df.empty:
-         latest_date = full_df['Date'].max()
-         latest_slice = full_df[full_df['Date'] == latest_date]
-         for _, row in latest_slice.iterrows():
-             if row['Symbol'] in data["holdings"]:
-                 enriched_holdings[row['Symbol']] = {
-                     **data["holdings"][row['Symbol']],
-                     "current_price": row['Close']
-                 }
+    for symbol, close in data_loader.panel().latest_prices().items():
+        if symbol in data["holdings"]:
+            enriched_holdings[symbol] = {
+                **data["holdings"][symbol],
+                "current_price": close
+            }
     
     cash_for_optimization = amount if amount is not None else data.get("cash", 10000.0)
     portfolio_state = {
@@ -294,10 +569,10 @@ async def get_portfolio_optimization(profile: str = "Moderate", amount: float =
     }
     
     suggestions = decision_agent.get_optimization_suggestions(portfolio_state, profile, amount)
-    return {"suggestions": suggestions}
+    return json_response({"suggestions": suggestions})
 
 @router.post("/portfolio/transaction")
-async def execute_transaction(transaction: Dict = Body(...)):
+async def execute_transaction(transaction: Dict = Body(...), user: str = Depends(_request_user)):
     """Execute a buy or sell transaction."""
     t_type = transaction.get("type", "").upper()
     symbol = transaction.get("symbol")
@@ -307,13 +582,64 @@ async def execute_transaction(transaction: Dict = Body(...)):
     if not symbol or quantity <= 0 or price <= 0:
         raise HTTPException(status_code=400, detail="Invalid transaction data")
 
+    if t_type not in ("BUY", "SELL"):
+        raise HTTPException(status_code=400, detail="Invalid transaction type")
+
+    def apply():
+        with portfolio_store.open(user) as portfolio:
+            if t_type == "BUY":
+                return portfolio.buy(symbol, quantity, price)
+            return portfolio.sell(symbol, quantity, price)
+
     try:
-        if t_type == "BUY":
-            result = portfolio_service.buy(symbol, quantity, price)
-        elif t_type == "SELL":
-            result = portfolio_service.sell(symbol, quantity, price)
-        else:
-             raise HTTPException(status_code=400, detail="Invalid transaction type")
-        return result
+        result = await run_in_threadpool(apply)
+        return json_response(result)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/alerts/rules")
+async def get_alert_rules(user: str = Depends(_request_user)):
+    """The user's alert rules."""
+    return json_response(alert_engine.user_rules(user))
+
+@router.post("/alerts/rules")
+async def create_alert_rule(rule: Dict = Body(...), user: str = Depends(_request_user)):
+    """
+    Add a rule, e.g. {"symbol": "BIAT", "field": "close", "op": "above", "threshold": 110}.
+    `symbol` may be "*" (any symbol) or "@holdings" (the user's holdings).
+    """
+    try:
+        created = alert_engine.add_rule(user, str(rule.get("symbol", "")), rule.get("field", ""),
+                                        rule.get("op", ""), rule.get("threshold"))
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response(created)
+
+@router.delete("/alerts/rules/{rule_id}")
+async def delete_alert_rule(rule_id: int, user: str = Depends(_request_user)):
+    """Remove one of the user's rules. Alerts it already triggered stay in the history."""
+    try:
+        alert_engine.remove_rule(user, rule_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Alert rule not found")
+    return json_response({"deleted": rule_id})
+
+@router.get("/alerts")
+async def get_triggered_alerts(since: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000),
+                               user: str = Depends(_request_user)):
+    """Alerts triggered for the user after sequence number `since` (poll with the last `seq` seen)."""
+    return json_response(alert_engine.triggered(user, since, limit))
+
+@router.post("/admin/reload")
+async def reload_data(full: bool = False, x_bvmt_admin_token: Optional[str] = Header(None)):
+    """
+    Checks the history files now instead of waiting for the watcher: new sessions are
+    appended, `full=true` reloads everything. Disabled (404) unless BVMT_ADMIN_TOKEN is
+    set; the request must carry it in X-BVMT-Admin-Token.
+    """
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest((x_bvmt_admin_token or "").encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    readiness.require("data")
+    return json_response(await run_in_threadpool(data_loader.refresh, full))
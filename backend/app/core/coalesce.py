@@ -0,0 +1,86 @@
+"""
+Single-flight request coalescing.
+
+Concurrent calls with the same (group, key) share one computation: the first caller
+starts it on the thread pool and later callers await the same future. Every waiter
+gets the result, or the same exception when the computation fails. Waiters give up
+after the group's timeout with a 504, but the computation keeps running so callers
+that arrive afterwards still join it instead of starting over.
+"""
+import asyncio
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from .config import settings
+from .profiling import is_profiling
+from .metrics import (
+    COALESCE_COMPUTATIONS, COALESCE_ERRORS, COALESCE_IN_FLIGHT, COALESCE_SAVED, COALESCE_TIMEOUTS,
+)
+
+
+class Coalescer:
+    def __init__(self, enabled: bool = True, default_timeout: float = 30.0):
+        self.enabled = enabled
+        self.default_timeout = default_timeout
+        self._in_flight: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self._timeouts: Dict[str, float] = {}
+        # The loop only keeps weak references to tasks; hold the computations until they finish
+        self._tasks: Set[asyncio.Task] = set()
+
+    def set_timeout(self, group: str, seconds: float):
+        self._timeouts[group] = seconds
+
+    async def run(self, group: str, key: Hashable, fn: Callable[..., Any], *args,
+                  timeout: Optional[float] = None) -> Any:
+        """Runs `fn(*args)` in the thread pool, shared by concurrent calls with the same key."""
+        if is_profiling():
+            # Inline on the profiled thread, and not shared, so the profile holds the whole computation
+            return fn(*args)
+        if not self.enabled:
+            return await run_in_threadpool(fn, *args)
+
+        flight_key = (group, key)
+        future = self._in_flight.get(flight_key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            # Mark the exception as retrieved even if every waiter has gone
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._in_flight[flight_key] = future
+            COALESCE_COMPUTATIONS.inc(group=group)
+            COALESCE_IN_FLIGHT.inc(group=group)
+            task = asyncio.ensure_future(self._compute(group, flight_key, future, fn, args))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            COALESCE_SAVED.inc(group=group)
+
+        wait = timeout if timeout is not None else self._timeouts.get(group, self.default_timeout)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), wait)
+        except asyncio.TimeoutError:
+            COALESCE_TIMEOUTS.inc(group=group)
+            raise HTTPException(status_code=504, detail="Computation is still running, retry shortly",
+                                headers={"Retry-After": str(settings.retry_after_s)})
+
+    async def _compute(self, group: str, flight_key, future: asyncio.Future, fn, args):
+        try:
+            result = await run_in_threadpool(fn, *args)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            COALESCE_ERRORS.inc(group=group)
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            self._in_flight.pop(flight_key, None)
+            COALESCE_IN_FLIGHT.dec(group=group)
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+
+coalescer = Coalescer(enabled=settings.coalescing_enabled, default_timeout=settings.coalesce_timeout_s)
@@ -0,0 +1,61 @@
+import os
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class Settings:
+    """Runtime settings, read from BVMT_* environment variables."""
+
+    def __init__(self):
+        # Startup: load history files on a background thread instead of blocking startup
+        self.warmup_background = _env_bool("BVMT_WARMUP_BACKGROUND", True)
+        # Seconds clients are told to wait (Retry-After) while the backend warms up
+        self.retry_after_s = int(os.getenv("BVMT_RETRY_AFTER_S", "5"))
+
+        # How often the history files are checked for new sessions (0 disables the watcher)
+        self.data_watch_s = float(os.getenv("BVMT_DATA_WATCH_S", "60"))
+        # Shared secret for POST /api/admin/reload (X-BVMT-Admin-Token header); the route is off when unset
+        self.admin_token = os.getenv("BVMT_ADMIN_TOKEN", "")
+
+        # How often the market WebSocket feed checks for a new data version
+        self.feed_poll_s = float(os.getenv("BVMT_FEED_POLL_S", "2"))
+        # Identical concurrent requests share one computation; waiters give up after this many seconds
+        self.coalescing_enabled = _env_bool("BVMT_COALESCING_ENABLED", True)
+        self.coalesce_timeout_s = float(os.getenv("BVMT_COALESCE_TIMEOUT_S", "30"))
+
+        # Post-load precomputation jobs (see app/core/jobs.py)
+        self.jobs_enabled = _env_bool("BVMT_JOBS_ENABLED", True)
+        self.job_workers = int(os.getenv("BVMT_JOB_WORKERS", "2"))
+        # Saved market index series, extended with each new session
+        self.index_file = os.getenv("BVMT_INDEX_FILE", "market_index.json")
+
+        # Per-user portfolios: sharded files under this directory, most recently used kept in memory
+        self.portfolio_dir = os.getenv("BVMT_PORTFOLIO_DIR", "portfolios")
+        self.portfolio_cache_size = int(os.getenv("BVMT_PORTFOLIO_CACHE", "256"))
+
+        # Alert rules and their state, evaluated after each new session
+        self.alerts_file = os.getenv("BVMT_ALERTS_FILE", "alerts.json")
+
+        # Observability
+        self.metrics_enabled = _env_bool("BVMT_METRICS_ENABLED", True)
+        # Requests slower than this are logged with their stage breakdown (0 disables)
+        self.slow_request_ms = float(os.getenv("BVMT_SLOW_REQUEST_MS", "1000"))
+
+        # Response compression (brotli when installed, else gzip), negotiated by Accept-Encoding
+        self.compression_enabled = _env_bool("BVMT_COMPRESSION_ENABLED", True)
+        self.compression_min_bytes = int(os.getenv("BVMT_COMPRESSION_MIN_BYTES", "1024"))
+
+        # On-demand request profiling (off unless explicitly enabled)
+        self.profiling_enabled = _env_bool("BVMT_PROFILING_ENABLED", False)
+        # Optional shared secret; when set, the trigger header/flag must carry it
+        self.profiling_token = os.getenv("BVMT_PROFILING_TOKEN", "")
+        self.profile_dir = os.getenv("BVMT_PROFILE_DIR", "profiles")
+        self.profile_keep = int(os.getenv("BVMT_PROFILE_KEEP", "50"))
+
+
+settings = Settings()
@@ -0,0 +1,206 @@
+"""
+Post-load precomputation.
+
+Heavy analytics (indicator tables, forecasts, the anomaly scan, daily aggregates...)
+are registered as jobs with their dependencies and a priority. Each time a new data
+version is published, `scheduler.schedule(version)` runs the whole graph on a worker
+pool: a job starts once its dependencies are done, higher priorities first. A newer
+version cancels the run in progress. Routes read finished results with
+`scheduler.result(name, version)` and fall back to computing inline when the job
+hasn't finished for that version yet.
+"""
+import heapq
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .config import settings
+from .metrics import stage_timer
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+SKIPPED = "skipped"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Passed to job functions: the data version, dependency results, progress and cancellation."""
+
+    def __init__(self, run: "_Run", name: str):
+        self._run = run
+        self._name = name
+        self.version = run.version
+
+    def result(self, name: str) -> Any:
+        return self._run.results[name]
+
+    def cancelled(self) -> bool:
+        return self._run.cancelled
+
+    def check(self):
+        """Raises JobCancelled once a newer data version has been scheduled."""
+        if self._run.cancelled:
+            raise JobCancelled()
+
+    def progress(self, done: int, total: int):
+        self._run.jobs[self._name]["progress"] = {"done": done, "total": total}
+
+
+class _Job:
+    def __init__(self, name: str, fn: Callable[[JobContext], Any], depends_on: Sequence[str], priority: int):
+        self.name = name
+        self.fn = fn
+        self.depends_on = tuple(depends_on)
+        self.priority = priority
+
+
+class _Run:
+    def __init__(self, version: int, jobs: Dict[str, _Job]):
+        self.version = version
+        self.cancelled = False
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self.results: Dict[str, Any] = {}
+        self.jobs = {name: {"state": PENDING, "progress": None, "started": None, "finished": None, "error": None}
+                     for name in jobs}
+        self.waiting = {name: set(job.depends_on) for name, job in jobs.items()}
+        self.ready: List = []
+        self.running = 0
+
+
+class JobScheduler:
+    def __init__(self, workers: int = 2):
+        self.workers = max(1, workers)
+        self._jobs: Dict[str, _Job] = {}
+        self._run: Optional[_Run] = None
+        # Last completed result of each job, with the version it was computed for
+        self._results: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._seq = 0
+
+    def register(self, name: str, fn: Callable[[JobContext], Any], depends_on: Sequence[str] = (),
+                 priority: int = 0):
+        """Adds a job. Higher priorities start first when several jobs are ready."""
+        unknown = [d for d in depends_on if d not in self._jobs]
+        if unknown:
+            raise ValueError(f"Job '{name}' depends on unregistered jobs: {unknown}")
+        self._jobs[name] = _Job(name, fn, depends_on, priority)
+
+    def schedule(self, version: int):
+        """Starts the job graph for `version`, cancelling any run for an older version."""
+        if not self._jobs:
+            return
+        with self._lock:
+            if self._run is not None:
+                if self._run.version == version:
+                    return
+                self._run.cancelled = True
+                for state in self._run.jobs.values():
+                    if state["state"] == PENDING:
+                        state["state"] = CANCELLED
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bvmt-job")
+            run = _Run(version, self._jobs)
+            self._run = run
+            for name, deps in run.waiting.items():
+                if not deps:
+                    self._push(run, name)
+            self._dispatch(run)
+
+    def _push(self, run: _Run, name: str):
+        self._seq += 1
+        heapq.heappush(run.ready, (-self._jobs[name].priority, self._seq, name))
+
+    def _dispatch(self, run: _Run):
+        # Called with the lock held
+        while run.ready and run.running < self.workers and not run.cancelled:
+            _, _, name = heapq.heappop(run.ready)
+            run.running += 1
+            run.jobs[name].update(state=RUNNING, started=time.time())
+            self._executor.submit(self._execute, run, name)
+
+    def _execute(self, run: _Run, name: str):
+        job = self._jobs[name]
+        try:
+            with stage_timer(f"job.{name}"):
+                result = job.fn(JobContext(run, name))
+            state, error = DONE, None
+        except JobCancelled:
+            state, error = CANCELLED, None
+        except Exception as e:
+            traceback.print_exc()
+            state, error = FAILED, str(e)
+
+        with self._lock:
+            run.running -= 1
+            if run.cancelled and state == DONE:
+                state = CANCELLED
+            run.jobs[name].update(state=state, error=error, finished=time.time())
+            if state == DONE:
+                run.results[name] = result
+                self._results[name] = (run.version, result)
+                for other, deps in run.waiting.items():
+                    if name in deps:
+                        deps.discard(name)
+                        if not deps and run.jobs[other]["state"] == PENDING:
+                            self._push(run, other)
+            elif state == FAILED:
+                self._skip_dependents(run, name)
+            self._dispatch(run)
+            if run.running == 0 and not run.ready:
+                run.finished = time.time()
+
+    def _skip_dependents(self, run: _Run, failed: str):
+        for other, job in self._jobs.items():
+            if failed in job.depends_on and run.jobs[other]["state"] == PENDING:
+                run.jobs[other].update(state=SKIPPED, error=f"dependency '{failed}' failed")
+                self._skip_dependents(run, other)
+
+    def result(self, name: str, version: int, default: Any = None) -> Any:
+        """The job's result if it finished for exactly this data version, else `default`."""
+        entry = self._results.get(name)
+        if entry is None or entry[0] != version:
+            return default
+        return entry[1]
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            run = self._run
+            if run is None:
+                return {"version": None, "state": "idle", "workers": self.workers, "jobs": {}}
+            jobs = {}
+            for name, state in run.jobs.items():
+                job = self._jobs[name]
+                entry = {"state": state["state"], "priority": job.priority, "depends_on": list(job.depends_on)}
+                if state["progress"]:
+                    entry["progress"] = dict(state["progress"])
+                if state["error"]:
+                    entry["error"] = state["error"]
+                if state["started"] and state["finished"]:
+                    entry["duration_s"] = round(state["finished"] - state["started"], 3)
+                jobs[name] = entry
+            if run.cancelled:
+                overall = CANCELLED
+            elif run.finished is None:
+                overall = RUNNING
+            elif any(j["state"] in (FAILED, SKIPPED) for j in jobs.values()):
+                overall = FAILED
+            else:
+                overall = DONE
+        return {"version": run.version, "state": overall, "workers": self.workers, "jobs": jobs}
+
+
+scheduler = JobScheduler(workers=settings.job_workers)
+
+
+def register_job(name: str, fn: Callable[[JobContext], Any], depends_on: Sequence[str] = (), priority: int = 0):
+    scheduler.register(name, fn, depends_on, priority)
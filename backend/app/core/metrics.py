@@ -0,0 +1,226 @@
+"""
+Lightweight Prometheus-compatible metrics.
+
+Counters, gauges and histograms are kept in process memory and rendered in the
+Prometheus text exposition format by `render_metrics()`. `stage_timer` records
+named stages inside the services; when it runs inside an HTTP request the stage
+is also attached to that request so slow requests can be broken down.
+"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond lookups to multi-second loads
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.collect())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return int(state[-1]) if state else 0
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, state in items:
+            cumulative = 0.0
+            for i, bound in enumerate(self.buckets):
+                cumulative += state[i]
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    "bvmt_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status"))
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "bvmt_http_requests_in_flight", "HTTP requests currently being served.")
+REQUEST_SIZE = registry.histogram(
+    "bvmt_http_request_size_bytes", "HTTP request body size by route.", ("method", "route"), SIZE_BUCKETS)
+RESPONSE_SIZE = registry.histogram(
+    "bvmt_http_response_size_bytes", "HTTP response body size by route.", ("method", "route"), SIZE_BUCKETS)
+STAGE_LATENCY = registry.histogram(
+    "bvmt_stage_duration_seconds", "Duration of named processing stages inside the services.", ("stage",))
+SLOW_REQUESTS = registry.counter(
+    "bvmt_http_slow_requests_total", "Requests slower than the slow-request threshold.", ("route",))
+COALESCE_COMPUTATIONS = registry.counter(
+    "bvmt_coalesce_computations_total", "Computations started by the request coalescer.", ("group",))
+COALESCE_SAVED = registry.counter(
+    "bvmt_coalesce_saved_total", "Requests served by joining an identical in-flight computation.", ("group",))
+COALESCE_ERRORS = registry.counter(
+    "bvmt_coalesce_errors_total", "Coalesced computations that raised, per group.", ("group",))
+COALESCE_TIMEOUTS = registry.counter(
+    "bvmt_coalesce_timeouts_total", "Requests that gave up waiting on a coalesced computation.", ("group",))
+COALESCE_IN_FLIGHT = registry.gauge(
+    "bvmt_coalesce_in_flight", "Distinct coalesced computations currently running.", ("group",))
+PORTFOLIO_CACHE_HITS = registry.counter(
+    "bvmt_portfolio_cache_hits_total", "Portfolio reads served from the in-memory LRU.")
+PORTFOLIO_CACHE_MISSES = registry.counter(
+    "bvmt_portfolio_cache_misses_total", "Portfolio reads that loaded the user's file.")
+
+# Stages recorded during the current request: list of (stage, seconds), or None outside requests
+_request_stages: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "bvmt_request_stages", default=None)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Times a named processing stage, e.g. `with stage_timer("loader.read_files"): ...`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.observe(elapsed, stage=stage)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages.append((stage, elapsed))
+
+
+def begin_request_stages() -> Tuple[List[Tuple[str, float]], contextvars.Token]:
+    stages: List[Tuple[str, float]] = []
+    return stages, _request_stages.set(stages)
+
+
+def end_request_stages(token: contextvars.Token):
+    _request_stages.reset(token)
+
+
+def render_metrics() -> str:
+    return registry.render()
@@ -0,0 +1,145 @@
+import gzip
+import time
+
+from fastapi import Request
+from starlette.datastructures import Headers, MutableHeaders
+
+from .config import settings
+from .metrics import (
+    REQUEST_LATENCY, REQUESTS_IN_FLIGHT, REQUEST_SIZE, RESPONSE_SIZE, SLOW_REQUESTS,
+    begin_request_stages, end_request_stages,
+)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip is used instead
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def _route_label(request: Request) -> str:
+    """Route template (e.g. /api/stocks/{symbol}/history) to keep label cardinality bounded."""
+    route = request.scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    # Routes from included routers may report their path without the router prefix;
+    # recover the prefix from the leading segments of the actual path.
+    segments = request.scope["path"].rstrip("/").split("/")
+    depth = len([s for s in template.strip("/").split("/") if s])
+    prefix = "/".join(segments[:len(segments) - depth])
+    return prefix + template
+
+
+async def timing_middleware(request: Request, call_next):
+    """Records latency, in-flight count and payload sizes per route, and logs slow requests."""
+    if not settings.metrics_enabled:
+        return await call_next(request)
+
+    REQUESTS_IN_FLIGHT.inc()
+    stages, token = begin_request_stages()
+    start = time.perf_counter()
+    status = 500
+    response = None
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        end_request_stages(token)
+        REQUESTS_IN_FLIGHT.dec()
+
+        route = _route_label(request)
+        method = request.method
+        REQUEST_LATENCY.observe(elapsed, method=method, route=route, status=str(status))
+        REQUEST_SIZE.observe(int(request.headers.get("content-length") or 0), method=method, route=route)
+        if response is not None and "content-length" in response.headers:
+            RESPONSE_SIZE.observe(int(response.headers["content-length"]), method=method, route=route)
+
+        if settings.slow_request_ms > 0 and elapsed * 1000 >= settings.slow_request_ms:
+            SLOW_REQUESTS.inc(route=route)
+            breakdown = ", ".join(f"{name}={secs * 1000:.1f}ms" for name, secs in stages) or "no stages"
+            print(f"[slow-request] {method} {request.url.path} {status} "
+                  f"took {elapsed * 1000:.1f}ms ({breakdown})")
+
+
+def _negotiate_encoding(accept_encoding: str) -> str:
+    """Best supported coding from an Accept-Encoding header: "br", "gzip" or ""."""
+    offered = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            offered[token.strip().lower()] = q
+    wildcard = offered.get("*", 0.0)
+    if brotli is not None and offered.get("br", wildcard) > 0:
+        return "br"
+    if offered.get("gzip", wildcard) > 0:
+        return "gzip"
+    return ""
+
+
+class CompressionMiddleware:
+    """
+    Compresses complete JSON/text responses with brotli or gzip, as negotiated by the
+    client's Accept-Encoding. Streaming responses (e.g. NDJSON) are passed through so
+    their chunks are not held back.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            content_type = headers.get("content-type", "")
+            if (message.get("more_body", False) or len(body) < self.minimum_size
+                    or "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = self._compress(body, encoding)
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,204 @@
+"""
+On-demand profiling of single requests.
+
+When enabled in the settings, a request carrying the `X-BVMT-Profile` header (or the
+`_profile` query flag) is run under cProfile. The result is saved to the profiles
+directory as a pstats dump plus a collapsed-stack file that flamegraph.pl or
+speedscope can read directly. Requests without the trigger only pay for one header
+lookup, and the middleware is not installed at all while profiling is disabled.
+"""
+import contextvars
+import cProfile
+import json
+import os
+import pstats
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import Request
+
+from .config import settings
+
+PROFILE_HEADER = "x-bvmt-profile"
+PROFILE_QUERY_FLAG = "_profile"
+
+# cProfile hooks the whole thread, so only one request is profiled at a time
+_profile_lock = threading.Lock()
+
+# Set while the current request runs under the profiler; work it would hand to the
+# thread pool runs inline instead, since cProfile only sees the event-loop thread
+_profiling: contextvars.ContextVar[bool] = contextvars.ContextVar("bvmt_profiling", default=False)
+
+_SAFE_NAME = re.compile(r"^[A-Za-z0-9_.\-]+$")
+
+
+def _trigger_value(request: Request) -> Optional[str]:
+    value = request.headers.get(PROFILE_HEADER)
+    if value is None:
+        value = request.query_params.get(PROFILE_QUERY_FLAG)
+    return value
+
+
+def is_profiling() -> bool:
+    return _profiling.get()
+
+
+def is_authorized(value: Optional[str]) -> bool:
+    if value is None:
+        return False
+    if settings.profiling_token:
+        return value == settings.profiling_token
+    return value.lower() not in ("", "0", "false", "no")
+
+
+def _frame_label(func) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name
+    return f"{os.path.basename(filename)}:{name}:{line}"
+
+
+def collapse_stats(stats: pstats.Stats, max_depth: int = 64, min_fraction: float = 5e-4) -> Dict[str, int]:
+    """
+    Rebuilds approximate call stacks from cProfile's caller/callee edges.
+    Time along an edge is split in proportion to the cumulative time each caller
+    contributed, which is the usual reconstruction for deterministic profiles.
+    Branches worth less than `min_fraction` of the total time are dropped to keep
+    the number of reconstructed stacks bounded.
+    Returns {"a;b;c": microseconds}.
+    """
+    raw = stats.stats
+    children = defaultdict(dict)
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            children[caller][func] = edge[3]
+
+    roots = [f for f, (_, _, _, _, callers) in raw.items() if not callers]
+    cutoff = sum(raw[r][3] for r in roots) * min_fraction
+    collapsed: Dict[str, float] = defaultdict(float)
+
+    def walk(func, path: List, labels: List[str], scale: float):
+        _, _, tottime, cumtime, _ = raw[func]
+        own = tottime * scale
+        if own > 0:
+            collapsed[";".join(labels)] += own
+        if len(path) >= max_depth or cumtime <= 0:
+            return
+        for child, edge_ct in children.get(func, {}).items():
+            if child in path:
+                continue
+            child_ct = raw[child][3]
+            if child_ct <= 0:
+                continue
+            if edge_ct * scale < cutoff:
+                continue
+            child_scale = scale * edge_ct / child_ct
+            walk(child, path + [child], labels + [_frame_label(child)], child_scale)
+
+    for root in roots:
+        walk(root, [root], [_frame_label(root)], 1.0)
+
+    return {stack: int(secs * 1_000_000) for stack, secs in collapsed.items() if secs * 1_000_000 >= 1}
+
+
+def _slug(path: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")[:60] or "root"
+
+
+def _prune(directory: str, keep: int):
+    metas = sorted(f for f in os.listdir(directory) if f.endswith(".json"))
+    for meta in metas[:max(0, len(metas) - keep)]:
+        base = meta[:-len(".json")]
+        for ext in (".json", ".prof", ".collapsed"):
+            try:
+                os.remove(os.path.join(directory, base + ext))
+            except FileNotFoundError:
+                pass
+
+
+def save_profile(profiler: cProfile.Profile, request: Request, status: int, elapsed: float) -> str:
+    directory = settings.profile_dir
+    os.makedirs(directory, exist_ok=True)
+    created = datetime.now()
+    name = f"{created.strftime('%Y%m%dT%H%M%S_%f')}_{_slug(request.url.path)}"
+    base = os.path.join(directory, name)
+
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(base + ".prof")
+    with open(base + ".collapsed", "w") as f:
+        for stack, micros in sorted(collapse_stats(stats).items()):
+            f.write(f"{stack} {micros}\n")
+    with open(base + ".json", "w") as f:
+        json.dump({
+            "name": name,
+            "method": request.method,
+            "path": request.url.path,
+            "query": str(request.url.query),
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 2),
+            "created": created.isoformat(timespec="seconds"),
+        }, f, indent=2)
+
+    _prune(directory, settings.profile_keep)
+    return name
+
+
+async def profiling_middleware(request: Request, call_next):
+    """Profiles the request when the trigger header/flag is present and authorized."""
+    if not is_authorized(_trigger_value(request)):
+        return await call_next(request)
+
+    if not _profile_lock.acquire(blocking=False):
+        response = await call_next(request)
+        response.headers["X-BVMT-Profile-Status"] = "busy"
+        return response
+
+    try:
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        token = _profiling.set(True)
+        profiler.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.disable()
+            _profiling.reset(token)
+        elapsed = time.perf_counter() - start
+        name = save_profile(profiler, request, response.status_code, elapsed)
+    finally:
+        _profile_lock.release()
+
+    response.headers["X-BVMT-Profile-Status"] = "saved"
+    response.headers["X-BVMT-Profile-Id"] = name
+    return response
+
+
+def list_profiles() -> List[Dict]:
+    directory = settings.profile_dir
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for meta in sorted((f for f in os.listdir(directory) if f.endswith(".json")), reverse=True):
+        try:
+            with open(os.path.join(directory, meta), "r") as f:
+                info = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        info["files"] = {
+            "pstats": f"{info['name']}.prof",
+            "collapsed": f"{info['name']}.collapsed",
+        }
+        profiles.append(info)
+    return profiles
+
+
+def profile_file_path(filename: str) -> Optional[str]:
+    """Resolves a profile file inside the profiles directory, refusing anything else."""
+    if not _SAFE_NAME.match(filename) or not filename.endswith((".prof", ".collapsed")):
+        return None
+    path = os.path.join(settings.profile_dir, filename)
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,84 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+from .config import settings
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class Readiness:
+    """Tracks the warm-up state of each backend component (data, index, ...)."""
+
+    def __init__(self):
+        self._components: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str):
+        with self._lock:
+            self._components.setdefault(name, {"state": PENDING, "detail": None, "progress": None,
+                                               "started": None, "finished": None})
+
+    def start(self, name: str):
+        self.register(name)
+        with self._lock:
+            self._components[name].update(state=LOADING, detail=None, progress=None,
+                                          started=time.time(), finished=None)
+
+    def progress(self, name: str, done: int, total: int):
+        with self._lock:
+            comp = self._components.get(name)
+            if comp is not None:
+                comp["progress"] = {"done": done, "total": total,
+                                    "percent": round(done / total * 100, 1) if total else 100.0}
+
+    def ready(self, name: str, detail: Optional[str] = None):
+        self.register(name)
+        with self._lock:
+            self._components[name].update(state=READY, detail=detail, finished=time.time())
+
+    def fail(self, name: str, detail: str):
+        self.register(name)
+        with self._lock:
+            self._components[name].update(state=FAILED, detail=detail, finished=time.time())
+
+    def is_ready(self, *names: str) -> bool:
+        with self._lock:
+            return all(self._components.get(n, {}).get("state") == READY for n in names)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            components = {}
+            for name, comp in self._components.items():
+                entry = {"state": comp["state"]}
+                if comp["detail"]:
+                    entry["detail"] = comp["detail"]
+                if comp["progress"]:
+                    entry["progress"] = dict(comp["progress"])
+                if comp["started"] and comp["finished"]:
+                    entry["duration_s"] = round(comp["finished"] - comp["started"], 3)
+                components[name] = entry
+        return {
+            "ready": bool(components) and all(c["state"] == READY for c in components.values()),
+            "components": components,
+        }
+
+    def require(self, *names: str):
+        """Raises 503 with Retry-After until every named component is ready."""
+        if self.is_ready(*names):
+            return
+        with self._lock:
+            waiting = [n for n in names if self._components.get(n, {}).get("state") != READY]
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service not ready: {', '.join(waiting)}",
+            headers={"Retry-After": str(settings.retry_after_s)},
+        )
+
+
+readiness = Readiness()
@@ -0,0 +1,98 @@
+"""
+JSON encoding for API responses.
+
+Routes return `json_response(...)`, which encodes with orjson straight from NumPy
+arrays and scalars (NaN becomes null, datetime64 becomes ISO text) and skips
+FastAPI's recursive `jsonable_encoder` pass. DataFrames are turned into records
+column by column with `frame_records`. Falls back to the standard library encoder
+when orjson isn't installed.
+"""
+import json
+import math
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def frame_records(df: pd.DataFrame, date_format: str = "%Y-%m-%d") -> List[Dict[str, Any]]:
+    """
+    `df.to_dict(orient="records")` with NaN/NaT as None and datetime columns as text,
+    converted one column at a time instead of cell by cell.
+    """
+    columns = []
+    for name in df.columns:
+        col = df[name]
+        if pd.api.types.is_datetime64_any_dtype(col.dtype):
+            if date_format == "%Y-%m-%d":
+                raw = col.to_numpy()
+                text = np.datetime_as_string(raw, unit='D').astype(object)
+                text[np.isnat(raw)] = None
+                values = text.tolist()
+            else:
+                values = col.dt.strftime(date_format).where(col.notna(), None).tolist()
+        elif pd.api.types.is_float_dtype(col.dtype):
+            arr = col.to_numpy(dtype=float)
+            values = arr.astype(object)
+            values[np.isnan(arr)] = None
+            values = values.tolist()
+        else:
+            values = col.where(col.notna(), None).tolist() if col.dtype == object else col.tolist()
+        columns.append(values)
+    names = list(df.columns)
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, pd.DataFrame):
+        return frame_records(value)
+    if isinstance(value, pd.Series):
+        return value.tolist()
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _clean_floats(value: Any) -> Any:
+    # Standard library fallback only: NaN/inf are not valid JSON
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _clean_floats(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean_floats(v) for v in value]
+    return value
+
+
+def dumps(content: Any) -> bytes:
+    """Encodes `content` to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    content = json.loads(json.dumps(content, default=_default))
+    return json.dumps(_clean_floats(content), separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> FastJSONResponse:
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
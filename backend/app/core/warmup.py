@@ -0,0 +1,49 @@
+"""
+Startup warm-up.
+
+The API module only builds cheap service objects at import. Heavy work (reading
+history files, building indexes, optional precomputation) is registered here as
+ordered steps and run after startup, by default on a background thread so Uvicorn
+accepts connections immediately. Each step reports its state to `readiness`.
+"""
+import threading
+import traceback
+from typing import Callable, List, Optional, Tuple
+
+from .readiness import readiness
+
+# (component name, step function). The function receives a progress(done, total) callback.
+_steps: List[Tuple[str, Callable]] = []
+_thread: Optional[threading.Thread] = None
+
+
+def register_warmup_step(name: str, fn: Callable[[Callable[[int, int], None]], None]):
+    """Adds a warm-up step; steps run in registration order and stop at the first failure."""
+    _steps.append((name, fn))
+    readiness.register(name)
+
+
+def run_warmup():
+    for name, fn in _steps:
+        readiness.start(name)
+        try:
+            fn(lambda done, total, _name=name: readiness.progress(_name, done, total))
+        except Exception as e:
+            traceback.print_exc()
+            readiness.fail(name, str(e))
+            print(f"Warm-up step '{name}' failed: {e}")
+            return
+        readiness.ready(name)
+    print("Warm-up complete")
+
+
+def start_warmup(background: bool = True) -> Optional[threading.Thread]:
+    global _thread
+    if not background:
+        run_warmup()
+        return None
+    if _thread is not None and _thread.is_alive():
+        return _thread
+    _thread = threading.Thread(target=run_warmup, name="bvmt-warmup", daemon=True)
+    _thread.start()
+    return _thread
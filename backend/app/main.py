@@ -1,13 +1,25 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from contextlib import asynccontextmanager
 import warnings
 import pandas as pd
+from app.core.config import settings
+from app.core.warmup import start_warmup
 
 # Suppress persistent pandas/numpy runtime warnings for cleaner logs
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 warnings.filterwarnings("ignore", message=".*invalid value encountered in subtract.*")
 
-app = FastAPI(title="Intelligent Trading Assistant", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Data loading runs after the server starts accepting connections; see /ready
+    start_warmup(background=settings.warmup_background)
+    from app.api.endpoints import start_data_watcher
+    start_data_watcher()
+    yield
+
+app = FastAPI(title="Intelligent Trading Assistant", version="1.0.0", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -18,13 +30,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+from app.core.middleware import CompressionMiddleware, timing_middleware
+from app.core.metrics import render_metrics
+from app.core.profiling import profiling_middleware
+from app.core.readiness import readiness
+if settings.compression_enabled:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_bytes)
+if settings.profiling_enabled:
+    app.middleware("http")(profiling_middleware)
+app.middleware("http")(timing_middleware)
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Intelligent Trading Assistant API"}
 
 from app.api.endpoints import router
+from app.api.debug import router as debug_router
 app.include_router(router, prefix="/api")
+app.include_router(debug_router)
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    """Liveness: the process is up. Use /ready to know whether data is loaded."""
+    return {"status": "healthy", "ready": readiness.snapshot()["ready"]}
+
+@app.get("/ready")
+def ready_check():
+    """Readiness: per-component warm-up state; 503 until everything is ready."""
+    snapshot = readiness.snapshot()
+    if snapshot["ready"]:
+        return snapshot
+    return JSONResponse(snapshot, status_code=503, headers={"Retry-After": str(settings.retry_after_s)})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,6 +1,16 @@
 import pandas as pd
 import numpy as np
+from scipy.signal import lfilter
 from typing import Dict, Any, List
+from ..core.metrics import stage_timer
+
+def _ewm_matrix(values: np.ndarray, span: int) -> np.ndarray:
+    """Row-wise `ewm(span=span, adjust=False).mean()` of left-aligned series."""
+    alpha = 2 / (span + 1)
+    # y[0] = x[0], y[t] = (1 - alpha) * y[t-1] + alpha * x[t]
+    zi = ((1 - alpha) * values[:, 0])[:, None]
+    filtered, _ = lfilter([alpha], [1, -(1 - alpha)], values, axis=1, zi=zi)
+    return filtered
 
 class DecisionAgent:
     def __init__(self):
@@ -78,23 +88,96 @@ class DecisionAgent:
         - User Profile
         """
         if df.empty or len(df) < 26: # Need 26 for MACD signal
-            return {
-                "recommendation": "HOLD",
-                "confidence": 0,
-                "reasoning": ["Insufficient data for full technical analysis"],
-                "indicators": {}
-            }
+            return self._insufficient_data()
 
         df = df.sort_values('Date')
         current_price = df.iloc[-1]['Close']
         
         # 1. Technical Indicators
-        rsi = self.calculate_rsi(df['Close'])
-        macd_data = self.calculate_macd(df['Close'])
-        
-        vol_sma = df['Volume'].rolling(window=20).mean().iloc[-1]
-        current_vol = df.iloc[-1]['Volume']
-        vol_ratio = current_vol / vol_sma if vol_sma > 0 else 1.0
+        with stage_timer("agent.indicators"):
+            rsi = self.calculate_rsi(df['Close'])
+            macd_data = self.calculate_macd(df['Close'])
+            
+            vol_sma = df['Volume'].rolling(window=20).mean().iloc[-1]
+            current_vol = df.iloc[-1]['Volume']
+            vol_ratio = current_vol / vol_sma if vol_sma > 0 else 1.0
+
+        indicators = {"rsi": rsi, "vol_ratio": vol_ratio, "current_price": current_price, **macd_data}
+        return self.analyze_with_indicators(symbol, indicators, prediction_trend, sentiment_score, user_profile)
+
+    def _insufficient_data(self) -> Dict[str, Any]:
+        return {
+            "recommendation": "HOLD",
+            "confidence": 0,
+            "reasoning": ["Insufficient data for full technical analysis"],
+            "indicators": {}
+        }
+
+    def compute_indicators_batch(self, frames: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, float]]:
+        """
+        Same indicators as `analyze` (RSI 14, MACD 12/26/9, 20-day volume ratio) for many
+        symbols at once. Series are packed left-aligned into one matrix so the EWMs run as a
+        single vectorized IIR filter and the rolling means become slices of the last rows.
+        Symbols with fewer than 26 sessions are left out.
+        """
+        symbols = [s for s, f in frames.items() if len(f) >= 26]
+        if not symbols:
+            return {}
+
+        lengths = np.array([len(frames[s]) for s in symbols])
+        width = int(lengths.max())
+        closes = np.zeros((len(symbols), width))
+        volumes = np.zeros((len(symbols), width))
+        for i, s in enumerate(symbols):
+            closes[i, :lengths[i]] = frames[s]['Close'].to_numpy(dtype=float)
+            volumes[i, :lengths[i]] = frames[s]['Volume'].to_numpy(dtype=float)
+
+        rows = np.arange(len(symbols))[:, None]
+        last = lengths - 1
+
+        # RSI: mean gain/loss over the last 14 price changes
+        tail_idx = last[:, None] - np.arange(14, -1, -1)[None, :]
+        delta = np.diff(closes[rows, tail_idx], axis=1)
+        gain = np.where(delta > 0, delta, 0).mean(axis=1)
+        loss = np.where(delta < 0, -delta, 0).mean(axis=1)
+        rsi = 100 - (100 / (1 + gain / (loss + 1e-9)))
+
+        # MACD with adjust=False EWMs (padding after each series never feeds back into it)
+        exp12 = _ewm_matrix(closes, 12)
+        exp26 = _ewm_matrix(closes, 26)
+        macd = exp12 - exp26
+        signal = _ewm_matrix(macd, 9)
+        macd_last = macd[rows[:, 0], last]
+        signal_last = signal[rows[:, 0], last]
+
+        # Volume ratio against the 20-session average
+        vol_idx = last[:, None] - np.arange(19, -1, -1)[None, :]
+        vol_sma = volumes[rows, vol_idx].mean(axis=1)
+        current_vol = volumes[rows[:, 0], last]
+        vol_ratio = np.where(vol_sma > 0, current_vol / np.where(vol_sma > 0, vol_sma, 1), 1.0)
+
+        current_price = closes[rows[:, 0], last]
+        return {
+            s: {
+                "rsi": float(rsi[i]),
+                "macd": float(macd_last[i]),
+                "signal": float(signal_last[i]),
+                "histogram": float(macd_last[i] - signal_last[i]),
+                "vol_ratio": float(vol_ratio[i]),
+                "current_price": float(current_price[i]),
+            }
+            for i, s in enumerate(symbols)
+        }
+
+    def analyze_with_indicators(self, symbol: str, indicators: Dict[str, float], prediction_trend: str,
+                                sentiment_score: float = 0.0, user_profile: str = "Moderate") -> Dict[str, Any]:
+        """Scores precomputed indicators; `analyze` and the batch path share this logic."""
+        if not indicators:
+            return self._insufficient_data()
+        rsi = indicators["rsi"]
+        macd_data = indicators
+        vol_ratio = indicators["vol_ratio"]
+        current_price = indicators["current_price"]
 
         # 2. Logic Scoring
         score = 0
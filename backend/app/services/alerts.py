@@ -0,0 +1,239 @@
+"""
+Price and indicator alert rules.
+
+A rule watches one field of one symbol ("BIAT close above 110", "SFBT rsi below 30").
+The symbol can also be "*" (every symbol) or "@holdings" (whatever the rule's user
+holds). Rules are indexed by symbol and field, so each new session only evaluates
+the rules of the symbols quoted in it, and indicators are only computed for
+symbols that have an indicator rule.
+
+A rule fires when its condition starts to hold: once when it becomes true, and
+again only after it has been false for a session. Triggered alerts get an
+increasing sequence number, are kept in a bounded history for polling (saved
+with the rules, so polling resumes across restarts), and are put on
+`engine.queue` for in-process consumers.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from ..core.metrics import stage_timer
+
+QUOTE_FIELDS = ("close", "change_pct", "volume")
+INDICATOR_FIELDS = ("rsi", "macd", "histogram", "vol_ratio")
+FIELDS = QUOTE_FIELDS + INDICATOR_FIELDS
+OPERATORS = {"above": np.greater, "below": np.less}
+ANY_SYMBOL = "*"
+HOLDINGS = "@holdings"
+
+
+class AlertEngine:
+    def __init__(self, data_loader, indicators: Callable[[Dict[str, pd.DataFrame]], Dict[str, Dict[str, float]]],
+                 storage_file: Optional[str] = "alerts.json", holdings_of: Optional[Callable[[str], Iterable[str]]] = None,
+                 history_size: int = 1000, max_rules_per_user: int = 100):
+        self.data_loader = data_loader
+        # Batch indicator function, e.g. DecisionAgent.compute_indicators_batch
+        self.indicators = indicators
+        self.storage_file = storage_file
+        self.holdings_of = holdings_of
+        self.max_rules_per_user = max_rules_per_user
+        self.rules: Dict[int, Dict] = {}
+        # symbol (or "*" / "@holdings") -> field -> rule ids
+        self._index: Dict[str, Dict[str, Set[int]]] = {}
+        # rule id -> symbols its condition held for at the last evaluation
+        self._active: Dict[int, Set[str]] = {}
+        self._next_id = 1
+        self._seq = 0
+        # Last session evaluated; sessions up to it are never evaluated again
+        self._last_date: Optional[pd.Timestamp] = None
+        self.history: deque = deque(maxlen=history_size)
+        self.queue: "queue.Queue[Dict]" = queue.Queue(maxsize=history_size)
+        self._lock = threading.Lock()
+        self._load()
+
+    # Rules
+
+    def add_rule(self, user: str, symbol: str, field: str, op: str, threshold: float) -> Dict:
+        symbol = symbol.strip()
+        if symbol not in (ANY_SYMBOL, HOLDINGS):
+            symbol = symbol.upper()
+        if not symbol:
+            raise ValueError("Alert rule needs a symbol")
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field '{field}', expected one of {list(FIELDS)}")
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator '{op}', expected one of {list(OPERATORS)}")
+        threshold = float(threshold)
+        if not np.isfinite(threshold):
+            raise ValueError("Threshold must be a finite number")
+
+        with self._lock:
+            if sum(1 for r in self.rules.values() if r["user"] == user) >= self.max_rules_per_user:
+                raise ValueError(f"At most {self.max_rules_per_user} alert rules per user")
+            rule = {"id": self._next_id, "user": user, "symbol": symbol, "field": field, "op": op,
+                    "threshold": threshold, "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            self._next_id += 1
+            self.rules[rule["id"]] = rule
+            self._index_rule(rule)
+            self._save()
+        return dict(rule)
+
+    def remove_rule(self, user: str, rule_id: int):
+        with self._lock:
+            rule = self.rules.get(rule_id)
+            if rule is None or rule["user"] != user:
+                raise KeyError(rule_id)
+            del self.rules[rule_id]
+            self._active.pop(rule_id, None)
+            self._index[rule["symbol"]][rule["field"]].discard(rule_id)
+            self._save()
+
+    def user_rules(self, user: str) -> List[Dict]:
+        with self._lock:
+            return [dict(r) for r in self.rules.values() if r["user"] == user]
+
+    def _index_rule(self, rule: Dict):
+        self._index.setdefault(rule["symbol"], {}).setdefault(rule["field"], set()).add(rule["id"])
+
+    # Evaluation
+
+    def _changed_symbols(self, data: pd.DataFrame) -> List[str]:
+        """Symbols quoted in the sessions after the last evaluated one (or in the latest session)."""
+        dates = data['Date']
+        if self._last_date is None:
+            cut = int(dates.searchsorted(dates.iloc[-1], side='left'))
+        else:
+            cut = int(dates.searchsorted(self._last_date, side='right'))
+        return list(data['Symbol'].iloc[cut:].unique())
+
+    def _candidates(self, symbols: List[str]) -> Dict[str, Set[int]]:
+        holders: Dict[str, Set[str]] = {}
+        if HOLDINGS in self._index and self.holdings_of is not None:
+            users = {self.rules[i]["user"] for ids in self._index[HOLDINGS].values() for i in ids}
+            holders = {u: set(self.holdings_of(u)) for u in users}
+
+        candidates = {}
+        for symbol in symbols:
+            ids = set()
+            for key in (symbol, ANY_SYMBOL):
+                for field_ids in self._index.get(key, {}).values():
+                    ids |= field_ids
+            for field_ids in self._index.get(HOLDINGS, {}).values():
+                ids |= {i for i in field_ids if symbol in holders.get(self.rules[i]["user"], ())}
+            if ids:
+                candidates[symbol] = ids
+        return candidates
+
+    @staticmethod
+    def _quote(frame: pd.DataFrame) -> Dict[str, float]:
+        close = frame['Close'].to_numpy(dtype=float)
+        prev = close[-2] if len(close) > 1 else close[-1]
+        return {
+            "close": float(close[-1]),
+            "change_pct": float((close[-1] / prev - 1) * 100) if prev > 0 else 0.0,
+            "volume": float(frame['Volume'].iloc[-1]),
+        }
+
+    def evaluate(self) -> List[Dict]:
+        """Evaluates the rules affected by the sessions published since the last call."""
+        with self._lock:
+            data = self.data_loader.get_data()
+            if data.empty or not self.rules:
+                return []
+            latest = data['Date'].iloc[-1]
+            if self._last_date is not None and latest <= self._last_date:
+                return []
+
+            with stage_timer("alerts.evaluate"):
+                candidates = self._candidates(self._changed_symbols(data))
+                frames = self.data_loader.get_many_stock_data(list(candidates))
+                wants_indicators = [s for s, ids in candidates.items()
+                                    if s in frames and any(self.rules[i]["field"] in INDICATOR_FIELDS for i in ids)]
+                indicators = self.indicators({s: frames[s] for s in wants_indicators}) if wants_indicators else {}
+
+                fired = []
+                for symbol, ids in candidates.items():
+                    frame = frames.get(symbol)
+                    if frame is None or frame.empty:
+                        continue
+                    values = {**self._quote(frame), **indicators.get(symbol, {})}
+                    date = frame['Date'].iloc[-1].strftime('%Y-%m-%d')
+                    for rule_id in ids:
+                        rule = self.rules[rule_id]
+                        value = values.get(rule["field"])
+                        if value is None:
+                            continue
+                        active = self._active.setdefault(rule_id, set())
+                        if not OPERATORS[rule["op"]](value, rule["threshold"]):
+                            active.discard(symbol)
+                            continue
+                        if symbol in active:
+                            continue
+                        active.add(symbol)
+                        self._seq += 1
+                        fired.append({"seq": self._seq, "rule_id": rule_id, "user": rule["user"],
+                                      "symbol": symbol, "field": rule["field"], "op": rule["op"],
+                                      "threshold": rule["threshold"], "value": round(float(value), 4),
+                                      "date": date, "triggered_at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+
+            self._last_date = latest
+            for alert in fired:
+                self.history.append(alert)
+                try:
+                    self.queue.put_nowait(alert)
+                except queue.Full:
+                    # Nobody is draining the queue; the history still has it
+                    pass
+            self._save()
+            return fired
+
+    def triggered(self, user: str, since: int = 0, limit: int = 100) -> List[Dict]:
+        """The user's alerts with a sequence number above `since`, oldest first."""
+        with self._lock:
+            alerts = [a for a in self.history if a["seq"] > since and a["user"] == user]
+        return alerts[:limit]
+
+    # Persistence
+
+    def _save(self):
+        if not self.storage_file:
+            return
+        state = {
+            "next_id": self._next_id,
+            "seq": self._seq,
+            "last_date": self._last_date.strftime('%Y-%m-%d') if self._last_date is not None else None,
+            "rules": list(self.rules.values()),
+            "active": {str(i): sorted(s) for i, s in self._active.items() if s},
+            "history": list(self.history),
+        }
+        tmp = self.storage_file + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.storage_file)
+
+    def _load(self):
+        if not self.storage_file or not os.path.exists(self.storage_file):
+            return
+        try:
+            with open(self.storage_file, 'r') as f:
+                state = json.load(f)
+            rules = {int(r["id"]): r for r in state["rules"]}
+            active = {int(i): set(s) for i, s in state.get("active", {}).items() if int(i) in rules}
+            last_date = pd.Timestamp(state["last_date"]) if state.get("last_date") else None
+            history = [dict(a, seq=int(a["seq"])) for a in state.get("history", [])]
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring saved alerts {self.storage_file}: {e}")
+            return
+        self.rules, self._active, self._last_date = rules, active, last_date
+        self.history.extend(history)
+        self._next_id = int(state.get("next_id", max(rules, default=0) + 1))
+        self._seq = int(state.get("seq", 0))
+        for rule in rules.values():
+            self._index_rule(rule)
@@ -0,0 +1,167 @@
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..core.metrics import stage_timer
+
+# timeframe -> pandas period frequency (BVMT weeks end on Friday)
+TIMEFRAMES = {
+    "D": None,
+    "W": "W-FRI",
+    "M": "M",
+    "Y": "Y",
+}
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: picks `n_out` points that preserve the visual shape
+    of the series. Always keeps the first and last points.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket is the third triangle vertex
+        nxt_end = edges[i + 2] if i + 2 < len(edges) else n
+        nxt_start = end
+        avg_x = x[nxt_start:nxt_end].mean() if nxt_end > nxt_start else x[-1]
+        avg_y = y[nxt_start:nxt_end].mean() if nxt_end > nxt_start else y[-1]
+        bx, by = x[start:end], y[start:end]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Keeps the min and max of each bucket (about `n_out` points in total), in order."""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    n_buckets = max(1, n_out // 2)
+    edges = np.linspace(0, n, n_buckets + 1).astype(int)
+    picked = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        seg = y[start:end]
+        picked.extend((start + int(np.argmin(seg)), start + int(np.argmax(seg))))
+    return np.unique(np.array(picked, dtype=int))
+
+
+def aggregate_ohlcv(df: pd.DataFrame, keys) -> pd.DataFrame:
+    """
+    OHLCV aggregation of daily rows grouped by `keys`.
+    Sessions without trades (Volume 0) carry a close but no open/high/low, so they are
+    ignored for open/high/low; volume and value are summed over every session.
+    """
+    traded = df['Volume'] > 0
+    work = pd.DataFrame({
+        'Date': df['Date'].to_numpy(),
+        'Open': df['Open'].where(traded & (df['Open'] > 0)).to_numpy(),
+        'High': df['High'].where(traded & (df['High'] > 0)).to_numpy(),
+        'Low': df['Low'].where(traded & (df['Low'] > 0)).to_numpy(),
+        'Close': df['Close'].to_numpy(),
+        'Volume': df['Volume'].to_numpy(),
+        'Value': df['Value'].to_numpy() if 'Value' in df.columns else 0.0,
+        '_key': np.asarray(keys),
+    })
+    grouped = work.groupby('_key', sort=True)
+    bars = pd.DataFrame({
+        'Date': grouped['Date'].first(),
+        'EndDate': grouped['Date'].last(),
+        'Open': grouped['Open'].first(),
+        'High': grouped['High'].max(),
+        'Low': grouped['Low'].min(),
+        'Close': grouped['Close'].last(),
+        'Volume': grouped['Volume'].sum(),
+        'Value': grouped['Value'].sum(),
+        'Sessions': grouped['Close'].size(),
+    })
+    # Periods with no trade at all: flat bar at the carried close
+    for col in ('Open', 'High', 'Low'):
+        bars[col] = bars[col].fillna(bars['Close'])
+    return bars.reset_index(drop=True)
+
+
+class BarStore:
+    """Weekly/monthly/yearly OHLCV bars per symbol, cached per data version."""
+
+    def __init__(self, data_loader, max_entries: int = 512):
+        self.data_loader = data_loader
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple[str, str, int], pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_bars(self, symbol: str, timeframe: str = "W") -> pd.DataFrame:
+        timeframe = timeframe.upper()
+        if timeframe not in TIMEFRAMES:
+            raise ValueError(f"Unknown timeframe '{timeframe}', expected one of {list(TIMEFRAMES)}")
+
+        key = (symbol, timeframe, self.data_loader.version)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        df = self.data_loader.get_stock_data(symbol)
+        if df.empty:
+            return pd.DataFrame()
+        with stage_timer("bars.aggregate"):
+            freq = TIMEFRAMES[timeframe]
+            if freq is None:
+                bars = aggregate_ohlcv(df, np.arange(len(df)))
+            else:
+                bars = aggregate_ohlcv(df, df['Date'].dt.to_period(freq).to_numpy())
+
+        with self._lock:
+            self._cache[key] = bars
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return bars
+
+    @staticmethod
+    def downsample_bars(bars: pd.DataFrame, max_points: int) -> pd.DataFrame:
+        """Merges consecutive bars into at most `max_points` bars, keeping true highs and lows."""
+        if max_points <= 0 or len(bars) <= max_points:
+            return bars
+        group = np.arange(len(bars)) * max_points // len(bars)
+        g = bars.groupby(group, sort=True)
+        return pd.DataFrame({
+            'Date': g['Date'].first(),
+            'EndDate': g['EndDate'].last(),
+            'Open': g['Open'].first(),
+            'High': g['High'].max(),
+            'Low': g['Low'].min(),
+            'Close': g['Close'].last(),
+            'Volume': g['Volume'].sum(),
+            'Value': g['Value'].sum(),
+            'Sessions': g['Sessions'].sum(),
+        }).reset_index(drop=True)
+
+
+def downsample_rows(df: pd.DataFrame, max_points: int, method: str = "lttb",
+                    column: str = 'Close') -> pd.DataFrame:
+    """Picks at most `max_points` rows of a date-ordered frame with a shape-preserving method."""
+    if max_points <= 0 or len(df) <= max_points:
+        return df
+    y = df[column].to_numpy(dtype=float)
+    if method == "minmax":
+        idx = minmax_indices(y, max_points)
+    else:
+        x = df['Date'].to_numpy().astype('datetime64[D]').astype(float)
+        idx = lttb_indices(x, y, max_points)
+    return df.iloc[idx]
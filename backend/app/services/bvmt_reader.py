@@ -0,0 +1,171 @@
+"""
+Reader for the BVMT `histo_cotation_*` exports.
+
+Two formats exist in the archive:
+- `.txt`: fixed-width columns under a header line and a dashed separator line.
+  Security names (VALEUR) contain spaces, so whitespace splitting is not an option.
+- `.csv`: semicolon separated with padded header names.
+
+Both use a comma as decimal separator and dd/mm/yyyy dates. The reader decodes
+numbers at parse time through pandas' C parser (`decimal=','`) into float64 arrays,
+parses dates with a fixed-format fast path and reads files in chunks of lines to
+bound peak memory. The result uses the loader's standardized column names.
+"""
+import io
+import os
+from itertools import islice
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+ENCODING = "latin-1"
+DEFAULT_CHUNK_ROWS = 200_000
+
+# BVMT column -> standardized name
+COLUMN_MAP = {
+    'SEANCE': 'Date',
+    'CODE': 'Symbol',
+    'VALEUR': 'Name',
+    'OUVERTURE': 'Open',
+    'CLOTURE': 'Close',
+    'PLUS_BAS': 'Low',
+    'PLUS_HAUT': 'High',
+    'QUANTITE_NEGOCIEE': 'Volume',
+    'CAPITAUX': 'Value',
+}
+NUMERIC_COLUMNS = {'OUVERTURE', 'CLOTURE', 'PLUS_BAS', 'PLUS_HAUT', 'QUANTITE_NEGOCIEE', 'CAPITAUX'}
+TEXT_COLUMNS = {'SEANCE', 'CODE', 'VALEUR'}
+
+
+def detect_columns(header: str, separator: str) -> List[Tuple[str, int, int]]:
+    """Column (name, start, end) spans from the runs of dashes in the separator line."""
+    spans = []
+    start = None
+    for i, ch in enumerate(separator + " "):
+        if ch == "-" and start is None:
+            start = i
+        elif ch != "-" and start is not None:
+            spans.append((header[start:i].strip(), start, i))
+            start = None
+    return spans
+
+
+def parse_dates(raw: pd.Series) -> pd.Series:
+    """dd/mm/yyyy fast path; anything else falls back to the generic day-first parser."""
+    raw = raw.str.strip()
+    parsed = pd.to_datetime(raw, format="%d/%m/%Y", errors="coerce")
+    retry = parsed.isna() & raw.notna() & (raw != "")
+    if retry.any():
+        parsed[retry] = pd.to_datetime(raw[retry], dayfirst=True, errors="coerce")
+    return parsed
+
+
+def _dtypes(columns: List[str]) -> Dict[str, str]:
+    return {c: ('float64' if c.strip() in NUMERIC_COLUMNS else 'str') for c in columns}
+
+
+def _read_delimited(buffer, names: List[str], header) -> pd.DataFrame:
+    """Parses one chunk of ';' separated text, decoding comma decimals at parse time."""
+    wanted = [n for n in names if n.strip() in COLUMN_MAP]
+    kwargs = dict(sep=';', decimal=',', encoding=ENCODING, header=header, usecols=wanted,
+                  skipinitialspace=True, on_bad_lines='skip')
+    if header is None:
+        kwargs['names'] = names
+    try:
+        return pd.read_csv(buffer, dtype=_dtypes(wanted), **kwargs)
+    except ValueError:
+        # A malformed number somewhere in the chunk: parse as text and coerce per column
+        buffer.seek(0)
+        chunk = pd.read_csv(buffer, dtype=str, **kwargs)
+        for col in chunk.columns:
+            if col.strip() in NUMERIC_COLUMNS:
+                chunk[col] = pd.to_numeric(
+                    chunk[col].str.strip().str.replace(',', '.', regex=False), errors='coerce')
+        return chunk
+
+
+def _standardize(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk.columns = [c.strip() for c in chunk.columns]
+    chunk = chunk.rename(columns=COLUMN_MAP)
+    for col in ('Symbol', 'Name'):
+        if col in chunk.columns:
+            chunk[col] = chunk[col].str.strip()
+    if 'Symbol' in chunk.columns:
+        chunk = chunk[chunk['Symbol'].notna() & (chunk['Symbol'] != '')]
+        chunk['Symbol'] = chunk['Symbol'].str.upper()
+    if 'Date' in chunk.columns:
+        chunk['Date'] = parse_dates(chunk['Date'])
+    return chunk
+
+
+def _fixed_width_chunks(path: str, chunk_rows: int) -> Iterator[bytes]:
+    """
+    Yields ';' separated byte blocks built from the fixed-width rows.
+    Lines are packed into a byte matrix as wide as the longest line and the first byte
+    of every inter-column gap is overwritten with ';', so the C parser can do the
+    actual decoding. The last column runs to the end of the line. Rows that would be
+    split wrongly (a ';' inside a field, or a field spilling over a gap) are skipped.
+    """
+    with open(path, 'rb') as f:
+        header = f.readline().decode(ENCODING).rstrip('\r\n')
+        separator = f.readline().decode(ENCODING).rstrip('\r\n')
+        spans = detect_columns(header, separator)
+        if not spans:
+            raise ValueError(f"No dashed separator line found in {os.path.basename(path)}")
+        gaps = [end for _, _, end in spans[:-1]]
+        names = ";".join(name for name, _, _ in spans).encode(ENCODING)
+        rejected = 0
+
+        while True:
+            lines = [l.rstrip(b'\r\n') for l in islice(f, chunk_rows)]
+            if not lines:
+                break
+            lines = [l for l in lines if l.strip()]
+            if not lines:
+                continue
+            width = max(spans[-1][2], max(len(l) for l in lines))
+            matrix = np.array(lines, dtype=f'S{width}').view(np.uint8).reshape(len(lines), width).copy()
+            matrix[matrix == 0] = ord(' ')
+            bad = (matrix == ord(';')).any(axis=1) | (matrix[:, gaps] != ord(' ')).any(axis=1)
+            if bad.any():
+                rejected += int(bad.sum())
+                matrix = matrix[~bad]
+            matrix[:, gaps] = ord(';')
+            block = np.hstack([matrix, np.full((len(matrix), 1), ord('\n'), dtype=np.uint8)])
+            yield names + b'\n' + block.tobytes()
+
+        if rejected:
+            print(f"Skipped {rejected} malformed rows in {os.path.basename(path)} "
+                  f"(';' in a field or a field wider than its column)")
+
+
+def read_txt(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> pd.DataFrame:
+    chunks = []
+    for block in _fixed_width_chunks(path, chunk_rows):
+        buffer = io.BytesIO(block)
+        names = block[:block.index(b'\n')].decode(ENCODING).split(';')
+        chunks.append(_standardize(_read_delimited(buffer, names, header=0)))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+
+def read_csv(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> pd.DataFrame:
+    with open(path, 'rb') as f:
+        names = f.readline().decode(ENCODING).rstrip('\r\n').split(';')
+        chunks = []
+        while True:
+            lines = list(islice(f, chunk_rows))
+            if not lines:
+                break
+            chunk = _read_delimited(io.BytesIO(b''.join(lines)), names, header=None)
+            chunks.append(_standardize(chunk))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+
+def read_bvmt_file(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> pd.DataFrame:
+    """Reads one history file into typed, standardized columns (Date, Symbol, Name, Open, ...)."""
+    if path.endswith('.txt'):
+        return read_txt(path, chunk_rows)
+    if path.endswith('.csv'):
+        return read_csv(path, chunk_rows)
+    raise ValueError(f"Unsupported history file: {os.path.basename(path)}")
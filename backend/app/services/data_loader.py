@@ -1,118 +1,226 @@
 import pandas as pd
 import os
 import glob
-from typing import List, Optional
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ..core.metrics import stage_timer
+from .bvmt_reader import read_bvmt_file
+from .panel import MarketPanel
+
+# Overridable so benchmarks and other machines can point at their own history files
+DEFAULT_DATA_DIR = os.environ.get("BVMT_DATA_DIR", "c:/Assistant_Intelligent_trading_bvmt/data")
+
+NUMERIC_COLUMNS = ['Open', 'Close', 'Low', 'High', 'Volume', 'Value']
 
 class DataLoader:
-    def __init__(self, data_dir: str = "c:/Assistant_Intelligent_trading_bvmt/data"):
-        self.data_dir = data_dir
+    def __init__(self, data_dir: Optional[str] = None, autoload: bool = True):
+        self.data_dir = data_dir or DEFAULT_DATA_DIR
         self.data = pd.DataFrame()
-        self._load_data()
+        # Bumped after every successful (re)load so caches can tell stale results apart
+        self.version = 0
+        self._symbol_rows = None
+        self._listeners: List[Callable[[int], None]] = []
+        # Date x symbol arrays of `data`, extended in place by append_session
+        self._panel = MarketPanel()
+        self._panel_lock = threading.Lock()
+        # (size, mtime) of each history file as last read, to spot new sessions on disk
+        self.files: Dict[str, Tuple[int, float]] = {}
+        self._refresh_lock = threading.Lock()
+        if autoload:
+            self.load()
+            self.build_index()
+
+    def load(self, progress: Optional[Callable[[int, int], None]] = None):
+        """(Re)loads all history files. `progress(done, total)` is called after each file."""
+        self._load_data(progress)
+
+    def build_index(self):
+        """Maps each symbol to its row positions so lookups skip the full-column scan."""
+        data = self.data
+        if data.empty:
+            self._symbol_rows = (data, {})
+            return
+        with stage_timer("loader.build_index"):
+            self._symbol_rows = (data, data.groupby('Symbol', sort=False).indices)
+        self.panel()
+        self._notify()
+
+    def add_listener(self, fn: Callable[[int], None]):
+        """`fn(version)` is called each time a new data version is indexed and ready to read."""
+        self._listeners.append(fn)
+
+    def _notify(self):
+        for fn in self._listeners:
+            try:
+                fn(self.version)
+            except Exception as e:
+                print(f"Data listener failed: {e}")
+
+    def _history_files(self) -> Dict[str, Tuple[int, float]]:
+        files = {}
+        for path in glob.glob(os.path.join(self.data_dir, "histo_cotation_*.???")):
+            if path.endswith(('.txt', '.csv')):
+                st = os.stat(path)
+                files[path] = (st.st_size, st.st_mtime)
+        return files
 
-    def _load_data(self):
+    def _load_data(self, progress: Optional[Callable[[int, int], None]] = None):
         """Loads and concatenates data from both CSV and TXT files."""
         print(f"Loading data from: {self.data_dir}")
         search_path = os.path.join(self.data_dir, "histo_cotation_*.???")
         all_files = glob.glob(search_path)
+        # Taken before reading, so a file written meanwhile is picked up by the next refresh
+        files = self._history_files()
         
         df_list = []
         
-        for file in all_files:
-            try:
-                temp_df = None
-                if file.endswith('.txt'):
-                    # Fixed width/Space separated with specific header handling
-                    # Skip the separator line (line 2)
-                    temp_df = pd.read_csv(
-                        file, 
-                        sep='\s+', 
-                        encoding='latin-1', # Common for legacy systems
-                        skiprows=[1],
-                        dayfirst=True,
-                        on_bad_lines='skip'
-                    )
-                elif file.endswith('.csv'):
-                    # Semicolon separated
-                    temp_df = pd.read_csv(
-                        file, 
-                        sep=';', 
-                        encoding='latin-1',
-                        dayfirst=True,
-                        on_bad_lines='skip'
-                    )
-                else:
+        with stage_timer("loader.read_files"):
+            for n_done, file in enumerate(all_files, start=1):
+                if progress:
+                    progress(n_done - 1, len(all_files))
+                if not file.endswith(('.txt', '.csv')):
                     continue
+                try:
+                    # Typed columns straight from the parser: comma decimals, dd/mm/yyyy dates
+                    temp_df = read_bvmt_file(file)
+                    df_list.append(temp_df)
+                    print(f"Loaded {os.path.basename(file)} with {len(temp_df)} rows")
                 
-                # Normalize columns
-                temp_df.columns = [c.strip() for c in temp_df.columns]
-                
-                # Map standardized names
-                rename_map = {
-                    'SEANCE': 'Date',
-                    'CODE': 'Symbol',
-                    'VALEUR': 'Name',
-                    'OUVERTURE': 'Open',
-                    'CLOTURE': 'Close',
-                    'PLUS_BAS': 'Low',
-                    'PLUS_HAUT': 'High',
-                    'QUANTITE_NEGOCIEE': 'Volume',
-                    'CAPITAUX': 'Value'
-                }
-                
-                # Filter mostly only valid columns
-                cols_to_keep = [c for c in temp_df.columns if c in rename_map]
-                temp_df = temp_df[cols_to_keep].rename(columns=rename_map)
-                
-                # Clean data
-                if 'Symbol' in temp_df.columns:
-                    temp_df = temp_df.dropna(subset=['Symbol'])
-                    temp_df['Symbol'] = temp_df['Symbol'].astype(str).str.strip().str.upper()
-                
-                df_list.append(temp_df)
-                print(f"Loaded {os.path.basename(file)} with {len(temp_df)} rows")
-                
-            except Exception as e:
-                print(f"Error loading {file}: {e}")
+                except Exception as e:
+                    print(f"Error loading {file}: {e}")
+            if progress:
+                progress(len(all_files), len(all_files))
 
         if df_list:
-            self.data = pd.concat(df_list, ignore_index=True)
+            # Build into a local frame and swap at the end so readers never see a half-converted reload
+            data = pd.concat(df_list, ignore_index=True)
             
-            # Convert numeric columns explicitly
-            numeric_cols = ['Open', 'Close', 'Low', 'High', 'Volume', 'Value']
-            for col in numeric_cols:
-                if col in self.data.columns:
-                    # Handle comma as decimal separator if string
-                    if self.data[col].dtype == object:
-                         self.data[col] = self.data[col].astype(str).str.replace(',', '.', regex=False)
-                    self.data[col] = pd.to_numeric(self.data[col], errors='coerce')
-                    # Fill NaNs with 0 for Volume/Value, maybe forward fill for prices?
-                    # For MVP, fill with 0 to avoid RuntimeWarnings in stats
-                    self.data[col] = self.data[col].fillna(0)
-            
-            # Parse Date
-            if 'Date' in self.data.columns:
-                # Ensure strings are stripped of whitespace which causes parsing errors for CSVs
-                if self.data['Date'].dtype == object:
-                    self.data['Date'] = self.data['Date'].astype(str).str.strip()
-                self.data['Date'] = pd.to_datetime(self.data['Date'], dayfirst=True, errors='coerce')
-                
-            self.data.dropna(subset=['Date', 'Close'], inplace=True)
-            self.data.sort_values('Date', inplace=True)
+            with stage_timer("loader.convert_numeric"):
+                for col in NUMERIC_COLUMNS:
+                    if col in data.columns:
+                        # For MVP, fill with 0 to avoid RuntimeWarnings in stats
+                        data[col] = data[col].fillna(0)
+                if 'Volume' in data.columns:
+                    data['Volume'] = data['Volume'].astype('int64')
+
+            with stage_timer("loader.sort"):
+                data.dropna(subset=['Date', 'Close'], inplace=True)
+                data.sort_values('Date', inplace=True)
             # Ensure index is unique if needed, but for now allow multiple rows per date (diff symbols)
-            print(f"Total data loaded: {len(self.data)} rows")
+            self.data = data
+            self.files = files
+            self.version += 1
+            print(f"Total data loaded: {len(data)} rows")
         else:
             print("No data loaded!")
 
+    def append_session(self, rows: pd.DataFrame):
+        """
+        Appends newly published rows (standardized columns, e.g. from `read_bvmt_file`)
+        without re-reading the history files.
+        """
+        if rows.empty:
+            return
+        rows = rows.copy()
+        for col in NUMERIC_COLUMNS:
+            if col in rows.columns:
+                rows[col] = rows[col].fillna(0)
+        if 'Volume' in rows.columns:
+            rows['Volume'] = rows['Volume'].astype('int64')
+        rows = rows.dropna(subset=['Date', 'Close'])
+
+        data = pd.concat([self.data, rows], ignore_index=True)
+        if not self.data.empty and rows['Date'].min() < self.data['Date'].iloc[-1]:
+            # Late rows: stable sort keeps the existing order within a date
+            data.sort_values('Date', kind='stable', inplace=True)
+        with self._panel_lock:
+            panel = self._panel
+            if panel.version == self.version and panel.can_extend(rows):
+                with stage_timer("loader.panel"):
+                    panel.extend(rows)
+                panel.version = self.version + 1
+            self.data = data
+            self.version += 1
+        self.build_index()
+
+    def refresh(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Picks up history files changed on disk since they were read. Rows dated after
+        the last loaded session are appended with `append_session`; a removed or
+        shrunk file, or `full`, reloads everything. Edits to past sessions in a
+        growing file are not detected; use `full` for those.
+        """
+        with self._refresh_lock:
+            current = self._history_files()
+            if not full and current == self.files:
+                return {"status": "unchanged", "rows": 0, "version": self.version}
+            shrunk = any(p not in current or current[p][0] < size for p, (size, _) in self.files.items())
+            if full or shrunk or self.data.empty:
+                self.load()
+                self.build_index()
+                return {"status": "reloaded", "rows": len(self.data), "version": self.version}
+
+            changed = [p for p, stat in current.items() if self.files.get(p) != stat]
+            last_date = self.data['Date'].iloc[-1]
+            new_rows = []
+            for path in sorted(changed):
+                try:
+                    rows = read_bvmt_file(path)
+                except Exception as e:
+                    print(f"Error reading {path}: {e}")
+                    current.pop(path)
+                    continue
+                rows = rows.dropna(subset=['Date'])
+                new_rows.append(rows[rows['Date'] > last_date])
+            rows = pd.concat(new_rows, ignore_index=True) if new_rows else pd.DataFrame()
+            # Files that failed to read keep their old stats, so they are retried next time
+            self.files = {**self.files, **current}
+            if rows.empty:
+                return {"status": "unchanged", "rows": 0, "version": self.version}
+            rows = rows.sort_values('Date', kind='stable')
+            self.append_session(rows)
+            print(f"Appended {len(rows)} new rows from {len(changed)} changed file(s)")
+            return {"status": "appended", "rows": len(rows), "version": self.version}
+
+    def panel(self) -> MarketPanel:
+        """
+        Read-only date x symbol panel (see `MarketPanel`) of the current data. New
+        sessions are appended to it in place; a reload or late rows rebuild it.
+        """
+        with self._panel_lock:
+            if self._panel.version != self.version:
+                with stage_timer("loader.panel"):
+                    self._panel = MarketPanel.from_frame(self.data, self.version)
+            return self._panel.snapshot()
+
     def get_data(self) -> pd.DataFrame:
         return self.data
 
     def get_stock_data(self, symbol: str) -> pd.DataFrame:
-        if self.data.empty:
+        data = self.data
+        if data.empty:
             return pd.DataFrame()
+        index = self._symbol_rows
+        if index is not None and index[0] is data:
+            rows = index[1].get(symbol)
+            # Rows are already in date order since the frame is sorted on load
+            return data.iloc[rows] if rows is not None else data.iloc[0:0]
         # Filter safely
-        filtered = self.data[self.data['Symbol'] == symbol].sort_values('Date')
+        filtered = data[data['Symbol'] == symbol].sort_values('Date')
         return filtered
 
+    def get_many_stock_data(self, symbols: List[str]) -> Dict[str, pd.DataFrame]:
+        """Per-symbol frames for several symbols in one pass; unknown symbols are omitted."""
+        data = self.data
+        if data.empty:
+            return {}
+        index = self._symbol_rows
+        if index is None or index[0] is not data:
+            wanted = data[data['Symbol'].isin(symbols)]
+            groups = {s: g for s, g in wanted.groupby('Symbol', sort=False)}
+            return {s: groups[s] for s in symbols if s in groups}
+        return {s: data.iloc[index[1][s]] for s in symbols if s in index[1]}
+
     def get_all_stocks(self) -> List[str]:
         if self.data.empty:
             return []
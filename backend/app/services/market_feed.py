@@ -0,0 +1,223 @@
+import asyncio
+import json
+from typing import Any, Callable, Dict, Optional, Set
+
+import pandas as pd
+from fastapi import WebSocket, WebSocketDisconnect
+
+from ..core.responses import dumps
+
+
+def latest_quotes(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """Last known quote per symbol with the change against its previous session."""
+    if df.empty:
+        return {}
+    last_two = df[['Symbol', 'Date', 'Close', 'Volume']].groupby('Symbol', sort=False).tail(2)
+    prev_close = last_two.groupby('Symbol', sort=False)['Close'].first()
+    last = last_two.groupby('Symbol', sort=False).tail(1).set_index('Symbol')
+
+    quotes = {}
+    for symbol, close, volume, day in zip(last.index, last['Close'].to_numpy(),
+                                          last['Volume'].to_numpy(), last['Date']):
+        prev = float(prev_close.get(symbol, close))
+        change = float(close) - prev
+        quotes[symbol] = {
+            "close": round(float(close), 3),
+            "change": round(change, 3),
+            "change_pct": round(change / prev * 100, 2) if prev > 0 else 0.0,
+            "volume": int(volume),
+            "date": day.strftime('%Y-%m-%d'),
+        }
+    return quotes
+
+
+def _anomaly_key(a: Dict) -> str:
+    return f"{a.get('symbol')}|{a.get('reason')}|{a.get('date')}"
+
+
+def _dumps(message: Dict) -> str:
+    return dumps(message).decode("utf-8")
+
+
+class _Subscriber:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        # None means every symbol
+        self.symbols: Optional[Set[str]] = None
+        self.version: Optional[int] = None
+
+
+class MarketFeed:
+    """
+    Push channel for the dashboard.
+
+    A snapshot (summary, mood, quotes, anomalies) is computed once per data version
+    and fanned out to every subscriber. Clients get a full snapshot first and then
+    only deltas: changed quotes, new anomalies and changed summary fields. Clients
+    can narrow quotes/anomalies to a set of symbols by sending
+    `{"action": "subscribe", "symbols": [...]}` (or `"unsubscribe"`).
+    """
+
+    def __init__(self, build_snapshot: Callable[[], Dict[str, Any]], get_version: Callable[[], int],
+                 is_ready: Callable[[], bool], poll_interval: float = 2.0):
+        self.build_snapshot = build_snapshot
+        self.get_version = get_version
+        self.is_ready = is_ready
+        self.poll_interval = poll_interval
+        self._subscribers: Dict[int, _Subscriber] = {}
+        self._version: Optional[int] = None
+        self._snapshot: Optional[Dict[str, Any]] = None
+        # Delta from the previous version to the current one, computed once per version
+        self._delta: Optional[Dict[str, Any]] = None
+        self._delta_from: Optional[int] = None
+        # Encoded messages for unfiltered subscribers, shared by all of them
+        self._encoded: Dict[str, str] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def _refresh(self) -> bool:
+        """Recomputes the snapshot if the data version moved. Returns True when it changed."""
+        version = self.get_version()
+        if self._version == version:
+            return False
+        async with self._lock:
+            if self._version == version:
+                return False
+            snapshot = await asyncio.to_thread(self.build_snapshot)
+            previous, previous_version = self._snapshot, self._version
+            self._snapshot, self._version = snapshot, version
+            self._delta = self._diff(previous, snapshot) if previous is not None else None
+            self._delta_from = previous_version
+            self._encoded = {}
+        return True
+
+    @staticmethod
+    def _diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+        old_quotes, new_quotes = old["quotes"], new["quotes"]
+        changed = {s: q for s, q in new_quotes.items() if old_quotes.get(s) != q}
+        removed = [s for s in old_quotes if s not in new_quotes]
+        seen = {_anomaly_key(a) for a in old["anomalies"]}
+        new_anomalies = [a for a in new["anomalies"] if _anomaly_key(a) not in seen]
+        summary = {k: v for k, v in new["summary"].items() if old["summary"].get(k) != v}
+        return {
+            "quotes": changed,
+            "removed_quotes": removed,
+            "anomalies": new_anomalies,
+            "summary": summary,
+            "mood": new["mood"] if new["mood"] != old["mood"] else None,
+        }
+
+    @staticmethod
+    def _filter(payload: Dict[str, Any], symbols: Optional[Set[str]]) -> Dict[str, Any]:
+        if symbols is None:
+            return payload
+        filtered = dict(payload)
+        filtered["quotes"] = {s: q for s, q in payload["quotes"].items() if s in symbols}
+        filtered["anomalies"] = [a for a in payload["anomalies"] if a.get("symbol") in symbols]
+        if "removed_quotes" in payload:
+            filtered["removed_quotes"] = [s for s in payload["removed_quotes"] if s in symbols]
+        return filtered
+
+    def _message_for(self, sub: _Subscriber) -> str:
+        """Delta if the subscriber is exactly one version behind, otherwise a full snapshot."""
+        if sub.version is not None and self._delta is not None and sub.version == self._delta_from:
+            kind, payload = "delta", self._delta
+        else:
+            kind, payload = "snapshot", self._snapshot
+        if sub.symbols is None and kind in self._encoded:
+            return self._encoded[kind]
+        message = {"type": kind, "version": self._version, **self._filter(payload, sub.symbols)}
+        text = _dumps(message)
+        if sub.symbols is None:
+            self._encoded[kind] = text
+        return text
+
+    async def _send(self, sub: _Subscriber, force_snapshot: bool = False):
+        if self._snapshot is None or (sub.version == self._version and not force_snapshot):
+            return
+        if force_snapshot:
+            sub.version = None
+        try:
+            await sub.websocket.send_text(self._message_for(sub))
+            sub.version = self._version
+        except Exception:
+            self._subscribers.pop(id(sub.websocket), None)
+
+    async def _broadcast(self):
+        await asyncio.gather(*(self._send(sub) for sub in list(self._subscribers.values())))
+
+    async def _run(self):
+        try:
+            while self._subscribers:
+                try:
+                    if self.is_ready() and await self._refresh():
+                        await self._broadcast()
+                except Exception as e:
+                    # e.g. a snapshot built mid-reload; the next poll tries again
+                    print(f"Market feed update failed: {e}")
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            self._task = None
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    @staticmethod
+    async def _send_error(sub: _Subscriber, detail: str):
+        await sub.websocket.send_text(_dumps({"type": "error", "detail": detail}))
+
+    async def _handle_message(self, sub: _Subscriber, text: str):
+        try:
+            msg = json.loads(text)
+        except json.JSONDecodeError:
+            await self._send_error(sub, "Invalid JSON")
+            return
+        if not isinstance(msg, dict):
+            await self._send_error(sub, "Expected a JSON object")
+            return
+        action = msg.get("action")
+        if action not in ("subscribe", "unsubscribe"):
+            await self._send_error(sub, f"Unknown action: {action}")
+            return
+        symbols = msg.get("symbols", [])
+        if symbols != "*" and not (isinstance(symbols, list) and all(isinstance(s, str) for s in symbols)):
+            await self._send_error(sub, "'symbols' must be \"*\" or a list of strings")
+            return
+
+        if action == "subscribe":
+            if symbols == "*":
+                sub.symbols = None
+            else:
+                sub.symbols = (sub.symbols or set()) | {s.upper() for s in symbols}
+        else:
+            if symbols == "*":
+                sub.symbols = set()
+            else:
+                base = sub.symbols if sub.symbols is not None else set((self._snapshot or {}).get("quotes", {}))
+                sub.symbols = base - {s.upper() for s in symbols}
+        # The subscription changed, so resend a snapshot for the new symbol set
+        await self._send(sub, force_snapshot=True)
+
+    async def serve(self, websocket: WebSocket):
+        await websocket.accept()
+        sub = _Subscriber(websocket)
+        self._subscribers[id(websocket)] = sub
+        try:
+            if self.is_ready():
+                await self._refresh()
+                await self._send(sub)
+            else:
+                await websocket.send_text(_dumps({"type": "status", "ready": False}))
+            self._ensure_running()
+            while True:
+                text = await websocket.receive_text()
+                await self._handle_message(sub, text)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._subscribers.pop(id(websocket), None)
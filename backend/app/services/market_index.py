@@ -0,0 +1,268 @@
+"""
+Chained, divisor-adjusted market index.
+
+For each session t the index moves by the ratio of the weighted market value of the
+constituents quoted on both t-1 and t:
+
+    I_t = I_{t-1} * sum(q_i * P_i,t) / sum(q_i * P_i,t-1)
+
+Closes are carried forward over sessions without a quote, so a name that doesn't
+trade leaves the index unchanged instead of dropping out of it, and listings,
+delistings and reweighting never cause jumps. The divisor is the market value over
+the index level.
+
+Methods:
+- "price": every constituent has q_i = 1 (price-weighted).
+- "value": q_i is the average traded value (CAPITAUX) over the previous
+  WEIGHT_WINDOW sessions divided by the price, reset at each quarter. The exports
+  carry no share counts, so traded value stands in for capitalization.
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..core.metrics import stage_timer
+from .panel import MarketPanel
+
+INDEX_METHODS = ("price", "value")
+BASE_LEVEL = 1000.0
+WEIGHT_WINDOW = 250
+
+
+def chain_index(prices: np.ndarray, weights: np.ndarray, prev_prices: np.ndarray, prev_level: float):
+    """
+    Chains levels over sessions x symbols `prices` (carried forward, NaN before a
+    listing) with per-session `weights`. `prev_prices` are the closes before the first
+    row. Returns (levels, divisors).
+    """
+    before = np.vstack([prev_prices[None, :], prices[:-1]])
+    both = np.isfinite(prices) & np.isfinite(before) & np.isfinite(weights)
+    num = np.where(both, weights * prices, 0.0).sum(axis=1)
+    den = np.where(both, weights * before, 0.0).sum(axis=1)
+    ratio = np.where(den > 0, num / np.where(den > 0, den, 1.0), 1.0)
+    levels = prev_level * np.cumprod(ratio)
+    quoted = np.isfinite(prices) & np.isfinite(weights)
+    market_value = np.where(quoted, weights * prices, 0.0).sum(axis=1)
+    return levels, market_value / levels
+
+
+def quarter_of(dates: np.ndarray) -> np.ndarray:
+    idx = pd.DatetimeIndex(dates)
+    return np.asarray(idx.year * 4 + (idx.month - 1) // 3)
+
+
+def value_weights(prices: np.ndarray, values: np.ndarray, periods: np.ndarray, first: int,
+                  initial: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Share-equivalent weights for rows `first:`, reset on the first session of each
+    quarter. Rows before `first` only provide the trailing traded value; `initial`
+    carries the weights in force before `first`.
+    """
+    n_rows, n_sym = prices.shape
+    q = np.full((n_rows, n_sym), np.nan)
+    is_set = np.zeros(n_rows, dtype=bool)
+    if initial is not None and first < n_rows:
+        q[first], is_set[first] = initial, True
+
+    csum = np.vstack([np.zeros(n_sym), np.cumsum(np.nan_to_num(values), axis=0)])
+    for t in range(first, n_rows):
+        if t > 0 and periods[t] == periods[t - 1] and not (t == first and initial is None):
+            continue
+        if t == 0:
+            avg, px = np.nan_to_num(values[0]), prices[0]
+        else:
+            lo = max(0, t - WEIGHT_WINDOW)
+            avg, px = (csum[t] - csum[lo]) / (t - lo), prices[t - 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            q[t] = np.where((avg > 0) & (px > 0), avg / px, np.nan)
+        is_set[t] = True
+
+    # Carry each reset forward to the following sessions
+    last_set = np.maximum.accumulate(np.where(is_set, np.arange(n_rows), 0))
+    return q[last_set][first:]
+
+
+def _floats(values) -> List[Optional[float]]:
+    return [float(v) if np.isfinite(v) else None for v in values]
+
+
+def _array(values) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+class MarketIndex:
+    """
+    Index series for every method, computed on the loader's market panel and kept
+    in step with its data version. New sessions are chained onto the stored levels; the series is rebuilt in one
+    vectorized pass only when earlier history changed. Saved to `storage_file`.
+    """
+
+    def __init__(self, data_loader, storage_file: str = "market_index.json"):
+        self.data_loader = data_loader
+        self.storage_file = storage_file
+        self.version: Optional[int] = None
+        self.dates = np.array([], dtype='datetime64[ns]')
+        self.levels: Dict[str, np.ndarray] = {}
+        self.divisors: Dict[str, np.ndarray] = {}
+        # Carry-over state for extending: constituents and their current weights
+        self._symbols: List[str] = []
+        self._weights: Dict[str, np.ndarray] = {}
+        self._n_rows = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def refresh(self):
+        version = self.data_loader.version
+        if self.version == version:
+            return
+        with self._lock:
+            if self.version == version:
+                return
+            panel = self.data_loader.panel()
+            data = self.data_loader.get_data()
+            with stage_timer("index.compute"):
+                changed = self._extend(panel, data)
+                if changed is None:
+                    self._rebuild(panel, data)
+                    changed = True
+            if changed:
+                self._save()
+            self.version = panel.version
+
+    def _compute(self, panel: MarketPanel, first: int, prev_levels: Dict[str, float]):
+        """Chains panel rows `first:` and updates the carry-over state."""
+        # Enough trailing sessions for the value weights of a quarter reset
+        start = max(0, first - WEIGHT_WINDOW)
+        prices = panel.ffill("close", panel.priced)[start:]
+        values = panel.value[start:]
+        dates = panel.dates[start:]
+        first -= start
+        n_sym = prices.shape[1]
+        prev = prices[first - 1] if first > 0 else np.full(n_sym, np.nan)
+        new_prices = prices[first:]
+
+        levels, divisors, weights = {}, {}, {}
+        periods = quarter_of(dates)
+        for method in INDEX_METHODS:
+            if method == "price":
+                w = np.where(np.isfinite(new_prices), 1.0, np.nan)
+            else:
+                initial = self._carried_weights(method, panel) if first > 0 else None
+                w = value_weights(prices, values, periods, first, initial)
+            levels[method], divisors[method] = chain_index(new_prices, w, prev, prev_levels.get(method, BASE_LEVEL))
+            weights[method] = w[-1]
+
+        self._symbols = panel.symbols
+        self._weights = weights
+        return dates[first:], levels, divisors
+
+    def _carried_weights(self, method: str, panel: MarketPanel) -> Optional[np.ndarray]:
+        """The stored weights of `method`, laid out on the panel's symbols."""
+        stored = self._weights.get(method)
+        if stored is None:
+            return None
+        weights = np.full(panel.shape[1], np.nan)
+        for symbol, w in zip(self._symbols, stored):
+            j = panel.column(symbol)
+            if j is not None:
+                weights[j] = w
+        return weights
+
+    def _rebuild(self, panel: MarketPanel, data: pd.DataFrame):
+        self._symbols, self._weights = [], {}
+        self.dates = np.array([], dtype='datetime64[ns]')
+        self.levels, self.divisors = {}, {}
+        self._n_rows = 0
+        if not panel.shape[0]:
+            return
+        self.dates, self.levels, self.divisors = self._compute(panel, 0, {})
+        self._n_rows = len(data)
+
+    def _extend(self, panel: MarketPanel, data: pd.DataFrame) -> Optional[bool]:
+        """
+        Chains the sessions after the last stored one. Returns whether anything was added,
+        or None when earlier history changed and a rebuild is needed.
+        """
+        if not len(self.dates) or data.empty or not self._weights:
+            return None
+        last = self.dates[-1]
+        first = panel.position(last) + 1
+        cut = int(np.searchsorted(data['Date'].to_numpy(), last, side='right'))
+        # Same sessions and rows up to the last stored one, otherwise history was rewritten
+        if first != len(self.dates) or panel.dates[first - 1] != last or cut != self._n_rows:
+            return None
+        if first == panel.shape[0]:
+            return False
+
+        new_dates, levels, divisors = self._compute(
+            panel, first, {m: float(self.levels[m][-1]) for m in INDEX_METHODS})
+        self.dates = np.concatenate([self.dates, new_dates])
+        for m in INDEX_METHODS:
+            self.levels[m] = np.concatenate([self.levels[m], levels[m]])
+            self.divisors[m] = np.concatenate([self.divisors[m], divisors[m]])
+        self._n_rows = len(data)
+        return True
+
+    def _save(self):
+        if not self.storage_file:
+            return
+        state = {
+            "base": BASE_LEVEL,
+            "rows": self._n_rows,
+            "dates": [str(d)[:10] for d in self.dates],
+            "levels": {m: _floats(v) for m, v in self.levels.items()},
+            "divisors": {m: _floats(v) for m, v in self.divisors.items()},
+            "symbols": self._symbols,
+            "weights": {m: _floats(v) for m, v in self._weights.items()},
+        }
+        with stage_timer("index.save"), open(self.storage_file, 'w') as f:
+            json.dump(state, f)
+
+    def _load(self):
+        if not self.storage_file or not os.path.exists(self.storage_file):
+            return
+        try:
+            with open(self.storage_file, 'r') as f:
+                state = json.load(f)
+            if state.get("base") != BASE_LEVEL or set(state["levels"]) != set(INDEX_METHODS):
+                return
+            self.dates = np.array(state["dates"], dtype='datetime64[ns]')
+            self.levels = {m: _array(v) for m, v in state["levels"].items()}
+            self.divisors = {m: _array(v) for m, v in state["divisors"].items()}
+            self._symbols = list(state["symbols"])
+            self._weights = {m: _array(v) for m, v in state["weights"].items()}
+            self._n_rows = int(state["rows"])
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring saved index {self.storage_file}: {e}")
+            self.dates = np.array([], dtype='datetime64[ns]')
+            self.levels, self.divisors, self._weights = {}, {}, {}
+
+    def series(self, method: str = "value", start: Optional[str] = None, end: Optional[str] = None) -> pd.DataFrame:
+        """Date, Level, Divisor and ChangePct for `method`, optionally limited to [start, end]."""
+        if method not in INDEX_METHODS:
+            raise ValueError(f"Unknown index method '{method}', expected one of {list(INDEX_METHODS)}")
+        self.refresh()
+        dates, levels, divisors = self.dates, self.levels.get(method), self.divisors.get(method)
+        if levels is None or not len(dates):
+            return pd.DataFrame(columns=['Date', 'Level', 'Divisor', 'ChangePct'])
+        change = np.concatenate([[0.0], (levels[1:] / levels[:-1] - 1) * 100])
+        df = pd.DataFrame({'Date': pd.to_datetime(dates), 'Level': levels.round(4),
+                           'Divisor': divisors.round(6), 'ChangePct': change.round(4)})
+        if start:
+            df = df[df['Date'] >= pd.Timestamp(start)]
+        if end:
+            df = df[df['Date'] <= pd.Timestamp(end)]
+        return df
+
+    def latest(self, method: str = "value") -> Dict[str, float]:
+        """Last level and its change (%) against the previous session."""
+        self.refresh()
+        levels = self.levels.get(method)
+        if levels is None or not len(levels):
+            return {"value": 0.0, "change": 0.0}
+        prev = levels[-2] if len(levels) > 1 else levels[-1]
+        return {"value": float(levels[-1]), "change": float((levels[-1] / prev - 1) * 100)}
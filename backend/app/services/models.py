@@ -1,8 +1,24 @@
+import warnings
 import pandas as pd
 import numpy as np
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 from typing import List, Dict, Any
+from ..core.metrics import stage_timer
+from .panel import MarketPanel
+
+def forecast_trend(df: pd.DataFrame, prediction: List[Dict]) -> str:
+    """Compares the 7-day forecast average with the last 5 closes."""
+    current_avg = df.iloc[-5:]['Close'].mean() if len(df) >= 5 else df['Close'].mean()
+    future_avg = np.mean([p['price'] for p in prediction]) if prediction else current_avg
+    
+    if not prediction or abs(future_avg - current_avg) < 1e-6:
+        trend = "NEUTRAL"
+    else:
+        trend = "BULLISH" if future_avg > current_avg else "BEARISH"
+        if abs(future_avg - current_avg) / (current_avg + 1e-9) < 0.01:
+            trend = "NEUTRAL"
+    return trend
 
 class PricePredictor:
     def __init__(self):
@@ -21,23 +37,25 @@ class PricePredictor:
             self.is_trained = False
             return
 
-        df = df.sort_values('Date')
-        
-        # Use last 90 points if available for better trend
-        train_data = df.tail(90).copy()
-        train_data['DayIndex'] = np.arange(len(train_data))
-        
-        X = train_data[['DayIndex']]
-        y_price = train_data['Close']
-        y_vol = train_data['Volume']
-        
-        # Train Price Model
-        self.price_model.fit(X, y_price)
-        price_preds = self.price_model.predict(X)
+        with stage_timer("predictor.prepare"):
+            df = df.sort_values('Date')
+            
+            # Use last 90 points if available for better trend
+            train_data = df.tail(90).copy()
+            train_data['DayIndex'] = np.arange(len(train_data))
+            
+            X = train_data[['DayIndex']]
+            y_price = train_data['Close']
+            y_vol = train_data['Volume']
         
-        # Train Volume Model
-        self.volume_model.fit(X, y_vol)
-        vol_preds = self.volume_model.predict(X)
+        with stage_timer("predictor.fit"):
+            # Train Price Model
+            self.price_model.fit(X, y_price)
+            price_preds = self.price_model.predict(X)
+            
+            # Train Volume Model
+            self.volume_model.fit(X, y_vol)
+            vol_preds = self.volume_model.predict(X)
         
         # Calculate Metrics
         self.metrics = {
@@ -63,95 +81,138 @@ class PricePredictor:
         price_predictions = self.price_model.predict(future_df)
         vol_predictions = self.volume_model.predict(future_df)
         
-        forecast = []
-        for i in range(len(price_predictions)):
-            forecast.append({
-                "day": int(i + 1), 
-                "price": round(float(price_predictions[i]), 3),
-                "volume": round(float(max(0, vol_predictions[i])), 0)
-            })
+        prices = np.round(np.asarray(price_predictions, dtype=float), 3).tolist()
+        volumes = np.round(np.maximum(0, np.asarray(vol_predictions, dtype=float)), 0).tolist()
+        forecast = [{"day": i + 1, "price": p, "volume": v} for i, (p, v) in enumerate(zip(prices, volumes))]
             
         return {
             "forecast": forecast,
             "metrics": self.metrics
         }
 
-class AnomalyDetector:
-    def detect(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def batch_forecast(self, frames: Dict[str, pd.DataFrame], days: int = 7) -> Dict[str, Dict[str, Any]]:
         """
-        Efficiently detects anomalies using vectorized operations.
-        - Calculates stats for all relevant symbols in one pass.
-        - Detects Volume Spikes and Abnormal Price Jumps/Drops.
+        `train` + `predict` for many symbols in one vectorized pass.
+        Each symbol's last 90 sessions are packed into a padded matrix and both linear
+        trends (price and volume) are solved in closed form, which is the same ordinary
+        least squares fit LinearRegression performs on a single feature.
         """
+        results = {s: {"forecast": [], "metrics": {}} for s in frames}
+        symbols = [s for s, f in frames.items() if f is not None and len(f) >= 15]
+        if not symbols:
+            return results
+
+        with stage_timer("predictor.batch_fit"):
+            window = 90
+            lengths = np.array([min(len(frames[s]), window) for s in symbols])
+            prices = np.zeros((len(symbols), window))
+            volumes = np.zeros((len(symbols), window))
+            for i, s in enumerate(symbols):
+                tail = frames[s].tail(window)
+                prices[i, :lengths[i]] = tail['Close'].to_numpy(dtype=float)
+                volumes[i, :lengths[i]] = tail['Volume'].to_numpy(dtype=float)
+
+            x = np.arange(window)[None, :].astype(float)
+            mask = x < lengths[:, None]
+            n = lengths.astype(float)
+            x_mean = (n - 1) / 2
+            x_c = np.where(mask, x - x_mean[:, None], 0.0)
+            sxx = (x_c ** 2).sum(axis=1)
+
+            def fit(y):
+                y_mean = np.where(mask, y, 0.0).sum(axis=1) / n
+                slope = (x_c * np.where(mask, y - y_mean[:, None], 0.0)).sum(axis=1) / sxx
+                intercept = y_mean - slope * x_mean
+                resid = np.where(mask, y - (intercept[:, None] + slope[:, None] * x), 0.0)
+                rmse = np.sqrt((resid ** 2).sum(axis=1) / n)
+                mae = np.abs(resid).sum(axis=1) / n
+                return slope, intercept, rmse, mae
+
+            p_slope, p_int, p_rmse, p_mae = fit(prices)
+            v_slope, v_int, v_rmse, v_mae = fit(volumes)
+
+            future = lengths[:, None] + np.arange(days)[None, :]
+            price_preds = p_int[:, None] + p_slope[:, None] * future
+            vol_preds = np.maximum(0, v_int[:, None] + v_slope[:, None] * future)
+
+        price_rows = np.round(price_preds, 3).tolist()
+        vol_rows = np.round(vol_preds, 0).tolist()
+        for i, s in enumerate(symbols):
+            results[s] = {
+                "forecast": [
+                    {"day": d + 1, "price": p, "volume": v}
+                    for d, (p, v) in enumerate(zip(price_rows[i], vol_rows[i]))
+                ],
+                "metrics": {
+                    "price": {"rmse": round(float(p_rmse[i]), 4), "mae": round(float(p_mae[i]), 4)},
+                    "volume": {"rmse": round(float(v_rmse[i]), 4), "mae": round(float(v_mae[i]), 4)},
+                },
+            }
+        return results
+
+class AnomalyDetector:
+    def detect(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Anomalies of the latest session in a long market frame (see `detect_panel`)."""
         if df is None or df.empty:
             return []
-            
-        anomalies = []
-        
-        # 1. Identify latest date and symbols present
-        latest_date = df['Date'].max()
-        latest_data = df[df['Date'] == latest_date].copy()
-        target_symbols = latest_data['Symbol'].unique()
-        
-        # 2. Filter historical data to relevant symbols to speed up aggregation
-        hist_df = df[df['Symbol'].isin(target_symbols)].sort_values(['Symbol', 'Date'])
-        
-        if hist_df.empty:
+        with stage_timer("anomaly.panel"):
+            panel = MarketPanel.from_frame(df)
+        return self.detect_panel(panel)
+
+    def detect_panel(self, panel: MarketPanel) -> List[Dict[str, Any]]:
+        """
+        Detects Volume Spikes and Abnormal Price Jumps/Drops for the symbols quoted in
+        the panel's last session, against each symbol's own history: all its volumes,
+        and its returns from one quote to the next.
+        """
+        n_rows, _ = panel.shape
+        if n_rows == 0:
             return []
 
-        # 3. Calculate Volume Stats (Vectorized)
-        vol_stats = hist_df.groupby('Symbol')['Volume'].agg(['mean', 'std']).reset_index()
-        vol_stats.columns = ['Symbol', 'mean_vol', 'std_vol']
-        
-        # 4. Calculate Return Stats (Vectorized)
-        # We need per-symbol returns first
-        hist_df['Return'] = hist_df.groupby('Symbol')['Close'].pct_change()
-        ret_stats = hist_df.dropna(subset=['Return']).groupby('Symbol')['Return'].agg(['mean', 'std']).reset_index()
-        ret_stats.columns = ['Symbol', 'mean_ret', 'std_ret']
-        
-        # 5. Merge all stats back to latest_data
-        merged = latest_data.merge(vol_stats, on='Symbol', how='left')
-        merged = merged.merge(ret_stats, on='Symbol', how='left')
-        
-        # 6. Calculate Latest Return
-        # We need the last return from hist_df for each symbol
-        latest_returns = hist_df.groupby('Symbol').tail(1)[['Symbol', 'Return']]
-        merged = merged.merge(latest_returns, on='Symbol', how='left')
-
-        # 7. Iterate and Flag
-        for _, row in merged.iterrows():
-            sym = row['Symbol']
-            
-            # Volume Check
-            if pd.notna(row['std_vol']) and row['std_vol'] > 1e-9:
-                z_vol = (row['Volume'] - row['mean_vol']) / row['std_vol']
-                if z_vol > 3:
-                     anomalies.append({
+        with stage_timer("anomaly.stats"):
+            latest_date = pd.Timestamp(panel.dates[-1]).strftime('%Y-%m-%d')
+            targets = np.flatnonzero(panel.valid[-1])
+            volumes = panel.volume[:, targets]
+            returns = panel.returns()[:, targets]
+            with warnings.catch_warnings():
+                # Symbols with fewer than two observations get NaN stats, as in pandas
+                warnings.simplefilter("ignore", RuntimeWarning)
+                mean_vol = np.nanmean(volumes, axis=0)
+                std_vol = np.nanstd(volumes, axis=0, ddof=1)
+                mean_ret = np.nanmean(returns, axis=0)
+                std_ret = np.nanstd(returns, axis=0, ddof=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z_vol = np.where(std_vol > 1e-9, (volumes[-1] - mean_vol) / std_vol, np.nan)
+                z_ret = np.where(std_ret > 1e-9, (returns[-1] - mean_ret) / std_ret, np.nan)
+
+        anomalies = []
+        with stage_timer("anomaly.flag"):
+            symbols = panel.symbols
+            flagged = (z_vol > 3) | (z_ret < -3) | (z_ret > 3)
+            for k in np.flatnonzero(flagged):
+                sym = symbols[targets[k]]
+                if z_vol[k] > 3:
+                    anomalies.append({
                         "symbol": sym,
-                        "date": latest_date.strftime('%Y-%m-%d'),
+                        "date": latest_date,
                         "reason": "Volume Spike",
-                        "details": f"Volume {row['Volume']:,.0f} is {z_vol:.1f}x std dev above mean",
+                        "details": f"Volume {volumes[-1, k]:,.0f} is {z_vol[k]:.1f}x std dev above mean",
                         "severity": "High"
                     })
-
-            # Return Check
-            if pd.notna(row['std_ret']) and row['std_ret'] > 1e-9:
-                z_ret = (row['Return'] - row['mean_ret']) / row['std_ret']
-                if z_ret < -3:
-                     anomalies.append({
+                if z_ret[k] < -3:
+                    anomalies.append({
                         "symbol": sym,
-                        "date": latest_date.strftime('%Y-%m-%d'),
+                        "date": latest_date,
                         "reason": "Abnormal Price Drop",
-                        "details": f"Return {row['Return']:.2%} is {z_ret:.1f}x std dev below mean",
+                        "details": f"Return {returns[-1, k]:.2%} is {z_ret[k]:.1f}x std dev below mean",
                         "severity": "High"
                     })
-                elif z_ret > 3:
-                     anomalies.append({
+                elif z_ret[k] > 3:
+                    anomalies.append({
                         "symbol": sym,
-                        "date": latest_date.strftime('%Y-%m-%d'),
+                        "date": latest_date,
                         "reason": "Abnormal Price Jump",
-                        "details": f"Return {row['Return']:.2%} is {z_ret:.1f}x std dev above mean",
+                        "details": f"Return {returns[-1, k]:.2%} is {z_ret[k]:.1f}x std dev above mean",
                         "severity": "Medium"
                     })
-                    
         return anomalies
@@ -0,0 +1,219 @@
+"""
+Dense date x symbol panel of the market history.
+
+The long frame (one row per symbol and session) is pivoted onto the trading
+calendar, the sessions with at least one quote, as 2-D float arrays for close,
+volume and value. `valid` marks the cells where the symbol was quoted; other cells
+are NaN. Several rows for the same session and symbol keep the last close and sum
+volume and value.
+
+Rows and columns are allocated with spare capacity, so a new session is written
+into the next free row in place instead of re-pivoting the history. `snapshot()`
+returns a read-only view with a fixed shape over the same buffers. Extending the
+store only writes past that shape or into new buffers, so a snapshot never changes
+under a reader.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ("close", "volume", "value")
+
+
+def _capacity(n: int) -> int:
+    return max(16, int(n * 1.25) + 8)
+
+
+class MarketPanel:
+    def __init__(self, version: Optional[int] = None):
+        # Data version of the loader this panel was built from
+        self.version = version
+        self._dates = np.empty(0, dtype='datetime64[ns]')
+        self._symbols: List[str] = []
+        self._column: Dict[str, int] = {}
+        self._arrays: Dict[str, np.ndarray] = {f: np.empty((0, 0)) for f in FIELDS}
+        self._valid = np.zeros((0, 0), dtype=bool)
+        self._shape: Tuple[int, int] = (0, 0)
+        self._read_only = False
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, version: Optional[int] = None) -> "MarketPanel":
+        """Builds the panel from a long frame sorted by date (the loader's layout)."""
+        panel = cls(version)
+        panel.extend(df)
+        return panel
+
+    # Shape and views
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self._shape
+
+    @property
+    def dates(self) -> np.ndarray:
+        return self._dates[:self._shape[0]]
+
+    @property
+    def symbols(self) -> List[str]:
+        return self._symbols[:self._shape[1]]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.field("close")
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.field("volume")
+
+    @property
+    def value(self) -> np.ndarray:
+        return self.field("value")
+
+    @property
+    def valid(self) -> np.ndarray:
+        n, m = self._shape
+        return self._valid[:n, :m]
+
+    def field(self, name: str) -> np.ndarray:
+        n, m = self._shape
+        return self._arrays[name][:n, :m]
+
+    def column(self, symbol: str) -> Optional[int]:
+        j = self._column.get(symbol)
+        return j if j is not None and j < self._shape[1] else None
+
+    def snapshot(self) -> "MarketPanel":
+        """Read-only view of the current sessions and symbols, sharing the buffers."""
+        view = MarketPanel(self.version)
+        view._dates, view._symbols, view._column = self._dates, self._symbols, self._column
+        view._arrays, view._valid = self._arrays, self._valid
+        view._shape = self._shape
+        view._read_only = True
+        return view
+
+    # Extension
+
+    def can_extend(self, rows: pd.DataFrame) -> bool:
+        """Whether `rows` only holds sessions after the last one, so `extend` can append them."""
+        n = self._shape[0]
+        return rows.empty or n == 0 or rows['Date'].min() > self._dates[n - 1]
+
+    def extend(self, rows: pd.DataFrame):
+        """Appends the sessions of `rows` (dated after the last session) in place."""
+        if self._read_only:
+            raise ValueError("Panel snapshots are read-only")
+        if rows.empty:
+            return
+        if not self.can_extend(rows):
+            raise ValueError("Rows must be dated after the panel's last session; rebuild instead")
+
+        dates = rows['Date'].to_numpy(dtype='datetime64[ns]')
+        new_dates, row_of = np.unique(dates, return_inverse=True)
+        symbols = rows['Symbol'].to_numpy(dtype=object)
+        for s in pd.unique(symbols):
+            if s not in self._column:
+                self._column[s] = len(self._symbols)
+                self._symbols.append(s)
+
+        n, m = self._shape
+        n_new, m_new = n + len(new_dates), len(self._symbols)
+        self._reserve(n_new, m_new)
+        self._dates[n:n_new] = new_dates
+
+        r = n + row_of
+        c = np.array([self._column[s] for s in symbols], dtype=np.intp) if len(symbols) else np.empty(0, dtype=np.intp)
+        # Last close wins, volume and value add up over duplicate rows
+        flat = row_of * m_new + c
+        _, from_end = np.unique(flat[::-1], return_index=True)
+        last = len(flat) - 1 - from_end
+        self._arrays["close"][r[last], c[last]] = rows['Close'].to_numpy(dtype=float)[last]
+        present = np.zeros((n_new - n, m_new), dtype=bool)
+        present[row_of, c] = True
+        for name, col in (("volume", "Volume"), ("value", "Value")):
+            if col not in rows.columns:
+                continue
+            block = np.zeros((n_new - n, m_new))
+            np.add.at(block, (row_of, c), rows[col].to_numpy(dtype=float))
+            self._arrays[name][n:n_new, :m_new] = np.where(present, block, np.nan)
+        self._valid[r, c] = True
+        # Publish the new shape last, once every cell is written
+        self._shape = (n_new, m_new)
+
+    def _reserve(self, n_rows: int, n_cols: int):
+        rows_cap, cols_cap = self._valid.shape
+        if n_rows <= rows_cap and n_cols <= cols_cap:
+            return
+        # Buffers are replaced, never resized, so existing snapshots keep theirs
+        new_rows = _capacity(n_rows) if n_rows > rows_cap else rows_cap
+        new_cols = _capacity(n_cols) if n_cols > cols_cap else cols_cap
+        n, m = self._shape
+        dates = np.empty(new_rows, dtype='datetime64[ns]')
+        dates[:n] = self._dates[:n]
+        arrays = {}
+        for name, old in self._arrays.items():
+            arr = np.full((new_rows, new_cols), np.nan)
+            arr[:n, :m] = old[:n, :m]
+            arrays[name] = arr
+        valid = np.zeros((new_rows, new_cols), dtype=bool)
+        valid[:n, :m] = self._valid[:n, :m]
+        self._dates, self._arrays, self._valid = dates, arrays, valid
+
+    # Accessors
+
+    def position(self, date) -> int:
+        """Row of the last session on or before `date` (-1 when there is none)."""
+        return int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date), 'ns'), side='right')) - 1
+
+    @property
+    def priced(self) -> np.ndarray:
+        """Cells quoted at a positive close (the loader stores a missing close as 0)."""
+        return self.valid & (self.close > 0)
+
+    def ffill(self, name: str = "close", where: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        The field with each symbol's last value carried over the sessions it wasn't
+        quoted. `where` overrides which cells count as quoted (default `valid`).
+        """
+        values = self.field(name)
+        valid = self.valid if where is None else where
+        if not values.size:
+            return values.copy()
+        rows = np.where(valid, np.arange(values.shape[0])[:, None], -1)
+        last = np.maximum.accumulate(rows, axis=0)
+        out = values[np.maximum(last, 0), np.arange(values.shape[1])[None, :]]
+        out[last < 0] = np.nan
+        return out
+
+    def returns(self, log: bool = False) -> np.ndarray:
+        """
+        Per-session returns on the sessions a symbol was quoted at a positive close,
+        against its previous such quote (so gaps don't split a return); NaN elsewhere
+        and on the first quote.
+        """
+        close, priced = self.close, self.priced
+        if not close.size:
+            return close.copy()
+        prev = np.vstack([np.full((1, close.shape[1]), np.nan), self.ffill("close", priced)[:-1]])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = np.log(close / prev) if log else close / prev - 1
+        out[~priced] = np.nan
+        return out
+
+    def cross_section(self, at: int = -1, valid_only: bool = True) -> pd.DataFrame:
+        """Close, volume and value of every symbol at session row `at`, indexed by symbol."""
+        n, m = self._shape
+        if n == 0:
+            return pd.DataFrame(columns=['Close', 'Volume', 'Value'])
+        i = at % n
+        frame = pd.DataFrame({
+            'Close': self._arrays["close"][i, :m],
+            'Volume': self._arrays["volume"][i, :m],
+            'Value': self._arrays["value"][i, :m],
+        }, index=pd.Index(self._symbols[:m], name='Symbol'))
+        return frame[self._valid[i, :m]] if valid_only else frame
+
+    def latest_prices(self) -> Dict[str, float]:
+        """Close of the symbols quoted in the last session."""
+        xs = self.cross_section(-1)
+        return dict(zip(xs.index.tolist(), xs['Close'].tolist()))
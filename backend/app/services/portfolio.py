@@ -1,7 +1,18 @@
+import hashlib
 import json
 import os
-from typing import List, Dict, Any
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, List, Dict, Any, Optional
 from datetime import datetime
+from ..core.metrics import stage_timer, PORTFOLIO_CACHE_HITS, PORTFOLIO_CACHE_MISSES
+
+DEFAULT_USER = "default"
+# Used as a file name, so no path separators and no leading dot
+_USER_ID_RE = re.compile(r"^[A-Za-z0-9_@-][A-Za-z0-9_.@-]{0,63}$")
 
 class PortfolioService:
     def __init__(self, storage_file: str = "portfolio.json"):
@@ -18,8 +29,15 @@ class PortfolioService:
             return {"holdings": {}, "transactions": []}
 
     def _save_portfolio(self):
-        with open(self.storage_file, 'w') as f:
-            json.dump(self.portfolio, f, indent=4)
+        # Written next to the target and renamed, so a crash never leaves half a file
+        directory = os.path.dirname(self.storage_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.storage_file + ".tmp"
+        with stage_timer("portfolio.save"):
+            with open(tmp, 'w') as f:
+                json.dump(self.portfolio, f, indent=4)
+            os.replace(tmp, self.storage_file)
 
     def buy(self, symbol: str, quantity: int, price: float, date: str = None) -> Dict[str, Any]:
         if quantity <= 0:
@@ -125,7 +143,8 @@ class PortfolioService:
             "cash": self.portfolio.get("cash", 10000.0) # Assuming 10k starting cash if we tracked it
         }
 
-    def calculate_performance_metrics(self, current_total_value: float, total_invested: float, holdings_history: List[float] = None) -> Dict[str, float]:
+    @staticmethod
+    def calculate_performance_metrics(current_total_value: float, total_invested: float, holdings_history: List[float] = None) -> Dict[str, float]:
         """
         Calculates ROI, Sharpe Ratio, and Max Drawdown.
         """
@@ -152,3 +171,84 @@ class PortfolioService:
             "sharpe_ratio": round(sharpe_ratio, 2),
             "max_drawdown": round(max_drawdown, 2)
         }
+
+
+class PortfolioStore:
+    """
+    One portfolio per user, each in its own file under `root_dir`, sharded into
+    subdirectories by a hash of the user id (`<root>/3f/alice.json`). Only the
+    `cache_size` most recently used portfolios stay in memory. Every change is
+    written through before the user's lock is released, so evicting one is free.
+    Writes for different users never wait on each other.
+    """
+
+    def __init__(self, root_dir: str = "portfolios", cache_size: int = 256,
+                 legacy_file: Optional[str] = "portfolio.json"):
+        self.root_dir = root_dir
+        self.cache_size = max(1, cache_size)
+        # The single-user file from before per-user storage becomes the default user's portfolio
+        self.legacy_file = legacy_file
+        self._cache: "OrderedDict[str, PortfolioService]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # A user's lock lives as long as a thread holds or waits on it
+        self._user_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+        self._locks_lock = threading.Lock()
+
+    @staticmethod
+    def validate_user(user_id: str) -> str:
+        if not user_id or not _USER_ID_RE.match(user_id):
+            raise ValueError("Invalid user id: use 1-64 letters, digits or . _ @ - characters")
+        return user_id
+
+    def path_for(self, user_id: str) -> str:
+        shard = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:2]
+        return os.path.join(self.root_dir, shard, f"{user_id}.json")
+
+    def _user_lock(self, user_id: str) -> threading.Lock:
+        with self._locks_lock:
+            lock = self._user_locks.get(user_id)
+            if lock is None:
+                lock = threading.Lock()
+                self._user_locks[user_id] = lock
+            return lock
+
+    def _get(self, user_id: str) -> PortfolioService:
+        # Called with the user's lock held, so only one thread loads a given user
+        with self._cache_lock:
+            service = self._cache.get(user_id)
+            if service is not None:
+                self._cache.move_to_end(user_id)
+                PORTFOLIO_CACHE_HITS.inc()
+                return service
+        PORTFOLIO_CACHE_MISSES.inc()
+        path = self.path_for(user_id)
+        service = PortfolioService(path)
+        if (user_id == DEFAULT_USER and not os.path.exists(path)
+                and self.legacy_file and os.path.exists(self.legacy_file)):
+            service.portfolio = PortfolioService(self.legacy_file).portfolio
+            service._save_portfolio()
+        with self._cache_lock:
+            self._cache[user_id] = service
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return service
+
+    @contextmanager
+    def open(self, user_id: str) -> Iterator[PortfolioService]:
+        """Holds the user's lock while the block reads or changes their portfolio."""
+        self.validate_user(user_id)
+        with self._user_lock(user_id):
+            yield self._get(user_id)
+
+    def snapshot(self, user_id: str) -> Dict[str, Any]:
+        """A copy of the user's portfolio that later transactions won't change."""
+        with self.open(user_id) as service:
+            data = service.get_portfolio()
+            return {
+                "holdings": {s: dict(h) for s, h in data["holdings"].items()},
+                "transactions": list(data["transactions"]),
+                "cash": data["cash"],
+            }
+
+    def cached_users(self) -> int:
+        return len(self._cache)
@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.metrics import stage_timer
+
+
+class ReturnMatrix:
+    """
+    Daily log-return matrix (sessions x symbols) of the loader's market panel.
+
+    The matrix follows the loader's data version and is taken from the panel's returns
+    (see `MarketPanel.returns`), so new sessions only cost the panel's in-place append
+    and one vectorized pass. Per-window z-normalized copies are cached, so a top-k
+    query is a single matrix-vector product.
+    """
+
+    def __init__(self, data_loader, min_coverage: float = 0.5, max_windows: int = 8):
+        self.data_loader = data_loader
+        # A symbol needs returns on at least this share of the window's sessions
+        self.min_coverage = min_coverage
+        self.max_windows = max_windows
+        self.version: Optional[int] = None
+        self.dates = np.array([], dtype='datetime64[ns]')
+        self.symbols: List[str] = []
+        self.names: Dict[str, str] = {}
+        self.returns = np.empty((0, 0))
+        self._column: Dict[str, int] = {}
+        self._normalized: "OrderedDict[Tuple[int, int], Tuple[np.ndarray, np.ndarray, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Brings the matrix up to the loader's current data version."""
+        version = self.data_loader.version
+        if self.version == version:
+            return
+        with self._lock:
+            if self.version == version:
+                return
+            panel = self.data_loader.panel()
+            with stage_timer("similarity.build"):
+                self.returns = panel.returns(log=True)
+                self.dates, self.symbols = panel.dates, panel.symbols
+                self._column = {s: j for j, s in enumerate(self.symbols)}
+                if set(self.symbols) - self.names.keys():
+                    self._update_names()
+            self.version = panel.version
+            self._normalized.clear()
+
+    def _update_names(self):
+        data = self.data_loader.get_data()
+        if data.empty or 'Name' not in data.columns:
+            return
+        names = data.drop_duplicates('Symbol', keep='last').set_index('Symbol')['Name']
+        self.names.update({s: n for s, n in names.items() if isinstance(n, str)})
+
+    def normalized(self, window: int) -> Tuple:
+        """
+        Z-normalized returns over the last `window` sessions, scaled to unit column norm
+        so that column dot products are correlations. Missing returns contribute zero.
+        Returns (Z, eligible symbol positions, valid counts, raw returns of the window,
+        symbols, symbol -> position), all taken from the same data version.
+        """
+        self.refresh()
+        with self._lock:
+            key = (self.version, window)
+            cached = self._normalized.get(key)
+            if cached is not None:
+                self._normalized.move_to_end(key)
+                return cached
+            # refresh() swaps these under the lock, so they belong to the version in `key`
+            returns, symbols, column = self.returns[-window:], self.symbols, self._column
+
+        with stage_timer("similarity.normalize"):
+            valid = np.isfinite(returns)
+            counts = valid.sum(axis=0)
+            eligible = np.flatnonzero(counts >= max(3, self.min_coverage * len(returns)))
+            r, valid = returns[:, eligible], valid[:, eligible]
+            n = counts[eligible]
+            mean = np.where(valid, r, 0.0).sum(axis=0) / n
+            z = np.where(valid, r - mean, 0.0)
+            norm = np.sqrt((z * z).sum(axis=0))
+            # Flat series (no price move in the window) have no defined correlation
+            moving = norm > 0
+            z = z[:, moving] / norm[moving]
+            result = (np.ascontiguousarray(z), eligible[moving], n[moving], returns, symbols, column)
+
+        with self._lock:
+            self._normalized[key] = result
+            while len(self._normalized) > self.max_windows:
+                self._normalized.popitem(last=False)
+        return result
+
+    def similar(self, symbol: str, k: int = 10, window: int = 250) -> List[Dict]:
+        """Top-k symbols by return correlation with `symbol` over the last `window` sessions."""
+        z, eligible, counts, r, symbols, column = self.normalized(window)
+        col = column.get(symbol)
+        pos = np.flatnonzero(eligible == col) if col is not None else []
+        if not len(pos):
+            raise KeyError(symbol)
+        j = int(pos[0])
+
+        scores = z.T @ z[:, j]
+        scores[j] = -np.inf
+        k = min(k, len(scores) - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        base = np.isfinite(r[:, eligible[j]])
+        results = []
+        for i in top:
+            s = symbols[eligible[i]]
+            results.append({
+                "symbol": s,
+                "name": self.names.get(s),
+                "correlation": round(float(scores[i]), 4),
+                "overlap": int((base & np.isfinite(r[:, eligible[i]])).sum()),
+            })
+        return results
+
+    def correlation_matrix(self, window: int = 250, symbols: Optional[List[str]] = None,
+                           limit: int = 30) -> Dict:
+        """
+        Correlation heatmap over the last `window` sessions, for the given symbols or
+        for the `limit` symbols with the most quoted sessions in the window.
+        """
+        z, eligible, counts, r, all_symbols, column = self.normalized(window)
+        if symbols:
+            position = {e: i for i, e in enumerate(eligible)}
+            picked = [position[column[s]] for s in symbols
+                      if s in column and column[s] in position]
+        else:
+            order = np.lexsort((eligible, -counts))
+            picked = sorted(order[:limit].tolist(), key=lambda i: all_symbols[eligible[i]])
+        sub = z[:, picked]
+        corr = np.clip(sub.T @ sub, -1.0, 1.0)
+        return {
+            "window": int(len(r)),
+            "symbols": [all_symbols[eligible[i]] for i in picked],
+            "matrix": np.round(corr, 3).tolist(),
+        }
@@ -0,0 +1,89 @@
+"""
+Minimal in-process ASGI client.
+
+Drives the FastAPI app directly through its ASGI interface, so benchmarks measure
+the full routing/validation/serialization path without a network socket or an
+extra HTTP client dependency.
+"""
+import asyncio
+import json
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode
+
+
+class ASGIResponse:
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status_code = status
+        self.headers = headers
+        self.content = body
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class ASGIClient:
+    def __init__(self, app):
+        self.app = app
+        # One loop for the client's lifetime so per-call timings exclude loop setup
+        self.loop = asyncio.new_event_loop()
+
+    async def request(self, method: str, path: str, params: Optional[Dict] = None,
+                      json_body: Any = None, headers: Optional[Dict[str, str]] = None) -> ASGIResponse:
+        body = b""
+        raw_headers = [(b"host", b"testserver")]
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            raw_headers.append((b"content-type", b"application/json"))
+            raw_headers.append((b"content-length", str(len(body)).encode()))
+        for k, v in (headers or {}).items():
+            raw_headers.append((k.lower().encode(), v.encode()))
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method.upper(),
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": urlencode(params or {}).encode(),
+            "root_path": "",
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 12345),
+            "server": ("testserver", 80),
+        }
+
+        sent = False
+        status = 500
+        resp_headers: Dict[str, str] = {}
+        chunks = []
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # Block like a real server would until the client disconnects
+            await asyncio.sleep(3600)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for k, v in message.get("headers", []):
+                    resp_headers[k.decode().lower()] = v.decode()
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return ASGIResponse(status, resp_headers, b"".join(chunks))
+
+    def get(self, path: str, params: Optional[Dict] = None, **kwargs) -> ASGIResponse:
+        return self.loop.run_until_complete(self.request("GET", path, params=params, **kwargs))
+
+    def post(self, path: str, json_body: Any = None, **kwargs) -> ASGIResponse:
+        return self.loop.run_until_complete(self.request("POST", path, json_body=json_body, **kwargs))
+
+    def close(self):
+        self.loop.close()
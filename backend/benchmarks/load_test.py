@@ -0,0 +1,474 @@
+"""
+HTTP load generator.
+
+Sends a weighted mix of API requests to `app.main:app` at a target rate and reports
+throughput, p50/p95/p99 latency and error rate per route, plus how the server's
+resident memory grew over the run.
+
+Arrivals are open-loop: requests start on schedule whether or not earlier ones
+have finished, and latency is measured from the scheduled start, so a server that
+falls behind shows up as higher latency instead of a lower send rate. When
+`--max-inflight` requests are outstanding, new arrivals are dropped and counted.
+
+Targets:
+- in-process (default): the app is driven through ASGI on this process's event loop,
+  after the same warm-up the server runs at startup.
+- `--url http://127.0.0.1:8000`: a running server. Pass `--server-pid` to track its memory.
+- `--spawn`: starts uvicorn on a free local port for the run and stops it afterwards.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --size medium --rate 50 --duration 30
+    python -m benchmarks.load_test --spawn --data-dir ../data --rate 100 --mix history=5,predict=1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from .run_benchmarks import SIZES, dataset_dir
+
+DEFAULT_MIX = "stocks=10,history=30,predict=15,analyze=15,summary=20,transaction=10"
+ROUTES = ("stocks", "history", "predict", "analyze", "summary", "transaction")
+PROFILES = ("Conservative", "Moderate", "Aggressive")
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise ValueError(f"Unknown route '{name}' in mix, expected some of {list(ROUTES)}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("The route mix needs at least one positive weight")
+    return mix
+
+
+def rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+    """Resident set size of `pid` (this process by default), or None when it can't be read."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid is None:
+        try:
+            import resource
+        except ImportError:
+            # Windows
+            return None
+        # Peak, not current, outside Linux (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    return None
+
+
+class HTTPConnection:
+    """Keep-alive HTTP/1.1 connection on asyncio streams, enough for the API's JSON routes."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, target: str, body: bytes, headers: Dict[str, str]) -> Tuple[int, bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(body)}"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+        length, chunked, close = None, False, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding" and "chunked" in value:
+                chunked = True
+            elif name == "connection" and value == "close":
+                close = True
+
+        if chunked:
+            parts = []
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                parts.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            content = b"".join(parts)
+        elif length is not None:
+            content = await self.reader.readexactly(length)
+        else:
+            content, close = await self.reader.read(), True
+        if close:
+            self.close()
+        return status, content
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class HTTPTarget:
+    def __init__(self, url: str, pool_size: int):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname or "127.0.0.1", parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self._idle: List[HTTPConnection] = []
+        self.pool_size = pool_size
+
+    async def request(self, method: str, path: str, params: Optional[Dict] = None, json_body: Any = None,
+                      headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        target = self.prefix + path + (f"?{urlencode(params)}" if params else "")
+        body = json.dumps(json_body).encode() if json_body is not None else b""
+        headers = dict(headers or {})
+        if json_body is not None:
+            headers["Content-Type"] = "application/json"
+        conn = self._idle.pop() if self._idle else HTTPConnection(self.host, self.port)
+        try:
+            result = await conn.request(method, target, body, headers)
+        except Exception:
+            conn.close()
+            raise
+        if len(self._idle) < self.pool_size:
+            self._idle.append(conn)
+        else:
+            conn.close()
+        return result
+
+    def close(self):
+        for conn in self._idle:
+            conn.close()
+        self._idle = []
+
+
+class ASGITarget:
+    def __init__(self, app):
+        from .asgi_client import ASGIClient
+        self.client = ASGIClient(app)
+
+    async def request(self, method: str, path: str, params: Optional[Dict] = None, json_body: Any = None,
+                      headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        response = await self.client.request(method, path, params=params, json_body=json_body, headers=headers)
+        return response.status_code, response.content
+
+    def close(self):
+        pass
+
+
+class Workload:
+    """Builds the requests of the mix over a sample of symbols and user accounts."""
+
+    def __init__(self, mix: Dict[str, float], symbols: List[str], prices: Dict[str, float], users: int, seed: int):
+        self.routes = list(mix)
+        weights = np.array([mix[r] for r in self.routes])
+        self.cum_weights = np.cumsum(weights / weights.sum())
+        self.symbols = symbols
+        self.prices = prices
+        self.users = [f"load-{i}" for i in range(max(1, users))]
+        self.rng = random.Random(seed)
+
+    def next(self) -> Tuple[str, str, str, Optional[Dict], Any, Optional[Dict[str, str]]]:
+        """(route, method, path, params, json body, headers) of the next request."""
+        route = self.routes[min(int(np.searchsorted(self.cum_weights, self.rng.random())), len(self.routes) - 1)]
+        symbol = self.rng.choice(self.symbols)
+        if route == "stocks":
+            return route, "GET", "/api/stocks", None, None, None
+        if route == "history":
+            return route, "GET", f"/api/stocks/{symbol}/history", None, None, None
+        if route == "predict":
+            return route, "GET", f"/api/stocks/{symbol}/predict", {"days": 7}, None, None
+        if route == "analyze":
+            return route, "GET", f"/api/agent/analyze/{symbol}", {"profile": self.rng.choice(PROFILES)}, None, None
+        if route == "summary":
+            return route, "GET", "/api/market-summary", None, None, None
+        body = {"type": "BUY", "symbol": symbol, "quantity": 1, "price": self.prices.get(symbol, 10.0)}
+        return route, "POST", "/api/portfolio/transaction", None, body, {"X-User-Id": self.rng.choice(self.users)}
+
+
+async def prepare(target, sample: int) -> Tuple[List[str], Dict[str, float]]:
+    """Symbols to use and their last close, read through the API itself."""
+    status, content = await target.request("GET", "/api/stocks")
+    if status != 200:
+        raise RuntimeError(f"GET /api/stocks answered {status}: {content[:200]!r}")
+    symbols = json.loads(content)[:sample]
+    if not symbols:
+        raise RuntimeError("The server has no symbols loaded")
+    prices = {}
+    for symbol in symbols:
+        status, content = await target.request("GET", f"/api/stocks/{symbol}/history", {"max_points": 3})
+        if status == 200 and json.loads(content):
+            prices[symbol] = float(json.loads(content)[-1]["Close"])
+    return symbols, prices
+
+
+def percentile(sorted_ms: np.ndarray, q: float) -> float:
+    return round(float(np.percentile(sorted_ms, q)), 3) if len(sorted_ms) else 0.0
+
+
+async def run_load(target, workload: Workload, rate: float, duration: float, max_inflight: int,
+                   server_pid: Optional[int], poisson: bool = True, track_memory: bool = True) -> Dict[str, Any]:
+    """
+    Runs the load and returns the report. Memory is sampled for `server_pid`, or for
+    this process when it is None (in-process target); `track_memory=False` skips it.
+    """
+    samples: Dict[str, List[float]] = {r: [] for r in workload.routes}
+    errors: Dict[str, int] = {r: 0 for r in workload.routes}
+    statuses: Dict[str, Dict[str, int]] = {r: {} for r in workload.routes}
+    dropped = 0
+    inflight = 0
+    tasks = set()
+    memory = []
+    rng = random.Random(workload.rng.random())
+
+    async def one(route, method, path, params, body, headers, scheduled):
+        nonlocal inflight
+        try:
+            status, _ = await target.request(method, path, params=params, json_body=body, headers=headers)
+            key = str(status)
+        except Exception as e:
+            status, key = 0, type(e).__name__
+        samples[route].append((time.perf_counter() - scheduled) * 1000)
+        statuses[route][key] = statuses[route].get(key, 0) + 1
+        if not 200 <= status < 400:
+            errors[route] += 1
+        inflight -= 1
+
+    async def sample_memory(start: float):
+        while True:
+            memory.append((round(time.perf_counter() - start, 2), rss_bytes(server_pid)))
+            await asyncio.sleep(1.0)
+
+    start = time.perf_counter()
+    sampler = asyncio.ensure_future(sample_memory(start)) if track_memory else None
+    next_at = start
+    while next_at - start < duration:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if inflight >= max_inflight:
+            dropped += 1
+        else:
+            inflight += 1
+            task = asyncio.ensure_future(one(*workload.next(), next_at))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        next_at += rng.expovariate(rate) if poisson else 1.0 / rate
+    send_end = time.perf_counter()
+    if tasks:
+        await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    if sampler is not None:
+        sampler.cancel()
+        memory.append((round(elapsed, 2), rss_bytes(server_pid)))
+
+    routes = {}
+    total = 0
+    total_errors = 0
+    for route in workload.routes:
+        ms = np.sort(np.array(samples[route]))
+        total += len(ms)
+        total_errors += errors[route]
+        routes[route] = {
+            "requests": len(ms),
+            "throughput_rps": round(len(ms) / elapsed, 2),
+            "p50_ms": percentile(ms, 50),
+            "p95_ms": percentile(ms, 95),
+            "p99_ms": percentile(ms, 99),
+            "max_ms": round(float(ms[-1]), 3) if len(ms) else 0.0,
+            "errors": errors[route],
+            "error_rate": round(errors[route] / len(ms), 4) if len(ms) else 0.0,
+            "statuses": statuses[route],
+        }
+    all_ms = np.sort(np.concatenate([np.array(samples[r]) for r in workload.routes]))
+    rss = [m for _, m in memory if m is not None]
+    return {
+        "target_rps": rate,
+        "duration_s": round(elapsed, 2),
+        "send_duration_s": round(send_end - start, 2),
+        "requests": total,
+        "dropped": dropped,
+        "throughput_rps": round(total / elapsed, 2),
+        "p50_ms": percentile(all_ms, 50),
+        "p95_ms": percentile(all_ms, 95),
+        "p99_ms": percentile(all_ms, 99),
+        "errors": total_errors,
+        "error_rate": round(total_errors / total, 4) if total else 0.0,
+        "routes": routes,
+        "memory": {
+            "pid": (server_pid or os.getpid()) if track_memory else None,
+            "rss_start_mb": round(rss[0] / 2 ** 20, 1) if rss else None,
+            "rss_end_mb": round(rss[-1] / 2 ** 20, 1) if rss else None,
+            "rss_peak_mb": round(max(rss) / 2 ** 20, 1) if rss else None,
+            "growth_mb": round((rss[-1] - rss[0]) / 2 ** 20, 1) if rss else None,
+            "samples": [(t, round(m / 2 ** 20, 1)) for t, m in memory if m is not None],
+        },
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n{'route':<12} {'reqs':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'err %':>7}")
+    for route, r in report["routes"].items():
+        print(f"{route:<12} {r['requests']:>7} {r['throughput_rps']:>8.2f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+              f"{r['p99_ms']:>9.1f} {r['max_ms']:>9.1f} {r['error_rate'] * 100:>7.2f}")
+    print(f"{'all':<12} {report['requests']:>7} {report['throughput_rps']:>8.2f} {report['p50_ms']:>9.1f} "
+          f"{report['p95_ms']:>9.1f} {report['p99_ms']:>9.1f} {'':>9} {report['error_rate'] * 100:>7.2f}")
+    print(f"Target {report['target_rps']} req/s over {report['send_duration_s']}s, "
+          f"{report['dropped']} arrivals dropped at the in-flight limit")
+    mem = report["memory"]
+    if mem["rss_start_mb"] is not None:
+        print(f"Server RSS (pid {mem['pid']}): {mem['rss_start_mb']} MB -> {mem['rss_end_mb']} MB "
+              f"(peak {mem['rss_peak_mb']} MB, growth {mem['growth_mb']:+} MB)")
+    elif mem["pid"] is None:
+        print("Server memory not tracked (pass --server-pid with --url)")
+    else:
+        print(f"Server memory unavailable for pid {mem['pid']} on this platform")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(data_dir: str, work_dir: str, port: int) -> subprocess.Popen:
+    """uvicorn on `port`, with state files kept in `work_dir`."""
+    env = dict(os.environ, BVMT_DATA_DIR=data_dir,
+               BVMT_PORTFOLIO_DIR=os.path.join(work_dir, "portfolios"),
+               BVMT_ALERTS_FILE=os.path.join(work_dir, "alerts.json"),
+               BVMT_INDEX_FILE=os.path.join(work_dir, "market_index.json"))
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                             "--port", str(port), "--log-level", "warning", "--no-access-log"],
+                            cwd=backend_dir, env=env)
+
+
+async def wait_ready(target: HTTPTarget, timeout: float, server: Optional[subprocess.Popen] = None):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"Server exited with status {server.returncode}")
+        try:
+            status, _ = await target.request("GET", "/ready")
+            if status == 200:
+                return
+        except OSError:
+            target.close()
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"Server not ready after {timeout:.0f}s")
+
+
+def in_process_target(data_dir: str, work_dir: str) -> ASGITarget:
+    """The app with its startup warm-up run synchronously (the ASGI client doesn't run lifespan)."""
+    from app.api import endpoints
+    from app.core.warmup import run_warmup
+    from app.main import app
+    from app.services.portfolio import PortfolioStore
+
+    endpoints.data_loader.data_dir = data_dir
+    endpoints.market_index.storage_file = os.path.join(work_dir, "market_index.json")
+    endpoints.alert_engine.storage_file = os.path.join(work_dir, "alerts.json")
+    endpoints.portfolio_store = PortfolioStore(os.path.join(work_dir, "portfolios"), legacy_file=None)
+    run_warmup()
+    return ASGITarget(app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the BVMT API at a target request rate")
+    parser.add_argument("--url", help="Base URL of a running server; in-process when omitted")
+    parser.add_argument("--spawn", action="store_true", help="Start a local uvicorn for the run")
+    parser.add_argument("--server-pid", type=int, help="Process to track memory for with --url")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small", help="Synthetic dataset size")
+    parser.add_argument("--data-dir", help="History files to load instead of a synthetic dataset")
+    parser.add_argument("--rate", type=float, default=20.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of traffic")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Route weights, e.g. history=3,predict=1")
+    parser.add_argument("--max-inflight", type=int, default=256, help="Outstanding requests before arrivals are dropped")
+    parser.add_argument("--symbols", type=int, default=20, help="Symbols sampled by the per-symbol routes")
+    parser.add_argument("--users", type=int, default=50, help="Accounts the transactions are spread over")
+    parser.add_argument("--uniform", action="store_true", help="Evenly spaced arrivals instead of Poisson")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+    if args.url and args.spawn:
+        parser.error("--url and --spawn are exclusive")
+    if args.rate <= 0 or args.duration <= 0:
+        parser.error("--rate and --duration must be positive")
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    data_dir = args.data_dir or dataset_dir(args.size)
+    work_dir = tempfile.mkdtemp(prefix="bvmt_load_")
+    server = None
+    server_pid = args.server_pid
+    if args.spawn:
+        port = free_port()
+        server = spawn_server(data_dir, work_dir, port)
+        server_pid = server.pid
+        target = HTTPTarget(f"http://127.0.0.1:{port}", args.max_inflight)
+    elif args.url:
+        target = HTTPTarget(args.url, args.max_inflight)
+    else:
+        # The server is this process, so its memory is what gets tracked
+        target = in_process_target(data_dir, work_dir)
+    loop = target.client.loop if isinstance(target, ASGITarget) else asyncio.new_event_loop()
+    try:
+        if isinstance(target, HTTPTarget):
+            print(f"Waiting for {target.host}:{target.port} to be ready...")
+            loop.run_until_complete(wait_ready(target, args.ready_timeout, server))
+        symbols, prices = loop.run_until_complete(prepare(target, args.symbols))
+        workload = Workload(mix, symbols, prices, args.users, args.seed)
+        print(f"Sending {args.rate} req/s for {args.duration}s, mix {mix}")
+        report = loop.run_until_complete(run_load(target, workload, args.rate, args.duration,
+                                                  args.max_inflight, server_pid, poisson=not args.uniform,
+                                                  track_memory=server_pid is not None or not args.url))
+        target.close()
+    finally:
+        loop.close()
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    report["config"] = {"target": args.url or ("spawned uvicorn" if args.spawn else "in-process"),
+                        "data_dir": data_dir, "mix": mix, "max_inflight": args.max_inflight,
+                        "symbols": len(symbols), "users": args.users, "seed": args.seed}
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
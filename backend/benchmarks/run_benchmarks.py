@@ -0,0 +1,242 @@
+"""
+Performance benchmark suite.
+
+Times the data loader, the analytics services and the main API routes against
+synthetic datasets of several sizes and writes a JSON report. When a baseline
+report is given, every benchmark is compared against it using the tolerances in
+`thresholds.json` and the process exits with status 1 on a regression.
+
+Usage (from backend/):
+    python -m benchmarks.run_benchmarks --sizes small,medium --output bench.json
+    python -m benchmarks.run_benchmarks --baseline bench_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .synthetic_data import generate
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_CACHE_DIR = os.path.join(BENCH_DIR, ".data")
+THRESHOLDS_FILE = os.path.join(BENCH_DIR, "thresholds.json")
+
+# name -> (symbols, years)
+SIZES = {
+    "small": (20, 2),
+    "medium": (80, 5),
+    "large": (250, 10),
+}
+
+
+def dataset_dir(size: str) -> str:
+    """Returns the cached synthetic dataset for a size, generating it on first use."""
+    n_symbols, n_years = SIZES[size]
+    path = os.path.join(DATA_CACHE_DIR, f"{size}_{n_symbols}x{n_years}")
+    if not os.path.isdir(path) or not os.listdir(path):
+        print(f"Generating {size} dataset ({n_symbols} symbols x {n_years} years)...")
+        generate(path, n_symbols=n_symbols, n_years=n_years)
+    return path
+
+
+def time_call(fn: Callable, repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Runs fn `warmup` + `repeat` times and returns timing stats in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "min_ms": round(samples[0], 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))], 3),
+        "runs": repeat,
+    }
+
+
+def checked(response, expected: int = 200):
+    if response.status_code != expected:
+        raise RuntimeError(f"Unexpected status {response.status_code}: {response.content[:200]!r}")
+    return response
+
+
+def run_size(size: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    data_dir = dataset_dir(size)
+    os.environ["BVMT_DATA_DIR"] = data_dir
+    # Routes would otherwise serve the precomputation jobs' cached results, and the
+    # jobs would compete with the timed calls; benchmark the inline computation instead
+    os.environ["BVMT_JOBS_ENABLED"] = "0"
+    os.environ["BVMT_DATA_WATCH_S"] = "0"
+
+    from app.main import app
+    from app.api import endpoints
+    from app.services.data_loader import DataLoader
+    from app.services.portfolio import DEFAULT_USER, PortfolioStore
+    from app.core.warmup import run_warmup
+    from .asgi_client import ASGIClient
+
+    results = {}
+
+    results["loader_load"] = time_call(lambda: DataLoader(data_dir), repeat=max(1, repeat // 2), warmup=0)
+
+    # Same path as the server's startup warm-up (load + index), run synchronously
+    loader = endpoints.data_loader
+    loader.data_dir = data_dir
+    work_dir = tempfile.mkdtemp(prefix="bvmt_bench_")
+    endpoints.market_index.storage_file = os.path.join(work_dir, "market_index.json")
+    run_warmup()
+    endpoints.portfolio_store = PortfolioStore(os.path.join(work_dir, "portfolios"), legacy_file=None)
+
+    symbols = loader.get_all_stocks()
+    if not symbols:
+        raise RuntimeError(f"No data loaded from {data_dir}")
+    # Liquid names first: they are the ones with full histories
+    symbol = symbols[0]
+    sample = symbols[: min(10, len(symbols))]
+
+    results["get_stock_data"] = time_call(lambda: [loader.get_stock_data(s) for s in sample], repeat)
+    results["anomaly_detect"] = time_call(lambda: endpoints.anomaly_detector.detect(loader.get_data()), repeat)
+
+    client = ASGIClient(app)
+    price = float(loader.get_stock_data(symbol)["Close"].iloc[-1])
+    with endpoints.portfolio_store.open(DEFAULT_USER) as portfolio:
+        for s in sample[:3]:
+            portfolio.buy(s, 10, price)
+
+    routes = {
+        "http_history": lambda: checked(client.get(f"/api/stocks/{symbol}/history")),
+        "http_predict": lambda: checked(client.get(f"/api/stocks/{symbol}/predict", {"days": 7})),
+        "http_agent_analyze": lambda: checked(client.get(f"/api/agent/analyze/{symbol}", {"profile": "Moderate"})),
+        "http_agent_analyze_batch": lambda: checked(client.post(
+            "/api/agent/analyze/batch", {"symbols": sample, "profiles": ["Moderate"]})),
+        "http_market_summary": lambda: checked(client.get("/api/market-summary")),
+        "http_market_index": lambda: checked(client.get("/api/market/index", {"from": "2017-01-01"})),
+        "http_portfolio": lambda: checked(client.get("/api/portfolio")),
+        "http_portfolio_optimization": lambda: checked(client.get("/api/portfolio/optimization")),
+        "http_portfolio_transaction": lambda: checked(client.post(
+            "/api/portfolio/transaction",
+            {"type": "BUY", "symbol": symbol, "quantity": 1, "price": price})),
+    }
+    for name, fn in routes.items():
+        results[name] = time_call(fn, repeat)
+    client.close()
+
+    results["_dataset"] = {"rows": len(loader.get_data()), "symbols": len(symbols)}
+    return results
+
+
+def load_thresholds() -> Dict:
+    with open(THRESHOLDS_FILE, "r") as f:
+        return json.load(f)
+
+
+def compare(report: Dict, baseline: Dict, thresholds: Dict) -> List[Dict]:
+    """
+    Compares medians with a baseline report. A benchmark regresses when it is slower
+    than baseline * (1 + tolerance) AND by more than the absolute noise floor.
+    """
+    default_tol = thresholds.get("default_tolerance", 0.25)
+    noise_floor = thresholds.get("noise_floor_ms", 2.0)
+    overrides = thresholds.get("tolerances", {})
+
+    rows = []
+    for size, benches in report["results"].items():
+        base_benches = baseline.get("results", {}).get(size, {})
+        for name, stats in benches.items():
+            if name.startswith("_") or name not in base_benches:
+                continue
+            current = stats["median_ms"]
+            base = base_benches[name]["median_ms"]
+            tol = overrides.get(name, default_tol)
+            limit = base * (1 + tol)
+            regressed = current > limit and (current - base) > noise_floor
+            rows.append({
+                "size": size,
+                "benchmark": name,
+                "baseline_ms": base,
+                "current_ms": current,
+                "change_pct": round((current - base) / base * 100, 1) if base > 0 else 0.0,
+                "tolerance_pct": round(tol * 100, 1),
+                "status": "REGRESSION" if regressed else "ok",
+            })
+    return rows
+
+
+def environment_info() -> Dict:
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+    }
+
+
+def print_table(report: Dict, comparison: Optional[List[Dict]]):
+    for size, benches in report["results"].items():
+        ds = benches.get("_dataset", {})
+        print(f"\n== {size} ({ds.get('symbols')} symbols, {ds.get('rows')} rows) ==")
+        for name, stats in benches.items():
+            if name.startswith("_"):
+                continue
+            print(f"  {name:<30} median {stats['median_ms']:>10.2f} ms   p95 {stats['p95_ms']:>10.2f} ms")
+    if comparison:
+        print("\n== Comparison with baseline ==")
+        for row in comparison:
+            print(f"  [{row['status']:>10}] {row['size']:<7} {row['benchmark']:<30} "
+                  f"{row['baseline_ms']:>9.2f} -> {row['current_ms']:>9.2f} ms ({row['change_pct']:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the BVMT backend benchmark suite")
+    parser.add_argument("--sizes", default="small,medium", help=f"Comma separated, from {list(SIZES)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_report.json")
+    parser.add_argument("--baseline", help="Previous report to compare against")
+    args = parser.parse_args()
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"Unknown sizes: {unknown}")
+
+    # Make `app` importable when run from the backend directory
+    sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+    report = {"environment": environment_info(), "repeat": args.repeat, "results": {}}
+    for size in sizes:
+        report["results"][size] = run_size(size, args.repeat)
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        comparison = compare(report, baseline, load_thresholds())
+        report["comparison"] = comparison
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print_table(report, comparison)
+    print(f"\nReport written to {args.output}")
+
+    if comparison and any(r["status"] == "REGRESSION" for r in comparison):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Synthetic BVMT history generator.
+
+Writes `histo_cotation_<year>.txt` (fixed-width, dashed separator line) and
+`histo_cotation_<year>.csv` (semicolon separated) files shaped like the
+official BVMT exports, so the loader and the API can be exercised without
+the real dataset.
+
+Usage:
+    python -m benchmarks.synthetic_data --out ../data_synth --symbols 80 --years 5
+"""
+import argparse
+import os
+from datetime import date, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+COLUMNS = [
+    "SEANCE", "GROUPE", "CODE", "VALEUR", "OUVERTURE", "CLOTURE",
+    "PLUS_BAS", "PLUS_HAUT", "QUANTITE_NEGOCIEE", "NB_TRANSACTION", "CAPITAUX",
+]
+
+# Column widths used for the fixed-width TXT exports
+TXT_WIDTHS = [10, 7, 12, 30, 11, 11, 11, 11, 17, 14, 17]
+
+# A few real-looking names; the rest are generated. Several contain spaces on purpose.
+BASE_NAMES = [
+    "BIAT", "SFBT", "POULINA GP HOLDING", "SAH", "TELNET HOLDING", "ATTIJARI BANK",
+    "BNA", "TUNISIE LEASING", "DELICE HOLDING", "EURO-CYCLES", "ONE TECH HOLDING",
+    "CARTHAGE CEMENT", "SOTUVER", "UIB", "AMEN BANK", "ENNAKL AUTOMOBILES",
+]
+
+# Fixed Tunisian public holidays (month, day); Islamic holidays are left out
+HOLIDAYS = [(1, 1), (1, 14), (3, 20), (4, 9), (5, 1), (7, 25), (8, 13), (10, 15), (12, 17)]
+
+
+def trading_days(year: int) -> List[date]:
+    """Weekdays of a year minus the fixed public holidays."""
+    days = []
+    d = date(year, 1, 1)
+    while d.year == year:
+        if d.weekday() < 5 and (d.month, d.day) not in HOLIDAYS:
+            days.append(d)
+        d += timedelta(days=1)
+    return days
+
+
+def make_universe(n_symbols: int, rng: np.random.Generator) -> List[Dict]:
+    """Builds the symbol list with a per-symbol price level, volatility and liquidity."""
+    universe = []
+    for i in range(n_symbols):
+        name = BASE_NAMES[i] if i < len(BASE_NAMES) else f"SOCIETE {i:03d} SA"
+        # Blue chips trade almost every session, the tail of the market is illiquid
+        liquidity = 0.97 if i < len(BASE_NAMES) else float(rng.uniform(0.35, 0.95))
+        universe.append({
+            "code": f"TN{i:010d}",
+            "name": name,
+            "group": "11" if i % 3 else "12",
+            "price": float(rng.uniform(2.0, 150.0)),
+            "vol": float(rng.uniform(0.008, 0.03)),
+            "liquidity": liquidity,
+            "avg_qty": float(rng.uniform(200, 40000)),
+        })
+    return universe
+
+
+def fmt_decimal(value: float, decimals: int = 3) -> str:
+    """BVMT exports use a comma as decimal separator."""
+    return f"{value:.{decimals}f}".replace(".", ",")
+
+
+def simulate_year(universe: List[Dict], year: int, rng: np.random.Generator,
+                  gap_rate: float) -> List[List[str]]:
+    """Simulates one year of sessions and returns formatted rows, session by session."""
+    rows = []
+    for day in trading_days(year):
+        seance = day.strftime("%d/%m/%Y")
+        for sym in universe:
+            ret = rng.normal(0.0002, sym["vol"])
+            # BVMT caps daily moves at +/-6%
+            ret = max(-0.06, min(0.06, ret))
+            prev = sym["price"]
+            close = round(max(0.1, prev * (1 + ret)), 3)
+            sym["price"] = close
+
+            traded = rng.random() < sym["liquidity"] * (1 - gap_rate)
+            if not traded:
+                # Illiquid names either disappear from the session or show up with no trades
+                if rng.random() < 0.5:
+                    continue
+                rows.append([seance, sym["group"], sym["code"], sym["name"],
+                             fmt_decimal(0), fmt_decimal(prev), fmt_decimal(0), fmt_decimal(0),
+                             "0", "0", fmt_decimal(0)])
+                sym["price"] = prev
+                continue
+
+            open_ = round(prev * (1 + rng.normal(0, sym["vol"] / 3)), 3)
+            high = round(max(open_, close) * (1 + abs(rng.normal(0, sym["vol"] / 2))), 3)
+            low = round(min(open_, close) * (1 - abs(rng.normal(0, sym["vol"] / 2))), 3)
+            qty = int(max(1, rng.lognormal(np.log(sym["avg_qty"]), 0.8)))
+            trades = int(max(1, qty / rng.uniform(50, 400)))
+            value = qty * (open_ + close + high + low) / 4
+            rows.append([seance, sym["group"], sym["code"], sym["name"],
+                         fmt_decimal(open_), fmt_decimal(close), fmt_decimal(low), fmt_decimal(high),
+                         str(qty), str(trades), fmt_decimal(value)])
+    return rows
+
+
+def write_csv(path: str, rows: List[List[str]]):
+    with open(path, "w", encoding="latin-1", newline="") as f:
+        # Real exports pad the header names
+        f.write(";".join(f"{c} " for c in COLUMNS) + "\n")
+        for row in rows:
+            f.write(";".join(row) + "\n")
+
+
+def write_txt(path: str, rows: List[List[str]]):
+    with open(path, "w", encoding="latin-1", newline="") as f:
+        f.write(" ".join(c.ljust(w) for c, w in zip(COLUMNS, TXT_WIDTHS)).rstrip() + "\n")
+        f.write(" ".join("-" * w for w in TXT_WIDTHS) + "\n")
+        for row in rows:
+            f.write(" ".join(v.ljust(w) for v, w in zip(row, TXT_WIDTHS)).rstrip() + "\n")
+
+
+def generate(out_dir: str, n_symbols: int = 50, n_years: int = 3, start_year: int = 2016,
+             fmt: str = "mixed", gap_rate: float = 0.05, seed: int = 42) -> List[str]:
+    """
+    Generates `n_years` yearly files for `n_symbols` symbols into `out_dir`.
+    fmt: 'txt', 'csv' or 'mixed' (older years as TXT, recent years as CSV, like the real archive).
+    Returns the written file paths.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    universe = make_universe(n_symbols, rng)
+    written = []
+    for k, year in enumerate(range(start_year, start_year + n_years)):
+        rows = simulate_year(universe, year, rng, gap_rate)
+        if fmt == "mixed":
+            ext = "txt" if k < (n_years + 1) // 2 else "csv"
+        else:
+            ext = fmt
+        path = os.path.join(out_dir, f"histo_cotation_{year}.{ext}")
+        if ext == "txt":
+            write_txt(path, rows)
+        else:
+            write_csv(path, rows)
+        written.append(path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic BVMT history files")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--start-year", type=int, default=2016)
+    parser.add_argument("--format", choices=["mixed", "txt", "csv"], default="mixed")
+    parser.add_argument("--gap-rate", type=float, default=0.05,
+                        help="Extra probability that a symbol does not trade in a session")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    files = generate(args.out, args.symbols, args.years, args.start_year,
+                     args.format, args.gap_rate, args.seed)
+    for path in files:
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
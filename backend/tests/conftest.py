@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# The API module builds its services from these settings at import, so they point at
+# a scratch directory before any test imports `app`
+_WORK_DIR = tempfile.mkdtemp(prefix="bvmt_tests_")
+os.environ.update({
+    "BVMT_DATA_DIR": os.path.join(_WORK_DIR, "data"),
+    "BVMT_INDEX_FILE": os.path.join(_WORK_DIR, "market_index.json"),
+    "BVMT_PORTFOLIO_DIR": os.path.join(_WORK_DIR, "portfolios"),
+    "BVMT_ALERTS_FILE": os.path.join(_WORK_DIR, "alerts.json"),
+    "BVMT_JOBS_ENABLED": "0",
+    "BVMT_DATA_WATCH_S": "0",
+})
+
+
+@pytest.fixture(scope="session")
+def dataset_dir() -> str:
+    """A small synthetic history (one TXT and one CSV year)."""
+    from benchmarks.synthetic_data import generate
+    path = os.environ["BVMT_DATA_DIR"]
+    generate(path, n_symbols=6, n_years=2)
+    return path
+
+
+@pytest.fixture(scope="session")
+def client(dataset_dir):
+    """In-process client for the API, with the data loaded synchronously."""
+    from app.main import app
+    from app.core.warmup import run_warmup
+    from benchmarks.asgi_client import ASGIClient
+
+    run_warmup()
+    c = ASGIClient(app)
+    yield c
+    c.close()
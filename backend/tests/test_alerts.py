@@ -0,0 +1,97 @@
+import pandas as pd
+import pytest
+
+from app.services.alerts import AlertEngine
+from app.services.data_loader import DataLoader
+
+
+def session(day, closes):
+    return pd.DataFrame([{'Date': pd.Timestamp(day), 'Symbol': s, 'Name': s, 'Open': c, 'Close': c,
+                          'Low': c, 'High': c, 'Volume': 100, 'Value': c * 100}
+                         for s, c in closes.items()])
+
+
+@pytest.fixture
+def loader():
+    return DataLoader(autoload=False)
+
+
+def engine_for(loader, path, holdings=None):
+    return AlertEngine(loader, lambda frames: {}, str(path),
+                       holdings_of=(lambda user: holdings.get(user, ())) if holdings else None)
+
+
+def publish(loader, engine, day, closes):
+    loader.append_session(session(day, closes))
+    return [(a["symbol"], a["value"]) for a in engine.evaluate()]
+
+
+def test_rules_fire_on_the_edge_only(loader, tmp_path):
+    engine = engine_for(loader, tmp_path / "alerts.json")
+    engine.add_rule("u", "aaa", "close", "above", 100)
+
+    assert publish(loader, engine, "2024-01-01", {"AAA": 90}) == []
+    assert publish(loader, engine, "2024-01-02", {"AAA": 105}) == [("AAA", 105)]
+    # Still above: no repeat until the condition has stopped holding
+    assert publish(loader, engine, "2024-01-03", {"AAA": 110}) == []
+    assert publish(loader, engine, "2024-01-04", {"AAA": 95}) == []
+    assert publish(loader, engine, "2024-01-05", {"AAA": 120}) == [("AAA", 120)]
+    assert [a["seq"] for a in engine.triggered("u")] == [1, 2]
+    assert engine.triggered("u", since=1)[0]["date"] == "2024-01-05"
+    assert engine.triggered("someone else") == []
+
+
+def test_any_symbol_and_holdings_rules(loader, tmp_path):
+    engine = engine_for(loader, tmp_path / "alerts.json", holdings={"u": ["BBB"]})
+    engine.add_rule("u", "*", "change_pct", "below", -5)
+    engine.add_rule("u", "@holdings", "close", "above", 50)
+
+    publish(loader, engine, "2024-01-01", {"AAA": 100, "BBB": 40})
+    fired = publish(loader, engine, "2024-01-02", {"AAA": 90, "BBB": 60, "CCC": 70})
+    assert sorted(fired) == [("AAA", -10.0), ("BBB", 60)]
+
+
+def test_sessions_are_evaluated_once(loader, tmp_path):
+    engine = engine_for(loader, tmp_path / "alerts.json")
+    engine.add_rule("u", "AAA", "close", "above", 100)
+    assert publish(loader, engine, "2024-01-01", {"AAA": 105}) == [("AAA", 105)]
+    assert engine.evaluate() == []
+
+
+def test_state_and_history_survive_a_restart(loader, tmp_path):
+    path = tmp_path / "alerts.json"
+    engine = engine_for(loader, path)
+    rule = engine.add_rule("u", "AAA", "close", "above", 100)
+    publish(loader, engine, "2024-01-01", {"AAA": 105})
+
+    restarted = engine_for(loader, path)
+    assert restarted.user_rules("u") == [rule]
+    assert restarted.triggered("u") == engine.triggered("u")
+    # Same session: not evaluated again. Still above: not fired again
+    assert restarted.evaluate() == []
+    assert publish(loader, restarted, "2024-01-02", {"AAA": 110}) == []
+    publish(loader, restarted, "2024-01-03", {"AAA": 90})
+    assert publish(loader, restarted, "2024-01-04", {"AAA": 101}) == [("AAA", 101)]
+    assert [a["seq"] for a in restarted.triggered("u")] == [1, 2]
+    assert restarted.add_rule("u", "BBB", "volume", "above", 1)["id"] == rule["id"] + 1
+
+
+def test_removed_rules_stop_firing(loader, tmp_path):
+    engine = engine_for(loader, tmp_path / "alerts.json")
+    rule = engine.add_rule("u", "AAA", "close", "above", 100)
+    with pytest.raises(KeyError):
+        engine.remove_rule("other", rule["id"])
+    engine.remove_rule("u", rule["id"])
+    assert publish(loader, engine, "2024-01-01", {"AAA": 105}) == []
+
+
+@pytest.mark.parametrize("args", [
+    ("AAA", "price", "above", 1),
+    ("AAA", "close", "equals", 1),
+    ("AAA", "close", "above", float("nan")),
+    ("  ", "close", "above", 1),
+])
+def test_invalid_rules_are_rejected(loader, tmp_path, args):
+    engine = engine_for(loader, tmp_path / "alerts.json")
+    with pytest.raises(ValueError):
+        engine.add_rule("u", *args)
@@ -0,0 +1,48 @@
+import pytest
+
+
+@pytest.mark.parametrize("body, detail", [
+    ({"symbols": "BIAT"}, "'symbols' must be a list of strings"),
+    ({"symbols": ["BIAT", 3]}, "'symbols' must be a list of strings"),
+    ({"symbols": ["BIAT"], "profiles": {"Moderate": 1}}, "'profiles' must be a list of strings"),
+    ({"symbols": ["BIAT"], "profiles": "Moderate"}, "'profiles' must be a list of strings"),
+    ({"symbols": []}, "No symbols given"),
+    ({"symbols": ["  "]}, "No symbols given"),
+])
+def test_analyze_batch_rejects_bad_input(client, body, detail):
+    response = client.post("/api/agent/analyze/batch", body)
+    assert response.status_code == 400
+    assert response.json()["detail"] == detail
+
+
+def test_analyze_batch_too_many_symbols(client):
+    from app.api.endpoints import MAX_BATCH_SYMBOLS
+    body = {"symbols": [f"S{i}" for i in range(MAX_BATCH_SYMBOLS + 1)]}
+    assert client.post("/api/agent/analyze/batch", body).status_code == 400
+
+
+def test_analyze_batch(client):
+    symbol = client.get("/api/stocks").json()[0]
+    response = client.post("/api/agent/analyze/batch",
+                           {"symbols": [symbol.lower(), symbol, "NOPE"], "profiles": ["Moderate", "Aggressive"]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [(r["symbol"], r.get("profile")) for r in results if "error" not in r] == [
+        (symbol, "Moderate"), (symbol, "Aggressive")]
+    assert any(r["symbol"] == "NOPE" and "error" in r for r in results)
+
+
+def test_reload_is_disabled_without_an_admin_token(client, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "admin_token", "")
+    assert client.post("/api/admin/reload", params={"full": "true"}).status_code == 404
+
+
+def test_reload_requires_the_admin_token(client, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    assert client.post("/api/admin/reload").status_code == 403
+    assert client.post("/api/admin/reload", headers={"X-BVMT-Admin-Token": "wrong"}).status_code == 403
+    response = client.post("/api/admin/reload", headers={"X-BVMT-Admin-Token": "s3cret"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "unchanged"
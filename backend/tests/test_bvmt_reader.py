@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+from app.services.bvmt_reader import read_bvmt_file
+from benchmarks.synthetic_data import write_csv, write_txt
+
+ROWS = [
+    ["04/01/2016", "12", "TN0000000000", "BIAT", "117,033", "116,904", "116,544", "117,853", "23744", "189", "2780030,624"],
+    ["04/01/2016", "11", "TN0000000002", "POULINA GP HOLDING", "115,253", "113,433", "112,778", "115,704", "3120", "53", "356591,040"],
+    ["05/01/2016", "12", "tn0000000000", "BIAT", "116,900", "117,500", "116,100", "118,000", "1200", "12", "141000,5"],
+]
+
+
+def read_both(tmp_path, rows):
+    write_txt(str(tmp_path / "histo_cotation_2016.txt"), rows)
+    write_csv(str(tmp_path / "histo_cotation_2016.csv"), rows)
+    return (read_bvmt_file(str(tmp_path / "histo_cotation_2016.txt")),
+            read_bvmt_file(str(tmp_path / "histo_cotation_2016.csv")))
+
+
+def test_txt_and_csv_parse_the_same(tmp_path):
+    txt, csv = read_both(tmp_path, ROWS)
+    pd.testing.assert_frame_equal(txt, csv, check_like=True)
+    assert txt['Symbol'].tolist() == ["TN0000000000", "TN0000000002", "TN0000000000"]
+    assert txt['Name'].tolist()[1] == "POULINA GP HOLDING"
+    assert txt['Date'].tolist()[2] == pd.Timestamp("2016-01-05")
+    assert txt['Value'].tolist()[2] == pytest.approx(141000.5)
+
+
+def test_overlong_last_field_is_read_in_full(tmp_path):
+    # CAPITAUX wider than its 17-character column, on the last and longest line
+    rows = ROWS + [["05/01/2016", "11", "TN0000000002", "POULINA GP HOLDING", "113,433", "114,000",
+                    "113,000", "114,100", "10", "1", "123456789012345678,5"]]
+    txt, csv = read_both(tmp_path, rows)
+    pd.testing.assert_frame_equal(txt, csv, check_like=True)
+    assert txt['Value'].iloc[-1] == pytest.approx(123456789012345678.5)
+
+
+def test_fields_that_would_split_wrongly_are_skipped(tmp_path):
+    path = tmp_path / "histo_cotation_2016.txt"
+    rows = ROWS + [
+        # A ';' inside a name would add a column once the gaps become separators
+        ["05/01/2016", "11", "TN0000000003", "SAH;LILAS", "10,000", "10,100", "9,900", "10,200", "5", "1", "50,5"],
+        # A name wider than its column runs over the gap into OUVERTURE
+        ["05/01/2016", "11", "TN0000000004", "X" * 35, "10,000", "10,100", "9,900", "10,200", "5", "1", "50,5"],
+    ]
+    write_txt(str(path), rows)
+    txt = read_bvmt_file(str(path))
+    assert txt['Symbol'].tolist() == ["TN0000000000", "TN0000000002", "TN0000000000"]
@@ -0,0 +1,119 @@
+import asyncio
+import gc
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.coalesce import Coalescer
+
+
+def test_computation_outlives_its_waiters():
+    release = threading.Event()
+    done = []
+
+    def slow():
+        release.wait(5)
+        done.append(1)
+        return 42
+
+    async def scenario():
+        c = Coalescer(default_timeout=0.05)
+        with pytest.raises(HTTPException) as e:
+            await c.run("g", "k", slow)
+        assert e.value.status_code == 504
+        # Nobody awaits the computation any more; it must not be collected
+        gc.collect()
+        assert len(c._tasks) == 1 and c.in_flight() == 1
+        release.set()
+        for _ in range(200):
+            if not c._tasks:
+                break
+            await asyncio.sleep(0.01)
+        return c
+
+    c = asyncio.run(scenario())
+    assert done == [1]
+    assert not c._tasks and c.in_flight() == 0
+
+
+def run_concurrently(c, calls):
+    async def scenario():
+        return await asyncio.gather(*(c.run(group, key, fn) for group, key, fn in calls),
+                                    return_exceptions=True)
+    return asyncio.run(scenario())
+
+
+def counting(result, delay=0.05):
+    calls = []
+
+    def fn():
+        calls.append(threading.get_ident())
+        threading.Event().wait(delay)
+        return result
+    return fn, calls
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    fn, calls = counting({"value": 1})
+    results = run_concurrently(Coalescer(), [("g", "k", fn)] * 5)
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+
+def test_different_keys_and_groups_are_not_shared():
+    fn, calls = counting(1)
+    run_concurrently(Coalescer(), [("g", "a", fn), ("g", "b", fn), ("h", "a", fn)])
+    assert len(calls) == 3
+
+
+def test_every_waiter_gets_the_exception():
+    calls = []
+
+    def fail():
+        calls.append(1)
+        threading.Event().wait(0.05)
+        raise ValueError("boom")
+
+    c = Coalescer()
+    results = run_concurrently(c, [("g", "k", fail)] * 3)
+    assert len(calls) == 1
+    assert all(isinstance(r, ValueError) and str(r) == "boom" for r in results)
+    # The failed flight is gone, so the next call computes again
+    fn, calls = counting(2)
+    assert run_concurrently(c, [("g", "k", fn)]) == [2]
+
+
+def test_late_caller_joins_a_timed_out_computation():
+    fn, calls = counting(7, delay=0.3)
+
+    async def scenario():
+        c = Coalescer(default_timeout=0.05)
+        with pytest.raises(HTTPException):
+            await c.run("g", "k", fn)
+        return await c.run("g", "k", fn, timeout=5)
+
+    assert asyncio.run(scenario()) == 7
+    assert len(calls) == 1
+
+
+def test_disabled_coalescer_runs_every_call():
+    fn, calls = counting(1)
+    run_concurrently(Coalescer(enabled=False), [("g", "k", fn)] * 3)
+    assert len(calls) == 3
+
+
+def test_profiled_calls_run_inline():
+    from app.core import profiling
+
+    fn, calls = counting(1, delay=0)
+
+    async def scenario():
+        token = profiling._profiling.set(True)
+        try:
+            return await Coalescer().run("g", "k", fn), threading.get_ident()
+        finally:
+            profiling._profiling.reset(token)
+
+    result, loop_thread = asyncio.run(scenario())
+    assert result == 1 and calls == [loop_thread]
@@ -0,0 +1,97 @@
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+
+from app.core import middleware
+from app.core.middleware import CompressionMiddleware, _negotiate_encoding
+from app.core.responses import json_response
+from benchmarks.asgi_client import ASGIClient
+
+PAYLOAD = {"points": [{"date": f"2024-01-{d:02d}", "close": 100.0 + d} for d in range(1, 29)] * 5}
+NDJSON_LINES = [json.dumps({"symbol": f"S{i}", "score": i}) + "\n" for i in range(200)]
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+
+    @app.get("/big")
+    def big():
+        return json_response(PAYLOAD)
+
+    @app.get("/small")
+    def small():
+        return json_response({"ok": True})
+
+    @app.get("/binary")
+    def binary():
+        return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter(NDJSON_LINES), media_type="application/x-ndjson")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=512)
+    c = ASGIClient(app)
+    yield c
+    c.close()
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("gzip, deflate", "gzip"),
+    ("br;q=0, gzip;q=0.5", "gzip"),
+    ("gzip;q=0", ""),
+    ("identity", ""),
+    ("deflate, *;q=0", ""),
+    ("", ""),
+])
+def test_negotiation_without_brotli(monkeypatch, header, expected):
+    monkeypatch.setattr(middleware, "brotli", None)
+    assert _negotiate_encoding(header) == expected
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, br", "br"),
+    ("*", "br"),
+    ("br;q=0, *", "gzip"),
+])
+def test_negotiation_prefers_brotli(header, expected):
+    pytest.importorskip("brotli")
+    assert _negotiate_encoding(header) == expected
+
+
+def test_large_json_is_gzipped(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) == len(response.content)
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert json.loads(gzip.decompress(response.content)) == PAYLOAD
+
+
+def test_large_json_is_brotli_compressed(client):
+    brotli = pytest.importorskip("brotli")
+    response = client.get("/big", headers={"Accept-Encoding": "br, gzip"})
+    assert response.headers["content-encoding"] == "br"
+    assert json.loads(brotli.decompress(response.content)) == PAYLOAD
+
+
+@pytest.mark.parametrize("path, headers", [
+    ("/big", {}),
+    ("/big", {"Accept-Encoding": "identity"}),
+    ("/small", {"Accept-Encoding": "gzip"}),
+    ("/binary", {"Accept-Encoding": "gzip"}),
+])
+def test_left_uncompressed(client, path, headers):
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+
+def test_streamed_responses_pass_through(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip, br"})
+    assert "content-encoding" not in response.headers
+    assert response.content.decode() == "".join(NDJSON_LINES)
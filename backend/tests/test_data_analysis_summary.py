@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+import pytest
+
+from app.services.data_loader import DataLoader
+from data_analysis_summary import DEFAULT_FORMAT, TABLES, merge_parts, process_chunk, read_table, write_table
+
+FORMATS = ["csv", pytest.param("parquet", marks=pytest.mark.skipif(
+    DEFAULT_FORMAT != "parquet", reason="pyarrow not installed"))]
+
+
+def merged(checkpoint_dir, name, n_chunks, fmt):
+    parts = [read_table(os.path.join(checkpoint_dir, f"{name}.{i:05d}.{fmt}"), fmt) for i in range(n_chunks)]
+    return merge_parts(parts, TABLES[name])
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_empty_chunk_merges_with_the_others(dataset_dir, tmp_path, fmt):
+    loader = DataLoader(dataset_dir)
+    symbol = loader.get_all_stocks()[0]
+    process_chunk(0, loader.get_many_stock_data([symbol]), 3, ["Moderate"], str(tmp_path), fmt)
+    process_chunk(1, {}, 3, ["Moderate"], str(tmp_path), fmt)
+
+    for name, columns in TABLES.items():
+        empty = read_table(os.path.join(tmp_path, f"{name}.00001.{fmt}"), fmt)
+        assert empty.empty and list(empty.columns) == columns
+        table = merged(str(tmp_path), name, 2, fmt)
+        assert list(table.columns) == columns
+        assert set(table['symbol']) == {symbol}
+    assert len(merged(str(tmp_path), "forecasts", 2, fmt)) == 3
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_all_chunks_empty(tmp_path, fmt):
+    process_chunk(0, {}, 3, ["Moderate"], str(tmp_path), fmt)
+    for name, columns in TABLES.items():
+        table = merged(str(tmp_path), name, 1, fmt)
+        assert table.empty and list(table.columns) == columns
+
+
+
+def test_tables_without_columns_are_refused(tmp_path):
+    with pytest.raises(ValueError):
+        write_table(pd.DataFrame(), str(tmp_path / "forecasts"), "csv")
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from app.core.jobs import CANCELLED, DONE, FAILED, SKIPPED, JobScheduler
+
+
+def wait_finished(scheduler, version, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = scheduler.status()
+        if status["version"] == version and status["state"] != "running":
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"Run for version {version} did not finish: {scheduler.status()}")
+
+
+def test_jobs_run_after_their_dependencies_by_priority():
+    order = []
+    s = JobScheduler(workers=1)
+    s.register("base", lambda ctx: order.append("base") or ctx.version * 10, priority=3)
+    s.register("low", lambda ctx: order.append("low"), priority=1)
+    s.register("high", lambda ctx: order.append("high"), priority=5)
+    s.register("derived", lambda ctx: order.append("derived") or ctx.result("base") + 1, depends_on=["base"],
+               priority=9)
+
+    s.schedule(3)
+    status = wait_finished(s, 3)
+    assert status["state"] == DONE
+    # One worker: "high" beats "low"; "derived" waits for "base" but then outranks the rest
+    assert order == ["high", "base", "derived", "low"]
+    assert s.result("derived", 3) == 31
+
+
+def test_results_are_tied_to_their_data_version():
+    s = JobScheduler()
+    s.register("v", lambda ctx: ctx.version)
+    s.schedule(1)
+    wait_finished(s, 1)
+    assert s.result("v", 1) == 1
+    assert s.result("v", 2, "missing") == "missing"
+    s.schedule(2)
+    wait_finished(s, 2)
+    assert s.result("v", 2) == 2 and s.result("v", 1) is None
+
+
+def test_failure_skips_dependents_only():
+    s = JobScheduler()
+    s.register("broken", lambda ctx: 1 / 0)
+    s.register("child", lambda ctx: "never", depends_on=["broken"])
+    s.register("grandchild", lambda ctx: "never", depends_on=["child"])
+    s.register("other", lambda ctx: "ok")
+    s.schedule(1)
+    status = wait_finished(s, 1)
+    assert status["state"] == FAILED
+    jobs = status["jobs"]
+    assert jobs["broken"]["state"] == FAILED and "division" in jobs["broken"]["error"]
+    assert jobs["child"]["state"] == SKIPPED and jobs["grandchild"]["state"] == SKIPPED
+    assert jobs["other"]["state"] == DONE and s.result("other", 1) == "ok"
+
+
+def test_newer_version_cancels_the_running_one():
+    started, release = threading.Event(), threading.Event()
+
+    def slow(ctx):
+        if ctx.version == 1:
+            started.set()
+            release.wait(5)
+            ctx.check()
+        return ctx.version
+
+    s = JobScheduler(workers=1)
+    s.register("slow", slow)
+    s.register("after", lambda ctx: ctx.version, depends_on=["slow"])
+    s.schedule(1)
+    assert started.wait(5)
+    old_run = s._run
+    s.schedule(2)
+    assert old_run.cancelled and old_run.jobs["after"]["state"] == CANCELLED
+    release.set()
+    status = wait_finished(s, 2)
+    assert status["state"] == DONE
+    assert old_run.jobs["slow"]["state"] == CANCELLED
+    assert s.result("slow", 2) == 2 and s.result("after", 2) == 2
+    # Nothing from the cancelled run was published
+    assert s.result("slow", 1) is None and s.result("after", 1) is None
+
+
+def test_same_version_is_not_rescheduled():
+    calls = []
+    s = JobScheduler()
+    s.register("count", lambda ctx: calls.append(ctx.version))
+    s.schedule(1)
+    wait_finished(s, 1)
+    s.schedule(1)
+    wait_finished(s, 1)
+    assert calls == [1]
+
+
+def test_unknown_dependency_is_rejected():
+    s = JobScheduler()
+    with pytest.raises(ValueError):
+        s.register("child", lambda ctx: None, depends_on=["missing"])
@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services.market_feed import MarketFeed, _Subscriber
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+
+def snapshot(close=10.0):
+    return {"summary": {"volume": 1}, "mood": "neutral", "anomalies": [],
+            "quotes": {"AAA": {"close": close}, "BBB": {"close": 20.0}}}
+
+
+def make_feed(build=snapshot, version=lambda: 1, poll_interval=0.01):
+    return MarketFeed(build, version, lambda: True, poll_interval=poll_interval)
+
+
+@pytest.mark.parametrize("text, detail", [
+    ("not json", "Invalid JSON"),
+    ("[1, 2]", "Expected a JSON object"),
+    ('"subscribe"', "Expected a JSON object"),
+    ('{"action": "watch"}', "Unknown action: watch"),
+    ('{"action": "subscribe", "symbols": 5}', "'symbols' must be \"*\" or a list of strings"),
+    ('{"action": "subscribe", "symbols": "AAA"}', "'symbols' must be \"*\" or a list of strings"),
+    ('{"action": "unsubscribe", "symbols": ["AAA", 1]}', "'symbols' must be \"*\" or a list of strings"),
+])
+def test_bad_messages_get_an_error_reply(text, detail):
+    feed, ws = make_feed(), FakeWebSocket()
+    sub = _Subscriber(ws)
+    asyncio.run(feed._handle_message(sub, text))
+    assert ws.sent == [{"type": "error", "detail": detail}]
+    assert sub.symbols is None
+
+
+def test_subscribe_narrows_the_snapshot():
+    async def scenario():
+        feed, ws = make_feed(), FakeWebSocket()
+        sub = _Subscriber(ws)
+        await feed._refresh()
+        await feed._handle_message(sub, '{"action": "subscribe", "symbols": ["aaa"]}')
+        await feed._handle_message(sub, '{"action": "unsubscribe", "symbols": "*"}')
+        return sub, ws.sent
+
+    sub, sent = asyncio.run(scenario())
+    assert [m["type"] for m in sent] == ["snapshot", "snapshot"]
+    assert list(sent[0]["quotes"]) == ["AAA"]
+    assert sent[1]["quotes"] == {} and sub.symbols == set()
+
+
+def test_poll_loop_survives_a_failed_snapshot():
+    versions = iter([1, 2, 2, 2, 2, 2])
+    calls = []
+
+    def build():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("reload in progress")
+        return snapshot(close=11.0)
+
+    async def scenario():
+        feed, ws = make_feed(build, lambda: next(versions, 2)), FakeWebSocket()
+        sub = _Subscriber(ws)
+        feed._subscribers[id(ws)] = sub
+        feed._ensure_running()
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if ws.sent:
+                break
+        feed._subscribers.clear()
+        await asyncio.sleep(0.05)
+        return feed, ws.sent
+
+    feed, sent = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert sent and sent[0]["type"] == "snapshot" and sent[0]["version"] == 2
+    assert feed._task is None
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.data_loader import DataLoader
+from app.services.market_index import BASE_LEVEL, MarketIndex, chain_index
+
+NAN = np.nan
+
+
+def test_chain_index_divisor_absorbs_constituent_changes():
+    # B lists on the third session, A stops quoting (carried forward) on the fourth,
+    # C lists on the last one at a price far above the rest
+    prices = np.array([
+        [10.0, NAN, NAN],
+        [11.0, NAN, NAN],
+        [11.0, 50.0, NAN],
+        [11.0, 55.0, NAN],
+        [11.0, 55.0, 400.0],
+    ])
+    weights = np.where(np.isfinite(prices), 1.0, NAN)
+    levels, divisors = chain_index(prices, weights, np.full(3, NAN), BASE_LEVEL)
+
+    # Only names quoted on both sessions move the index, so listings cause no jump
+    np.testing.assert_allclose(levels, [1000.0, 1100.0, 1100.0, 1100.0 * 66 / 61, 1100.0 * 66 / 61])
+    # The divisor is the market value over the level and steps with each listing
+    market_value = np.nansum(prices, axis=1)
+    np.testing.assert_allclose(divisors, market_value / levels)
+    assert divisors[2] > divisors[1] and divisors[4] > divisors[3]
+    np.testing.assert_allclose(divisors[:2], [0.01, 0.01])
+    np.testing.assert_allclose(divisors[3], divisors[2])
+
+
+def test_chain_index_continues_from_previous_prices_and_level():
+    prices = np.array([[10.0, 20.0], [12.0, 20.0], [12.0, 25.0]])
+    weights = np.ones_like(prices)
+    full, _ = chain_index(prices, weights, np.full(2, NAN), BASE_LEVEL)
+    head, _ = chain_index(prices[:1], weights[:1], np.full(2, NAN), BASE_LEVEL)
+    tail, _ = chain_index(prices[1:], weights[1:], prices[0], head[-1])
+    np.testing.assert_allclose(np.concatenate([head, tail]), full)
+
+
+def session_rows(data, dates):
+    return data[data['Date'].isin(dates)]
+
+
+def test_appended_sessions_match_a_full_build(dataset_dir, tmp_path):
+    data = DataLoader(dataset_dir).get_data()
+    dates = data['Date'].unique()
+    cut = len(dates) - 5
+
+    loader = DataLoader(dataset_dir, autoload=False)
+    loader.data = session_rows(data, dates[:cut]).reset_index(drop=True)
+    loader.version = 1
+    loader.build_index()
+    index = MarketIndex(loader, str(tmp_path / "index.json"))
+    index.refresh()
+    for day in dates[cut:-1]:
+        loader.append_session(session_rows(data, [day]))
+        index.refresh()
+    # The last session is chained onto the saved series by a fresh instance
+    loader.append_session(session_rows(data, dates[-1:]))
+    restarted = MarketIndex(loader, str(tmp_path / "index.json"))
+
+    full = MarketIndex(DataLoader(dataset_dir), storage_file=None)
+    for method in ("price", "value"):
+        expected = full.series(method)
+        got = restarted.series(method)
+        assert got['Date'].tolist() == expected['Date'].tolist()
+        np.testing.assert_allclose(got['Level'], expected['Level'])
+        np.testing.assert_allclose(got['Divisor'], expected['Divisor'])
+        assert got['Level'].iloc[0] == BASE_LEVEL
+
+
+def test_rewritten_history_triggers_a_rebuild(dataset_dir):
+    loader = DataLoader(dataset_dir)
+    index = MarketIndex(loader, storage_file=None)
+    before = index.series("price")
+
+    # Late rows for the first session: their closes win over the original ones
+    data = loader.get_data()
+    first = data[data['Date'] == data['Date'].iloc[0]].assign(Close=lambda d: d['Close'] * 2)
+    loader.append_session(first)
+
+    after = index.series("price")
+    expected = MarketIndex(loader, storage_file=None).series("price")
+    assert after['Level'].iloc[1] != pytest.approx(before['Level'].iloc[1])
+    np.testing.assert_allclose(after['Level'], expected['Level'])
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.panel import MarketPanel
+
+
+def rows(date, quotes):
+    """Long-frame rows for one session: {symbol: close} or {symbol: (close, volume, value)}."""
+    out = []
+    for symbol, q in quotes.items():
+        close, volume, value = q if isinstance(q, tuple) else (q, 10, q * 10)
+        out.append({'Date': pd.Timestamp(date), 'Symbol': symbol, 'Close': close,
+                    'Volume': volume, 'Value': value})
+    return pd.DataFrame(out)
+
+
+@pytest.fixture
+def panel():
+    frame = pd.concat([rows("2024-01-02", {"A": 10.0, "B": 20.0}),
+                       rows("2024-01-03", {"A": 11.0})], ignore_index=True)
+    return MarketPanel.from_frame(frame, version=1)
+
+
+def test_from_frame(panel):
+    assert panel.shape == (2, 2)
+    assert panel.symbols == ["A", "B"]
+    assert panel.valid.tolist() == [[True, True], [True, False]]
+    np.testing.assert_array_equal(panel.close, [[10.0, 20.0], [11.0, np.nan]])
+
+
+def test_extend_appends_sessions_and_symbols_in_place(panel):
+    panel.extend(pd.concat([rows("2024-01-04", {"B": 22.0, "C": 5.0}),
+                            rows("2024-01-05", {"A": 12.1})], ignore_index=True))
+    assert panel.shape == (4, 3)
+    assert panel.symbols == ["A", "B", "C"]
+    assert panel.column("C") == 2
+    assert panel.position("2024-01-04 15:00") == 2
+    np.testing.assert_array_equal(panel.ffill("close")[3], [12.1, 22.0, 5.0])
+    np.testing.assert_allclose(panel.returns()[:, 1], [np.nan, np.nan, 0.1, np.nan])
+    assert panel.latest_prices() == {"A": 12.1}
+
+
+def test_duplicate_rows_keep_last_close_and_sum_volume(panel):
+    panel.extend(pd.concat([rows("2024-01-04", {"A": (12.0, 5, 60.0)}),
+                            rows("2024-01-04", {"A": (13.0, 7, 91.0)})], ignore_index=True))
+    xs = panel.cross_section(-1)
+    assert xs.loc["A"].tolist() == [13.0, 12.0, 151.0]
+
+
+def test_growing_past_capacity_keeps_values(panel):
+    for day in pd.date_range("2024-02-01", periods=60):
+        panel.extend(rows(day, {"A": 1.0, f"S{day.day}": 2.0}))
+    assert panel.shape == (62, 33)
+    assert panel.close[0, :2].tolist() == [10.0, 20.0]
+    assert panel.close[-1, 0] == 1.0
+
+
+def test_late_rows_are_refused(panel):
+    late = rows("2024-01-03", {"B": 21.0})
+    assert not panel.can_extend(late)
+    with pytest.raises(ValueError):
+        panel.extend(late)
+
+
+def test_snapshot_is_read_only_and_unchanged_by_extend(panel):
+    snap = panel.snapshot()
+    with pytest.raises(ValueError):
+        snap.extend(rows("2024-01-04", {"A": 12.0}))
+
+    close = snap.close.copy()
+    # One session fits the spare capacity (written in place), many force new buffers
+    panel.extend(rows("2024-01-04", {"A": 12.0, "C": 1.0}))
+    assert snap.shape == (2, 2) and snap.symbols == ["A", "B"]
+    np.testing.assert_array_equal(snap.close, close)
+    for day in pd.date_range("2024-02-01", periods=40):
+        panel.extend(rows(day, {"D": 3.0}))
+    assert snap.shape == (2, 2)
+    np.testing.assert_array_equal(snap.close, close)
+    assert snap.latest_prices() == {"A": 11.0}
+
+
+def test_zero_close_counts_as_unquoted_in_returns(panel):
+    panel.extend(pd.concat([rows("2024-01-04", {"A": 0.0}),
+                            rows("2024-01-05", {"A": 12.1})], ignore_index=True))
+    returns = panel.returns()[:, 0]
+    assert np.isnan(returns[2])
+    assert returns[3] == pytest.approx(0.1)
@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+
+import pytest
+
+from app.services.portfolio import DEFAULT_USER, PortfolioStore
+
+
+def quantity(store, user, symbol):
+    return store.snapshot(user)["holdings"].get(symbol, {}).get("quantity", 0)
+
+
+def test_portfolios_are_sharded_files_per_user(tmp_path):
+    store = PortfolioStore(str(tmp_path), legacy_file=None)
+    with store.open("alice") as p:
+        p.buy("biat", 10, 100.0)
+    with store.open("bob") as p:
+        p.buy("SFBT", 5, 20.0)
+
+    path = store.path_for("alice")
+    assert os.path.dirname(os.path.dirname(path)) == str(tmp_path) and os.path.exists(path)
+    reopened = PortfolioStore(str(tmp_path), legacy_file=None)
+    assert quantity(reopened, "alice", "BIAT") == 10
+    assert quantity(reopened, "alice", "SFBT") == 0 and quantity(reopened, "bob", "SFBT") == 5
+
+
+@pytest.mark.parametrize("user", ["", "../etc", ".hidden", "a/b", "x" * 65])
+def test_unsafe_user_ids_are_rejected(tmp_path, user):
+    store = PortfolioStore(str(tmp_path), legacy_file=None)
+    with pytest.raises(ValueError):
+        with store.open(user):
+            pass
+
+
+def test_least_recently_used_portfolio_is_evicted(tmp_path):
+    store = PortfolioStore(str(tmp_path), cache_size=2, legacy_file=None)
+    for user in ("a", "b"):
+        with store.open(user) as p:
+            p.buy("BIAT", 1, 10.0)
+    store.snapshot("a")  # "a" is now the most recently used
+    with store.open("c") as p:
+        p.buy("BIAT", 3, 10.0)
+
+    assert store.cached_users() == 2
+    assert list(store._cache) == ["a", "c"]
+    # The evicted portfolio was written through, so it reloads intact
+    assert quantity(store, "b", "BIAT") == 1
+    assert list(store._cache) == ["c", "b"]
+
+
+def test_concurrent_transactions_for_one_user_are_serialized(tmp_path):
+    store = PortfolioStore(str(tmp_path), cache_size=1, legacy_file=None)
+
+    def buy(user):
+        for _ in range(20):
+            with store.open(user) as p:
+                p.buy("BIAT", 1, 10.0)
+
+    # Two users on a one-entry cache, so portfolios are evicted and reloaded meanwhile
+    threads = [threading.Thread(target=buy, args=(u,)) for u in ("alice", "bob") * 4]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert quantity(store, "alice", "BIAT") == 80
+    assert quantity(store, "bob", "BIAT") == 80
+
+
+def test_one_user_does_not_block_another(tmp_path):
+    store = PortfolioStore(str(tmp_path), legacy_file=None)
+    holding, release = threading.Event(), threading.Event()
+
+    def hold():
+        with store.open("alice"):
+            holding.set()
+            release.wait(5)
+
+    t = threading.Thread(target=hold)
+    t.start()
+    try:
+        assert holding.wait(5)
+        done = threading.Event()
+        threading.Thread(target=lambda: (store.snapshot("bob"), done.set())).start()
+        assert done.wait(2)
+    finally:
+        release.set()
+        t.join()
+
+
+def test_legacy_file_becomes_the_default_users_portfolio(tmp_path):
+    legacy = tmp_path / "portfolio.json"
+    legacy.write_text(json.dumps({"holdings": {"BIAT": {"quantity": 7, "total_cost": 700.0}},
+                                  "transactions": []}))
+    store = PortfolioStore(str(tmp_path / "portfolios"), legacy_file=str(legacy))
+
+    assert quantity(store, DEFAULT_USER, "BIAT") == 7
+    assert os.path.exists(store.path_for(DEFAULT_USER))
+    assert quantity(store, "alice", "BIAT") == 0
+
+    # Once imported, the per-user file wins over later edits of the legacy one
+    legacy.write_text(json.dumps({"holdings": {}, "transactions": []}))
+    assert quantity(PortfolioStore(str(tmp_path / "portfolios"), legacy_file=str(legacy)), DEFAULT_USER, "BIAT") == 7
@@ -0,0 +1,82 @@
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.readiness import FAILED, LOADING, PENDING, READY, Readiness, readiness
+
+
+def test_require_raises_503_with_retry_after_until_ready(monkeypatch):
+    monkeypatch.setattr(settings, "retry_after_s", 7)
+    r = Readiness()
+    r.register("data")
+    r.ready("index")
+
+    with pytest.raises(HTTPException) as e:
+        r.require("data", "index")
+    assert e.value.status_code == 503
+    assert e.value.headers == {"Retry-After": "7"}
+    assert e.value.detail == "Service not ready: data"
+
+    r.start("data")
+    with pytest.raises(HTTPException):
+        r.require("data")
+    r.ready("data")
+    r.require("data", "index")
+
+
+def test_unregistered_and_failed_components_are_not_ready():
+    r = Readiness()
+    assert not r.is_ready("data")
+    assert r.snapshot() == {"ready": False, "components": {}}
+    r.fail("data", "boom")
+    with pytest.raises(HTTPException) as e:
+        r.require("data")
+    assert e.value.status_code == 503
+
+
+def test_snapshot_reports_state_and_progress():
+    r = Readiness()
+    r.register("index")
+    assert r.snapshot()["components"]["index"] == {"state": PENDING}
+    r.start("data")
+    r.progress("data", 1, 4)
+    assert r.snapshot()["components"]["data"] == {
+        "state": LOADING, "progress": {"done": 1, "total": 4, "percent": 25.0}}
+    r.ready("data", "6 symbols")
+    r.ready("index")
+    snapshot = r.snapshot()
+    assert snapshot["ready"]
+    assert snapshot["components"]["data"]["state"] == READY
+    assert snapshot["components"]["data"]["detail"] == "6 symbols"
+    assert "duration_s" in snapshot["components"]["data"]
+    r.fail("index", "corrupt file")
+    assert r.snapshot()["components"]["index"] == {"state": FAILED, "detail": "corrupt file"}
+    assert not r.snapshot()["ready"]
+
+
+@pytest.fixture
+def data_loading(client, monkeypatch):
+    """Puts the shared "data" component back into loading for the duration of a test."""
+    monkeypatch.setitem(readiness._components, "data",
+                        {"state": LOADING, "detail": None, "progress": None, "started": None, "finished": None})
+
+
+def test_endpoints_answer_503_while_data_loads(client, data_loading):
+    response = client.get("/api/stocks")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(settings.retry_after_s)
+
+    ready = client.get("/ready")
+    assert ready.status_code == 503
+    assert ready.headers["retry-after"] == str(settings.retry_after_s)
+    assert ready.json()["components"]["data"]["state"] == LOADING
+
+    # Liveness does not depend on the data
+    health = client.get("/health")
+    assert health.status_code == 200 and health.json()["ready"] is False
+
+
+def test_endpoints_answer_once_ready(client):
+    assert client.get("/ready").status_code == 200
+    response = client.get("/api/stocks")
+    assert response.status_code == 200 and "retry-after" not in response.headers
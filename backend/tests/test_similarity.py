@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from app.services.data_loader import DataLoader
+from app.services.similarity import ReturnMatrix
+
+
+def split_loader(dataset_dir, held_back=1):
+    """A loader holding all but the last `held_back` sessions, and the held-back rows."""
+    data = DataLoader(dataset_dir).get_data()
+    dates = data['Date'].unique()
+    loader = DataLoader(dataset_dir, autoload=False)
+    loader.data = data[data['Date'].isin(dates[:-held_back])].reset_index(drop=True)
+    loader.version = 1
+    loader.build_index()
+    return loader, data[data['Date'].isin(dates[-held_back:])]
+
+
+def test_similar_ranks_by_correlation(dataset_dir):
+    matrix = ReturnMatrix(DataLoader(dataset_dir))
+    symbol = matrix.data_loader.get_all_stocks()[0]
+    results = matrix.similar(symbol, k=3, window=60)
+    assert len(results) == 3 and symbol not in [r["symbol"] for r in results]
+    scores = [r["correlation"] for r in results]
+    assert scores == sorted(scores, reverse=True)
+
+    heatmap = matrix.correlation_matrix(window=60, symbols=[symbol, results[0]["symbol"]])
+    assert heatmap["matrix"][0][1] == round(scores[0], 3)
+    assert np.allclose(np.diag(heatmap["matrix"]), 1.0)
+
+
+def test_new_version_between_normalize_and_lookup(dataset_dir):
+    loader, rest = split_loader(dataset_dir)
+    matrix = ReturnMatrix(loader)
+    symbol = loader.get_all_stocks()[0]
+    expected = matrix.similar(symbol, k=4, window=30)
+
+    # A new session (with a new symbol) lands right after the window was normalized
+    late = rest.iloc[:1].assign(Symbol="NEWCO", Date=rest['Date'].iloc[0] + pd.Timedelta(days=1))
+    normalized = matrix.normalized
+
+    def normalize_then_append(window):
+        result = normalized(window)
+        loader.append_session(pd.concat([rest, late], ignore_index=True))
+        matrix.refresh()
+        return result
+
+    matrix.normalized = normalize_then_append
+    assert matrix.similar(symbol, k=4, window=30) == expected
+    assert "NEWCO" in matrix.symbols
@@ -16,6 +16,7 @@ export default defineConfig({
         target: 'http://127.0.0.1:8000',
         changeOrigin: true,
         secure: false,
+        ws: true,
       }
     }
   }